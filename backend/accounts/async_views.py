@@ -0,0 +1,101 @@
+"""
+Async (ASGI-native) views for the accounts API, routed instead of their DRF
+counterparts when ASYNC_API is on. They return the same bodies and status
+codes as the sync views.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import TokenError
+
+from backend.async_api import APIError, AsyncAPIView, parse_json
+
+from .hashers import aauthenticate, run_hashing
+from .serializers import CustomUserSerializer, UserRegistrationSerializer
+from .tasks import send_welcome_email
+from .throttling import LoginAccountThrottle, LoginIPThrottle, RegisterIPThrottle
+from .tokens import ClaimsRefreshToken
+from .views import login_payload
+
+
+def _register(serializer):
+    user = serializer.save()
+    send_welcome_email.enqueue(user_id=user.pk)
+    token = ClaimsRefreshToken.for_user(user)
+    data = serializer.data
+    data["tokens"] = {"refresh": str(token), "access": str(token.access_token)}
+    return data
+
+
+def _blacklist(refresh_token):
+    ClaimsRefreshToken(refresh_token).blacklist()
+
+
+class AsyncUserRegistrationView(AsyncAPIView):
+    http_method_names = ['post', 'options']
+    authentication_required = False
+    throttle_classes = (RegisterIPThrottle,)
+
+    async def post(self, request, *args, **kwargs):
+        serializer = UserRegistrationSerializer(data=parse_json(request))
+        # The unique validators on username and email query the database.
+        if not await sync_to_async(serializer.is_valid)():
+            return JsonResponse(serializer.errors, status=400)
+        # Hashing the new password is as slow as verifying one at login.
+        return JsonResponse(await run_hashing(_register, serializer), status=201)
+
+
+class AsyncUserLoginView(AsyncAPIView):
+    http_method_names = ['post', 'options']
+    authentication_required = False
+    throttle_classes = (LoginIPThrottle, LoginAccountThrottle)
+
+    async def post(self, request, *args, **kwargs):
+        data = parse_json(request)
+        missing = {
+            field: ["This field is required."] for field in ('email', 'password') if not data.get(field)
+        }
+        if missing:
+            return JsonResponse(missing, status=400)
+
+        user = await aauthenticate(request, email=data['email'], password=data['password'])
+        if not (user and user.is_active):
+            return JsonResponse({"non_field_errors": ["Incorrect Credentials!"]}, status=400)
+        return JsonResponse(await sync_to_async(login_payload)(user))
+
+
+class AsyncUserLogoutView(AsyncAPIView):
+    http_method_names = ['post', 'options']
+
+    async def check_permissions(self, request):
+        # The sync view answers a missing header itself, before DRF's 401.
+        if not request.headers.get("Authorization"):
+            raise APIError({"detail": "Authorization token missing"}, 401)
+        await super().check_permissions(request)
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            auth_token = request.headers["Authorization"].split(" ")[1]  # "Bearer <token>"
+            JWTAuthentication().get_validated_token(auth_token)
+
+            refresh_token = parse_json(request).get("refresh")
+            if not refresh_token:
+                return JsonResponse({"detail": "No refresh token provided"}, status=400)
+
+            await sync_to_async(_blacklist)(refresh_token)
+            return JsonResponse({"detail": "Successfully logged out"}, status=200)
+
+        except TokenError as e:
+            return JsonResponse({"detail": f"Token error: {str(e)}"}, status=401)
+        except APIError:
+            raise
+        except Exception as e:
+            return JsonResponse({"detail": str(e)}, status=400)
+
+
+class AsyncUserInfoView(AsyncAPIView):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, *args, **kwargs):
+        # Every field is a token claim, so this does not touch the database.
+        return JsonResponse(CustomUserSerializer(request.user).data)
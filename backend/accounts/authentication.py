@@ -0,0 +1,59 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+from .models import CustomUser
+from .tokens import USER_CLAIMS
+
+
+class ClaimsUser(TokenUser):
+    """
+    Request user built from the claims of a validated access token, used by
+    JWTStatelessUserAuthentication when JWT_STATELESS_AUTH is on.
+
+    Claims listed in USER_CLAIMS are answered from the token; any other
+    attribute loads the CustomUser row on first use. An access token is
+    trusted for its lifetime: role or profile changes and deactivations
+    take effect at the next refresh, which reloads the user and refuses
+    inactive or deleted accounts.
+    """
+
+    @cached_property
+    def instance(self):
+        try:
+            return CustomUser.objects.get(pk=self.id)
+        except CustomUser.DoesNotExist:
+            # The account was deleted while the token was still valid.
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+    def _claim(self, name):
+        if name in self.token:
+            return self.token[name]
+        # Tokens issued before claims were added fall back to the database.
+        return getattr(self.instance, name)
+
+    @cached_property
+    def username(self):
+        return self._claim("username")
+
+    @cached_property
+    def is_staff(self):
+        return self._claim("is_staff")
+
+    @property
+    def full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __getattr__(self, attr):
+        if attr.startswith("_"):
+            raise AttributeError(attr)
+        if attr in USER_CLAIMS:
+            return self._claim(attr)
+        return getattr(self.instance, attr)
+
+    def __eq__(self, other):
+        if isinstance(other, CustomUser):
+            return self.id == other.pk
+        return super().__eq__(other)
+
+    __hash__ = TokenUser.__hash__
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class EmailBackend(ModelBackend):
+    """
+    ModelBackend that finds the user by email in any case, with a single
+    lookup on the Lower("email") unique index.
+    """
+
+    def authenticate(self, request, username=None, password=None, email=None, **kwargs):
+        email = email if email is not None else username
+        if email is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_email(email)
+        except UserModel.DoesNotExist:
+            # Hash anyway, so response time does not tell whether the email exists.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
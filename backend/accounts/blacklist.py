@@ -0,0 +1,109 @@
+"""
+In-memory front for the refresh token blacklist.
+
+Checking a refresh token used to mean a query against the token_blacklist
+tables on every refresh, although almost no token being refreshed is
+blacklisted. BlacklistFilter keeps a bloom filter of blacklisted JTIs per
+process: a JTI the filter has never seen is certainly not blacklisted, and
+only the rare possible hit is confirmed against the database.
+
+The filter picks up rows blacklisted by other processes with a cheap
+incremental query every SYNC_INTERVAL seconds. Ids are not committed in
+order, so each sync re-reads the last SYNC_OVERLAP ids it has already seen
+as well, catching rows that committed after a row with a higher id. The
+filter is also rebuilt from scratch
+every REBUILD_INTERVAL seconds (or when it outgrows its capacity) so that
+pruned tokens drop out. A token blacklisted by another process can
+therefore still be accepted here for up to SYNC_INTERVAL seconds; set it to
+0 to sync before every check.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = self._built_at = 0.0
+
+    @property
+    def config(self):
+        return settings.TOKEN_BLACKLIST_FILTER
+
+    def might_contain(self, jti):
+        self._sync()
+        return jti in self._bloom
+
+    def add(self, jti):
+        self._sync()
+        with self._lock:
+            self._bloom.add(jti)
+
+    def reset(self):
+        with self._lock:
+            self._bloom = None
+
+    def _sync(self):
+        now = time.monotonic()
+        config = self.config
+        if self._bloom is not None and now - self._synced_at < config['SYNC_INTERVAL']:
+            return
+        with self._lock:
+            stale = (
+                self._bloom is None
+                or now - self._built_at >= config['REBUILD_INTERVAL']
+                or self._bloom.count > self._bloom.capacity
+            )
+            if stale:
+                self._rebuild(now)
+            else:
+                overlap = self._last_id - config['SYNC_OVERLAP']
+                self._load(self._bloom, BlacklistedToken.objects.filter(id__gt=overlap))
+            self._synced_at = now
+
+    def _rebuild(self, now):
+        rows = BlacklistedToken.objects.all()
+        capacity = max(self.config['CAPACITY'], 2 * rows.count())
+        bloom = BloomFilter(capacity, self.config['ERROR_RATE'])
+        self._last_id = 0
+        self._load(bloom, rows)
+        self._bloom, self._built_at = bloom, now
+
+    def _load(self, bloom, rows):
+        for pk, jti in rows.order_by('id').values_list('id', 'token__jti').iterator(chunk_size=5000):
+            # Rows re-read from the overlap are already in; adding them again would inflate count.
+            if jti not in bloom:
+                bloom.add(jti)
+            self._last_id = max(self._last_id, pk)
+
+
+blacklist_filter = BlacklistFilter()
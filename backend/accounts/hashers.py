@@ -0,0 +1,103 @@
+"""
+Password hashers whose cost comes from settings.
+
+Each hasher keeps the algorithm name of the Django hasher it extends, so
+existing hashes keep verifying. PASSWORD_HASHER picks the one used for new
+hashes. Django rehashes a password on the next successful login whenever it
+was stored with another algorithm or different cost parameters
+(``must_update``), so changing either setting upgrades users as they log in.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher,
+    PBKDF2PasswordHasher,
+    ScryptPasswordHasher,
+)
+from django.db import close_old_connections
+
+
+def _params(name):
+    return settings.PASSWORD_HASHER_PARAMS.get(name, {})
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return _params('pbkdf2').get('iterations', PBKDF2PasswordHasher.iterations)
+
+
+class TunedScryptPasswordHasher(ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return _params('scrypt').get('work_factor', ScryptPasswordHasher.work_factor)
+
+    @property
+    def block_size(self):
+        return _params('scrypt').get('block_size', ScryptPasswordHasher.block_size)
+
+    @property
+    def parallelism(self):
+        return _params('scrypt').get('parallelism', ScryptPasswordHasher.parallelism)
+
+    @property
+    def maxmem(self):
+        # OpenSSL refuses to use more than 32MiB unless told otherwise.
+        return 2 * 128 * self.work_factor * self.block_size * self.parallelism
+
+
+class TunedArgon2PasswordHasher(Argon2PasswordHasher):
+    """Requires the argon2-cffi package."""
+
+    @property
+    def time_cost(self):
+        return _params('argon2').get('time_cost', Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return _params('argon2').get('memory_cost', Argon2PasswordHasher.memory_cost)
+
+    @property
+    def parallelism(self):
+        return _params('argon2').get('parallelism', Argon2PasswordHasher.parallelism)
+
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash',
+        )
+    return _executor
+
+
+def _call(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_hashing(func, *args, **kwargs):
+    """
+    Call ``func`` on a bounded pool of PASSWORD_HASH_WORKERS threads.
+
+    The sync_to_async default runs everything on the single thread shared by
+    all sync code under ASGI, so one slow hash stalls every other sync call.
+    The hashlib primitives release the GIL, so a small pool hashes passwords
+    in parallel without blocking the event loop.
+    """
+    return await sync_to_async(_call, thread_sensitive=False, executor=_get_executor())(
+        func, args, kwargs
+    )
+
+
+async def aauthenticate(request=None, **credentials):
+    """authenticate() through run_hashing, for the async login view."""
+    return await run_hashing(authenticate, request, **credentials)
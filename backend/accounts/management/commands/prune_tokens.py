@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+def prune_expired_tokens(batch_size=1000):
+    """
+    Delete expired outstanding tokens and their blacklist entries in batches,
+    so no single transaction locks the tables for long. Returns the number of
+    outstanding tokens removed.
+    """
+    now = timezone.now()
+    removed = 0
+    while True:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=now)
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return removed
+        with transaction.atomic():
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            removed += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete expired outstanding and blacklisted JWTs in batches. Unlike "
+        "flushexpiredtokens this never deletes everything in one statement."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        removed = prune_expired_tokens(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {removed} expired tokens"))
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:29
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# Admin user search (search_fields = email, username) filters with icontains,
+# i.e. UPPER(column) LIKE UPPER('%term%') on PostgreSQL. Trigram indexes on
+# those expressions serve both substring and prefix searches. SQLite has no
+# equivalent, so there the search keeps scanning.
+TRIGRAM_INDEXES = {
+    'customuser_email_trgm': 'email',
+    'customuser_username_trgm': 'username',
+}
+
+
+def check_duplicate_emails(apps, schema_editor):
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    duplicates = list(
+        CustomUser.objects.using(schema_editor.connection.alias)
+        .values(email_lower=Lower('email')).annotate(count=Count('id')).filter(count__gt=1)
+        .values_list('email_lower', flat=True)[:20]
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Emails that differ only in case must be merged before the case-insensitive "
+            f"unique constraint can be added: {', '.join(duplicates)}"
+        )
+
+
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON accounts_customuser USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_alter_customuser_first_name_and_more'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_emails, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='customuser_email_ci_unique'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
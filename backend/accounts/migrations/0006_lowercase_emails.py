@@ -0,0 +1,41 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:35
+
+import accounts.models
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def lowercase_emails(apps, schema_editor):
+    """Store every email lowercased, a batch of users per transaction."""
+    CustomUser = apps.get_model('accounts', 'CustomUser')
+    users = CustomUser.objects.using(schema_editor.connection.alias)
+    last_pk = 0
+    while batch := list(users.filter(pk__gt=last_pk).order_by('pk').values_list('pk', 'email')[:BATCH_SIZE]):
+        last_pk = batch[-1][0]
+        changed = [
+            CustomUser(pk=pk, email=email.strip().lower())
+            for pk, email in batch if email != email.strip().lower()
+        ]
+        users.bulk_update(changed, ['email'])
+
+
+class Migration(migrations.Migration):
+    # Each batch commits on its own, so a large table is not rewritten in one
+    # long transaction; rerunning after an interruption only rewrites the
+    # rows still to change.
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0005_email_ci_unique_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', accounts.models.CustomUserManager()),
+            ],
+        ),
+        migrations.RunPython(lowercase_emails, migrations.RunPython.noop),
+    ]
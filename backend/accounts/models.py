@@ -1,5 +1,25 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.db.models.functions import Lower
+from django.contrib.auth.models import AbstractUser, UserManager
+
+
+class CustomUserManager(UserManager):
+    @classmethod
+    def normalize_email(cls, email):
+        """Emails are stored lowercased in full, not just the domain."""
+        return (email or "").strip().lower()
+
+    def by_email(self, email):
+        # Matches the expression of customuser_email_ci_unique, so this is one
+        # index lookup even for rows stored before emails were normalized.
+        return self.alias(email_lower=Lower("email")).filter(email_lower=self.normalize_email(email))
+
+    def get_by_email(self, email):
+        return self.by_email(email).get()
+
+    def get_by_natural_key(self, email):
+        return self.get_by_email(email)
+
 
 class CustomUser(AbstractUser):
     email = models.EmailField(unique=True)
@@ -14,6 +34,15 @@ class CustomUser(AbstractUser):
     ]
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
 
+    objects = CustomUserManager()
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Emails differing only in case are the same address. The index
+            # also serves case-insensitive lookups on Lower("email").
+            models.UniqueConstraint(Lower('email'), name='customuser_email_ci_unique'),
+        ]
+
     def __str__(self) -> str:
         return f"{self.first_name} {self.last_name} ({self.email})"
 
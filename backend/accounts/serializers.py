@@ -1,6 +1,11 @@
 from .models import CustomUser
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .tokens import ClaimsRefreshToken
+from backend.instrumentation import timed
 
 class CustomUserSerializer(serializers.ModelSerializer):
     full_name = serializers.CharField(read_only=True)
@@ -9,6 +14,33 @@ class CustomUserSerializer(serializers.ModelSerializer):
         model = CustomUser
         fields = ("id", "username", "email", "first_name", "last_name", "full_name")
 
+    # Read-only fast path for lists: plain dicts built from .values() rows,
+    # equal to what to_representation() returns for the same users.
+    value_fields = ("id", "username", "email", "first_name", "last_name")
+
+    @classmethod
+    def from_values(cls, row, prefix=""):
+        """Represent a ``.values(*value_fields)`` row; ``prefix`` is e.g. ``"teacher__"``."""
+        first_name = row[prefix + "first_name"]
+        last_name = row[prefix + "last_name"]
+        return {
+            "id": row[prefix + "id"],
+            "username": row[prefix + "username"],
+            "email": row[prefix + "email"],
+            "first_name": first_name,
+            "last_name": last_name,
+            "full_name": f"{first_name} {last_name}".strip(),
+        }
+
+    @classmethod
+    def represent_values(cls, rows):
+        with timed("serialize"):
+            return [cls.from_values(row) for row in rows]
+
+    def to_representation(self, instance):
+        with timed("serialize"):
+            return super().to_representation(instance)
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password1 = serializers.CharField(write_only=True)
     password2 = serializers.CharField(write_only=True)
@@ -20,10 +52,17 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
                  "password1", "password2", "role")
         extra_kwargs = {
             "password": {"write_only": True},
+            "email": {"validators": []},
             "first_name": {"required": True},
             "last_name": {"required": True}
         }
 
+    def validate_email(self, value):
+        # Replaces the field's unique validator, which compares the address as typed.
+        if CustomUser.objects.by_email(value).exists():
+            raise serializers.ValidationError("user with this email already exists.")
+        return CustomUser.objects.normalize_email(value)
+
     def validate(self, attrs):
         if attrs['password1'] != attrs['password2']:
             raise serializers.ValidationError("Passwords do not match!")
@@ -55,3 +94,31 @@ class UserLoginSerializer(serializers.Serializer):
         if user and user.is_active:
             return user
         raise serializers.ValidationError("Incorrect Credentials!")
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that re-reads the user: deleted or deactivated accounts are
+    refused, and the new tokens carry the claims as they are now rather than
+    as they were at login.
+    """
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = CustomUser.objects.filter(
+            **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+        ).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed("No active account found for the given credentials", "no_active_account")
+        refresh.set_claims(user)
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.mail import send_mail
+
+from tasks.queue import task
+
+from .management.commands.prune_tokens import prune_expired_tokens
+from .models import CustomUser
+
+
+@task
+def send_welcome_email(user_id):
+    user = CustomUser.objects.filter(pk=user_id).only('email', 'first_name').first()
+    if user is None:
+        return None
+    send_mail(
+        "Welcome to LMS",
+        f"Hi {user.first_name or user.email},\n\nYour account is ready. Sign in with {user.email}.\n",
+        None,
+        [user.email],
+    )
+    return {"sent_to": user.email}
+
+
+@task(every=timedelta(hours=1))
+def prune_tokens():
+    return {"removed": prune_expired_tokens()}
@@ -1,3 +1,372 @@
-from django.test import TestCase
+import importlib
+import io
+import json
+import time
+from types import SimpleNamespace
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from .blacklist import BloomFilter, blacklist_filter
+from .models import CustomUser
+from .tokens import ClaimsRefreshToken
+
+
+class StatelessAuthenticationTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='ada@example.com', username='ada', password='password123',
+            first_name='Ada', last_name='Lovelace', role='teacher',
+        )
+
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_issues_claims(self):
+        response = self.client.post(
+            reverse('login-user'), {'email': 'ada@example.com', 'password': 'password123'},
+        )
+        self.assertEqual(response.status_code, 200)
+        access = ClaimsRefreshToken(response.data['tokens']['refresh']).access_token
+        self.assertEqual(access['role'], 'teacher')
+        self.assertEqual(access['first_name'], 'Ada')
+
+    def test_user_info_served_from_token(self):
+        self.authorize(ClaimsRefreshToken.for_user(self.user).access_token)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user-info'))
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data['full_name'], 'Ada Lovelace')
+        self.assertEqual(response.data['id'], self.user.pk)
+
+    def test_class_list_skips_user_query(self):
+        self.authorize(ClaimsRefreshToken.for_user(self.user).access_token)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('class-list'))
+        self.assertEqual(response.status_code, 200)
+        # Only the class query itself; the user comes from the token.
+        self.assertEqual(len(queries), 1)
+
+    def test_writes_work_with_token_user(self):
+        self.authorize(ClaimsRefreshToken.for_user(self.user).access_token)
+        response = self.client.post(reverse('class-list'), {'name': 'Algebra'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['teacher']['id'], self.user.pk)
+
+    def test_other_attributes_load_row_lazily(self):
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from .authentication import ClaimsUser
+
+        # Tokens issued without claims still work, at the cost of one query.
+        user = ClaimsUser(RefreshToken.for_user(self.user).access_token)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(user.role, 'teacher')
+            self.assertEqual(user.date_joined, self.user.date_joined)
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(user, self.user)
+
+    def test_deleted_user_is_unauthorized(self):
+        from rest_framework_simplejwt.exceptions import AuthenticationFailed
+        from .authentication import ClaimsUser
+
+        user = ClaimsUser(ClaimsRefreshToken.for_user(self.user).access_token)
+        self.user.delete()
+        # Claims are still served from the token; anything needing the row fails as a 401.
+        self.assertEqual(user.role, 'teacher')
+        with self.assertRaises(AuthenticationFailed) as failure:
+            user.date_joined
+        self.assertEqual(failure.exception.detail['code'], 'user_not_found')
+        self.assertEqual(failure.exception.status_code, 401)
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        blacklist_filter.reset()
+        self.user = CustomUser.objects.create_user(
+            email='grace@example.com', username='grace', password=None,
+            first_name='Grace', last_name='Hopper',
+        )
+
+    def refresh(self, token):
+        return self.client.post(reverse('token-refresh'), {'refresh': str(token)})
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_refresh_skips_blacklist_query(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        blacklist_filter.might_contain('warm-up')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        # Rotation still blacklists the old token; only the lookup by JTI is skipped.
+        self.assertFalse(any(
+            q['sql'].startswith('SELECT') and 'FROM "token_blacklist_blacklistedtoken" INNER JOIN' in q['sql']
+            for q in queries
+        ))
+
+    def test_rotated_token_is_rejected(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(token).status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_blacklisted_elsewhere_is_picked_up_on_sync(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        blacklist_filter.might_contain('warm-up')
+        outstanding = OutstandingToken.objects.get(jti=token['jti'])
+        BlacklistedToken.objects.create(token=outstanding)
+        with self.settings(TOKEN_BLACKLIST_FILTER={**settings.TOKEN_BLACKLIST_FILTER, 'SYNC_INTERVAL': 0}):
+            self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_refresh_reloads_claims(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        CustomUser.objects.filter(pk=self.user.pk).update(role='teacher', first_name='Amazing')
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        refresh = ClaimsRefreshToken(response.data['refresh'])
+        for issued in (refresh, refresh.access_token):
+            self.assertEqual(issued['role'], 'teacher')
+            self.assertEqual(issued['first_name'], 'Amazing')
+
+    def test_refresh_rejects_inactive_or_deleted_user(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'no_active_account')
+        token = ClaimsRefreshToken.for_user(self.user)
+        self.user.delete()
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_sync_picks_up_rows_committed_out_of_order(self):
+        first, second = ClaimsRefreshToken.for_user(self.user), ClaimsRefreshToken.for_user(self.user)
+        outstanding = {o.jti: o for o in OutstandingToken.objects.all()}
+        with self.settings(TOKEN_BLACKLIST_FILTER={**settings.TOKEN_BLACKLIST_FILTER, 'SYNC_INTERVAL': 0}):
+            BlacklistedToken.objects.create(id=10, token=outstanding[second['jti']])
+            self.assertTrue(blacklist_filter.might_contain(second['jti']))
+            # A lower id committing after the filter has already seen id 10.
+            BlacklistedToken.objects.create(id=5, token=outstanding[first['jti']])
+            self.assertTrue(blacklist_filter.might_contain(first['jti']))
+            self.assertEqual(self.refresh(first).status_code, 401)
+
+    def test_prune_tokens(self):
+        token = ClaimsRefreshToken.for_user(self.user)
+        token.blacklist()
+        ClaimsRefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=token['jti']).update(expires_at=timezone.now())
+        call_command('prune_tokens', '--batch-size', '1', stdout=io.StringIO())
+        self.assertEqual(OutstandingToken.objects.count(), 1)
+        self.assertEqual(BlacklistedToken.objects.count(), 0)
+
+
+FAST_HASHING = {
+    'pbkdf2': {'iterations': 1000},
+    'scrypt': {'work_factor': 2 ** 10, 'block_size': 8, 'parallelism': 1},
+}
+
+
+def throttle_rates(**rates):
+    """Enable throttling with ``rates`` (scope names use underscores) for a test."""
+    return override_settings(THROTTLE_ENABLED=True, REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {
+            **settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'],
+            **{scope.replace('_', '-'): rate for scope, rate in rates.items()},
+        },
+    })
+
+
+@override_settings(PASSWORD_HASHER_PARAMS=FAST_HASHING)
+class ThrottleTests(APITestCase):
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+
+    def login(self, email, address='10.0.0.1'):
+        return self.client.post(reverse('login-user'), {'email': email, 'password': 'wrong'}, REMOTE_ADDR=address)
+
+    @throttle_rates(login_account='3/min')
+    def test_failed_logins_per_account(self):
+        for _ in range(3):
+            self.assertEqual(self.login('ada@example.com').status_code, 400)
+        response = self.login(' ADA@example.com', address='10.0.0.2')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn(int(response['Retry-After']), range(1, 21))
+        self.assertEqual(self.login('bob@example.com').status_code, 400)
+
+    @throttle_rates(login_ip='2/min')
+    def test_logins_per_address_refill(self):
+        from unittest import mock
+        self.assertEqual(self.login('a@example.com').status_code, 400)
+        self.assertEqual(self.login('b@example.com').status_code, 400)
+        self.assertEqual(self.login('c@example.com').status_code, 429)
+        self.assertEqual(self.login('c@example.com', address='10.0.0.2').status_code, 400)
+        now = time.time()
+        with mock.patch('backend.throttling.time.time', return_value=now + 31):
+            self.assertEqual(self.login('c@example.com').status_code, 400)
+            self.assertEqual(self.login('c@example.com').status_code, 429)
+
+    @throttle_rates(register_ip='1/hour')
+    def test_registration_per_address(self):
+        url = reverse('register-user')
+        self.assertEqual(self.client.post(url, {}).status_code, 400)
+        response = self.client.post(url, {})
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '3600'))
+
+    def test_disabled(self):
+        for _ in range(15):
+            self.assertEqual(self.login('ada@example.com').status_code, 400)
+
+
+@override_settings(PASSWORD_HASHER_PARAMS=FAST_HASHING)
+class PasswordHashingTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='alan@example.com', username='alan', password='password123',
+            first_name='Alan', last_name='Turing',
+        )
+
+    def login(self):
+        return self.client.post(reverse('login-user'), {'email': 'alan@example.com', 'password': 'password123'})
+
+    def test_cost_change_rehashes_on_login(self):
+        self.assertIn('$1000$', self.user.password)
+        with self.settings(PASSWORD_HASHER_PARAMS={**FAST_HASHING, 'pbkdf2': {'iterations': 2000}}):
+            self.assertEqual(self.login().status_code, 200)
+        self.user.refresh_from_db()
+        self.assertIn('$2000$', self.user.password)
+
+    def test_hasher_change_rehashes_on_login(self):
+        hashers = ['accounts.hashers.TunedScryptPasswordHasher', 'accounts.hashers.TunedPBKDF2PasswordHasher']
+        with self.settings(PASSWORD_HASHERS=hashers):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith('scrypt$1024$'))
+            self.assertEqual(self.login().status_code, 200)
+
+
+@override_settings(PASSWORD_HASHER_PARAMS=FAST_HASHING)
+class EmailNormalizationTests(APITestCase):
+    def register(self, email, username):
+        return self.client.post(reverse('register-user'), {
+            'email': email, 'username': username, 'first_name': 'Ada', 'last_name': 'Lovelace',
+            'password1': 'password123', 'password2': 'password123',
+        })
+
+    def login(self, email):
+        return self.client.post(reverse('login-user'), {'email': email, 'password': 'password123'})
+
+    def test_registration_queues_welcome_email(self):
+        from django.core import mail
+        from tasks.queue import run_pending
+
+        self.assertEqual(self.register('ada@example.com', 'ada').status_code, 201)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(mail.outbox[0].to, ['ada@example.com'])
+
+    def test_registration_stores_lowercase(self):
+        self.assertEqual(self.register(' Ada@Example.COM ', 'ada').status_code, 201)
+        self.assertTrue(CustomUser.objects.filter(email='ada@example.com').exists())
+        response = self.register('ADA@example.com', 'ada2')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', response.json())
+
+    def test_login_in_any_case_is_one_lookup(self):
+        CustomUser.objects.create_user(email='Ada@Example.com', username='ada', password='password123')
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.login('ADA@example.COM').status_code, 200)
+        lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'accounts_customuser' in q['sql']]
+        self.assertEqual(len(lookups), 1)
+        self.assertIn('LOWER(', lookups[0])
+        self.assertEqual(self.login('nobody@example.com').status_code, 400)
+
+    def test_backfill_lowercases_existing_rows(self):
+        # Rows written before normalization, bypassing the manager.
+        CustomUser.objects.bulk_create([
+            CustomUser(email='Ada@Example.com', username='ada'),
+            CustomUser(email='bob@example.com', username='bob'),
+        ])
+        user = CustomUser.objects.get(username='ada')
+        user.set_password('password123')
+        user.save()
+        self.assertEqual(self.login('ada@example.com').status_code, 200)
+
+        migration = importlib.import_module('accounts.migrations.0006_lowercase_emails')
+        migration.lowercase_emails(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(
+            sorted(CustomUser.objects.values_list('email', flat=True)), ['ada@example.com', 'bob@example.com'],
+        )
+
+
+@override_settings(PASSWORD_HASHER_PARAMS=FAST_HASHING)
+class AsyncLoginTests(TransactionTestCase):
+    def setUp(self):
+        CustomUser.objects.create_user(
+            email='edsger@example.com', username='edsger', password='password123',
+            first_name='Edsger', last_name='Dijkstra', role='student',
+        )
+
+    async def post(self, body, view=None, headers=None):
+        from .async_views import AsyncUserLoginView
+        request = AsyncRequestFactory().post('/', body, content_type='application/json', headers=headers)
+        response = await (view or AsyncUserLoginView).as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_async_login(self):
+        status, data = await self.post({'email': 'edsger@example.com', 'password': 'password123'})
+        self.assertEqual(status, 200)
+        self.assertEqual(data['role'], 'student')
+        self.assertEqual(set(data['tokens']), {'refresh', 'access'})
+
+        status, data = await self.post({'email': 'edsger@example.com', 'password': 'wrong'})
+        self.assertEqual((status, data), (400, {'non_field_errors': ['Incorrect Credentials!']}))
+        status, data = await self.post({'email': 'edsger@example.com'})
+        self.assertEqual((status, data), (400, {'password': ['This field is required.']}))
+
+    async def test_async_login_throttled(self):
+        await sync_to_async(caches[settings.THROTTLE_CACHE].clear)()
+        with throttle_rates(login_account='1/min'):
+            status, _ = await self.post({'email': 'edsger@example.com', 'password': 'wrong'})
+            self.assertEqual(status, 400)
+            from .async_views import AsyncUserLoginView
+            request = AsyncRequestFactory().post(
+                '/', {'email': 'edsger@example.com', 'password': 'wrong'}, content_type='application/json',
+            )
+            response = await AsyncUserLoginView.as_view()(request)
+        self.assertEqual((response.status_code, response['Retry-After']), (429, '60'))
+        self.assertIn('throttled', json.loads(response.content)['detail'])
+
+    async def test_async_register_info_and_logout(self):
+        from .async_views import AsyncUserInfoView, AsyncUserLogoutView, AsyncUserRegistrationView
+        status, data = await self.post({
+            'username': 'grace', 'email': 'grace@example.com', 'first_name': 'Grace', 'last_name': 'Hopper',
+            'password1': 'password123', 'password2': 'password123', 'role': 'teacher',
+        }, AsyncUserRegistrationView)
+        self.assertEqual((status, data['role']), (201, 'teacher'))
+        status, errors = await self.post({'username': 'grace', 'email': 'grace@example.com'}, AsyncUserRegistrationView)
+        self.assertEqual(status, 400)
+        self.assertIn('email', errors)
+
+        headers = {'Authorization': f"Bearer {data['tokens']['access']}"}
+        request = AsyncRequestFactory().get('/', headers=headers)
+        response = await AsyncUserInfoView.as_view()(request)
+        self.assertEqual(json.loads(response.content)['email'], 'grace@example.com')
+
+        status, body = await self.post({'refresh': data['tokens']['refresh']}, AsyncUserLogoutView, headers)
+        self.assertEqual((status, body), (200, {'detail': 'Successfully logged out'}))
+        status, body = await self.post({'refresh': data['tokens']['refresh']}, AsyncUserLogoutView, headers)
+        self.assertEqual(status, 401)
@@ -0,0 +1,15 @@
+from backend.throttling import BodyFieldThrottle, IPThrottle
+
+
+class LoginIPThrottle(IPThrottle):
+    scope = 'login-ip'
+
+
+class LoginAccountThrottle(BodyFieldThrottle):
+    # Attempts against one account from any number of addresses.
+    scope = 'login-account'
+    field = 'email'
+
+
+class RegisterIPThrottle(IPThrottle):
+    scope = 'register-ip'
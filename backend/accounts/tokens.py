@@ -0,0 +1,38 @@
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import blacklist_filter
+
+# Profile fields copied into every token, enough to serve most requests
+# without loading the user (see accounts.authentication.ClaimsUser).
+USER_CLAIMS = ("role", "username", "email", "first_name", "last_name", "is_staff")
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token that carries USER_CLAIMS. Access tokens derived from it
+    copy the claims along; ClaimsTokenRefreshSerializer rewrites them from
+    the user's row on every refresh.
+
+    Blacklist checks go through the in-memory blacklist_filter first and
+    only reach the database when the filter reports a possible match.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_claims(user)
+        return token
+
+    def set_claims(self, user):
+        for claim in USER_CLAIMS:
+            self[claim] = getattr(user, claim)
+
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        return result
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path, include
 from .views import *
 from rest_framework_simplejwt.views import TokenRefreshView
@@ -9,3 +10,16 @@ urlpatterns = [
     path("token/refresh/", TokenRefreshView.as_view(), name="token-refresh"),
     path("user/", UserInfoAPIView.as_view(), name="user-info"),
 ]
+
+if settings.ASYNC_API:
+    from .async_views import (
+        AsyncUserInfoView, AsyncUserLoginView, AsyncUserLogoutView, AsyncUserRegistrationView,
+    )
+
+    # Matched before the DRF views above, which keep the URL names.
+    urlpatterns = [
+        path("register/", AsyncUserRegistrationView.as_view()),
+        path("login/", AsyncUserLoginView.as_view()),
+        path("logout/", AsyncUserLogoutView.as_view()),
+        path("user/", AsyncUserInfoView.as_view()),
+    ] + urlpatterns
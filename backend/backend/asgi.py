@@ -2,6 +2,8 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP requests go to Django; WebSocket connections (live class rosters) are
+routed by backend/websockets.py.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
@@ -12,5 +14,17 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+# Under ASGI, serve the async views so that slow work such as password
+# hashing runs on bounded thread pools instead of the shared sync thread.
+os.environ.setdefault('ASYNC_API', '1')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported once get_asgi_application() has set Django up.
+from backend.websockets import websocket_application  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
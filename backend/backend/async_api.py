@@ -0,0 +1,128 @@
+"""
+Plumbing shared by the async (ASGI-native) views.
+
+AsyncAPIView is a plain Django View with async handlers. It authenticates
+with the DRF authentication classes, checks roles, and returns errors with
+the same bodies and status codes as DRF, so clients cannot tell whether a
+sync or an async view served a request.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.utils.decorators import classonlymethod
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from accounts.tokens import USER_CLAIMS
+
+
+class APIError(Exception):
+    """Raised inside a handler to return ``body`` with ``status``."""
+
+    def __init__(self, body, status):
+        super().__init__(body)
+        self.body = body
+        self.status = status
+
+
+def error_body(exc):
+    detail = exc.detail
+    return detail if isinstance(detail, (list, dict)) else {"detail": detail}
+
+
+def parse_json(request):
+    """Return the JSON object in the request body, or raise a 400 APIError."""
+    try:
+        data = json.loads(request.body or b'{}')
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise APIError({"detail": f"JSON parse error - {exc}"}, 400)
+    if not isinstance(data, dict):
+        raise APIError({"detail": "Expected a JSON object."}, 400)
+    return data
+
+
+async def aauthenticate_request(request):
+    """
+    Run the configured DRF authentication classes and return the user or None.
+
+    JWTStatelessUserAuthentication only decodes the token, so it runs on the
+    event loop; anything that may query the database goes through
+    sync_to_async. A user already authenticated for the request, as for
+    the sub-requests of /api/batch/ (DRF's ``_force_auth_user``), is taken
+    as is.
+    """
+    forced_user = getattr(request, '_force_auth_user', None)
+    if forced_user is not None:
+        return forced_user
+    for auth_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = auth_class()
+        if isinstance(authenticator, JWTStatelessUserAuthentication):
+            result = authenticator.authenticate(request)
+            if result is not None and not all(claim in result[1] for claim in USER_CLAIMS):
+                # Tokens issued before claims were added need the user row.
+                await sync_to_async(lambda: result[0].instance)()
+        else:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        if result is not None:
+            return result[0]
+    return None
+
+
+class AsyncAPIView(View):
+    # Roles allowed to call the view; None allows any authenticated user.
+    roles = None
+    authentication_required = True
+    # DRF throttle classes, checked after authentication as on DRF views.
+    throttle_classes = ()
+
+    @classonlymethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            if self.authentication_required:
+                await self.check_permissions(request)
+            if self.throttle_classes:
+                await sync_to_async(self.check_throttles)(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except APIError as exc:
+            return JsonResponse(exc.body, status=exc.status, safe=False)
+        except exceptions.APIException as exc:
+            response = JsonResponse(error_body(exc), status=exc.status_code, safe=False)
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                response['WWW-Authenticate'] = 'Bearer realm="api"'
+            if getattr(exc, 'wait', None):
+                response['Retry-After'] = '%d' % exc.wait
+            return response
+        except Http404 as exc:
+            return JsonResponse(error_body(exceptions.NotFound(*exc.args)), status=404)
+
+    async def check_permissions(self, request):
+        request.user = await aauthenticate_request(request)
+        if request.user is None:
+            raise exceptions.NotAuthenticated()
+        if self.roles is not None and request.user.role not in self.roles:
+            raise exceptions.PermissionDenied()
+
+    def check_throttles(self, request):
+        waits = [
+            throttle.wait() for throttle in (cls() for cls in self.throttle_classes)
+            if not throttle.allow_request(request, self)
+        ]
+        if waits:
+            raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+    def drf_request(self, request):
+        """Wrap ``request`` for DRF helpers such as the paginators."""
+        drf_request = Request(request)
+        drf_request.user = request.user
+        return drf_request
+
+    async def paginate_queryset(self, paginator, queryset, request):
+        return await sync_to_async(paginator.paginate_queryset)(queryset, self.drf_request(request), view=self)
@@ -0,0 +1,196 @@
+"""
+``POST /api/batch/``: several API calls in one round-trip.
+
+The body lists sub-requests to API routes::
+
+    {"requests": [
+        {"path": "/api/accounts/user/"},
+        {"path": "/api/classes/?fields=id,name"},
+        {"method": "POST", "path": "/api/student/join-class/", "body": {"code": "ABC123"}},
+        {"path": "/api/classes/<id>/", "headers": {"If-None-Match": "..."}}
+    ]}
+
+and the response carries one entry per sub-request, in order, each with
+the status, body and caching headers the route would have returned on its
+own::
+
+    {"responses": [{"status": 200, "headers": {"ETag": "..."}, "body": {...}}, ...]}
+
+The batch authenticates once; every sub-request runs as that user without
+decoding the token again, and skips the middleware the batch already went
+through. Sub-requests that fail do not fail the batch.
+
+Consecutive GETs are independent and run concurrently on up to
+BATCH_READ_WORKERS threads, each with its own database connection. Any
+other method is a barrier: it runs alone, after the reads before it and
+before the ones after it, so reads see the batch's earlier writes. Writes
+are not atomic as a group. Reads run one at a time while a transaction is
+open (ATOMIC_REQUESTS, tests), since other connections cannot see its rows.
+"""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connections
+from django.urls import Resolver404, resolve, reverse
+from rest_framework import serializers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .instrumentation import in_request_context
+
+# Response headers passed through to the sub-response.
+FORWARDED_HEADERS = ('ETag', 'Last-Modified', 'Location', 'Retry-After', 'Cache-Control')
+# Request headers that sub-requests take from the batch request and cannot set.
+SHARED_HEADERS = {'AUTHORIZATION', 'COOKIE', 'HOST'}
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+
+    def validate_path(self, value):
+        path = urlsplit(value).path
+        if not path.startswith('/api/'):
+            raise serializers.ValidationError("Only /api/ paths can be batched.")
+        if path == reverse('batch'):
+            raise serializers.ValidationError("Batches cannot be nested.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f"Ensure this field has no more than {settings.BATCH_MAX_REQUESTS} elements."
+            )
+        return value
+
+
+# One pool per BATCH_READ_WORKERS value, so that overriding the setting takes effect.
+_executors = {}
+
+
+def _get_executor():
+    workers = settings.BATCH_READ_WORKERS
+    if workers not in _executors:
+        _executors[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch')
+    return _executors[workers]
+
+
+def build_request(parent, user, sub):
+    """A request for ``sub`` carrying the batch request's user and environment."""
+    url = urlsplit(sub['path'])
+    body = json.dumps(sub['body']).encode() if 'body' in sub else b''
+    # Conditional headers belong to the batch request, not to each sub-request.
+    environ = {key: value for key, value in parent.META.items() if not key.startswith('HTTP_IF_')}
+    environ.update({
+        'REQUEST_METHOD': sub['method'],
+        'PATH_INFO': url.path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json' if body else '',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': BytesIO(body),
+    })
+    for name, value in sub.get('headers', {}).items():
+        key = name.upper().replace('-', '_')
+        if key not in SHARED_HEADERS:
+            environ[f'HTTP_{key}'] = value
+    request = WSGIRequest(environ)
+    # Authenticated once for the whole batch (DRF's forced authentication).
+    request.user = request._force_auth_user = user
+    request._force_auth_token = getattr(parent, 'auth', None)
+    request._dont_enforce_csrf_checks = True
+    return request
+
+
+def run_subrequest(parent, user, sub):
+    request = build_request(parent, user, sub)
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return {'status': 404, 'headers': {}, 'body': {'detail': 'Not found.'}}
+    request.resolver_match = match
+    view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+    # Exceptions become the responses Django would have sent (404, 500...).
+    response = convert_exception_to_response(
+        lambda request: view(request, *match.args, **match.kwargs)
+    )(request)
+    return {
+        'status': response.status_code,
+        'headers': {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)},
+        'body': response_body(response),
+    }
+
+
+def response_body(response):
+    if response.streaming:
+        response.close()
+        return {'detail': 'Streaming responses cannot be batched.'}
+    if isinstance(response, Response) and not response.is_rendered and response.data is not None:
+        # Not rendered yet: hand the data to the batch's own renderer.
+        return response.data
+    if hasattr(response, 'render'):
+        response.render()
+    if not response.content:
+        return None
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(response.charset)
+
+
+def _run_read(parent, user, sub):
+    try:
+        return run_subrequest(parent, user, sub)
+    finally:
+        close_old_connections()
+
+
+def parallel_reads_allowed():
+    return settings.BATCH_READ_WORKERS > 1 and not any(
+        connection.in_atomic_block for connection in connections.all(initialized_only=True)
+    )
+
+
+def run_batch(parent, user, subrequests):
+    """Run ``subrequests`` in order, consecutive GETs concurrently; returns their results."""
+    results = []
+    reads = []
+
+    def flush_reads():
+        if len(reads) > 1 and parallel_reads_allowed():
+            call = in_request_context(_run_read)
+            futures = [_get_executor().submit(call, parent, user, sub) for sub in reads]
+            results.extend(future.result() for future in futures)
+        else:
+            results.extend(run_subrequest(parent, user, sub) for sub in reads)
+        reads.clear()
+
+    for sub in subrequests:
+        if sub['method'] == 'GET':
+            reads.append(sub)
+        else:
+            flush_reads()
+            results.append(run_subrequest(parent, user, sub))
+    flush_reads()
+    return results
+
+
+class BatchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({'responses': run_batch(request, request.user, serializer.validated_data['requests'])})
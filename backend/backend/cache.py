@@ -0,0 +1,40 @@
+"""
+Cache backends with eviction counters, for sizing MAX_ENTRIES.
+"""
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+# Evicted entries per LocMemCache name. Every thread gets its own backend
+# instance, but instances with the same name share storage (and these counts).
+_evictions = {}
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """LocMemCache that counts the entries it culls when full."""
+
+    def __init__(self, name, params):
+        super().__init__(name, params)
+        self._name = name
+        _evictions.setdefault(name, 0)
+
+    def _cull(self):
+        # Called with the lock held.
+        size = len(self._cache)
+        super()._cull()
+        _evictions[self._name] += size - len(self._cache)
+
+    @property
+    def evictions(self):
+        return _evictions[self._name]
+
+
+def evictions(cache):
+    """
+    Entries evicted for lack of space, or None if the backend cannot tell.
+    For Redis this is the server-wide ``evicted_keys`` statistic.
+    """
+    if isinstance(cache, InstrumentedLocMemCache):
+        return cache.evictions
+    if isinstance(cache, RedisCache):
+        return cache._cache.get_client(write=False).info('stats').get('evicted_keys')
+    return None
@@ -0,0 +1,116 @@
+"""
+Primary/replica routing for the API (enabled by DATABASE_REPLICA_URLS).
+
+Reads go to a random replica only inside a request handled by
+ReplicaStickinessMiddleware, and only while the request is not pinned to the
+primary. A request is pinned when:
+
+- its method is unsafe (POST, PUT, PATCH, DELETE);
+- it has already written, so it reads back its own writes;
+- a transaction is open on the primary;
+- the same user wrote less than REPLICA_STICKY_SECONDS ago, so a student who
+  just joined a class sees it in their next GET despite replication lag.
+
+Everything outside a request (management commands, migrations, the shell)
+uses the primary.
+"""
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+
+class RequestRouting:
+    __slots__ = ('pinned', 'wrote')
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if (
+            routing is None or routing.pinned or not settings.DATABASE_REPLICAS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.pinned = routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def _pin_key(user_id):
+    return f'db-pin:{user_id}'
+
+
+def request_user_id(request):
+    """The user id in the request's bearer token, without touching the database."""
+    header = request.headers.get('Authorization', '')
+    scheme, _, raw_token = header.partition(' ')
+    if scheme not in api_settings.AUTH_HEADER_TYPES or not raw_token:
+        return None
+    try:
+        return AccessToken(raw_token).get(api_settings.USER_ID_CLAIM)
+    except TokenError:
+        return None
+
+
+class ReplicaStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        user_id = request_user_id(request)
+        sticky = user_id is not None and cache.get(_pin_key(user_id)) is not None
+        routing = RequestRouting(pinned=sticky or request.method not in SAFE_METHODS)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote and user_id is not None:
+            cache.set(_pin_key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        user_id = request_user_id(request)
+        sticky = user_id is not None and await cache.aget(_pin_key(user_id)) is not None
+        routing = RequestRouting(pinned=sticky or request.method not in SAFE_METHODS)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote and user_id is not None:
+            await cache.aset(_pin_key(user_id), 1, settings.REPLICA_STICKY_SECONDS)
+        return response
@@ -0,0 +1,260 @@
+"""
+Per-request performance instrumentation.
+
+InstrumentationMiddleware times every request and breaks it down into:
+
+- ``db``: query count and time, from an execute wrapper installed on every
+  database connection;
+- ``serialize``: building response data (see timed() around serializers);
+- ``render``: encoding it to JSON.
+
+Each response carries the breakdown in a ``Server-Timing`` header, and
+per-endpoint histograms are served in the Prometheus text format by
+metrics_view (``/metrics``) to holders of METRICS_TOKEN and staff users, or
+to anyone with METRICS_PUBLIC on. Metrics are kept per process.
+
+QUERY_COUNT_LOG_THRESHOLD = N logs every request running more than N
+queries, with the statement it repeated most: the signature of an N+1.
+"""
+import logging
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+PHASES = ('db', 'serialize', 'render')
+
+
+class RequestStats:
+    __slots__ = ('queries', 'statements', 'timings', 'depth')
+
+    def __init__(self, record_statements):
+        self.queries = 0
+        # Only kept when the query-count log is on.
+        self.statements = [] if record_statements else None
+        self.timings = dict.fromkeys(PHASES, 0.0)
+        self.depth = 0
+
+
+_stats = ContextVar('request_stats', default=None)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.timings['db'] += time.perf_counter() - start
+        stats.queries += 1
+        if stats.statements is not None:
+            stats.statements.append(sql)
+
+
+def install_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+connection_created.connect(install_wrapper)
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to ``phase`` of the current request; nested blocks count once."""
+    stats = _stats.get()
+    if stats is None or stats.depth:
+        yield
+        return
+    stats.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timings[phase] += time.perf_counter() - start
+        stats.depth -= 1
+
+
+def in_request_context(func):
+    """
+    Wrap ``func`` to run on another thread as part of the current request,
+    with its context variables (replica routing included). Its queries and
+    phase timings are counted apart and added to the request's when it
+    returns, so parallel calls do not share counters.
+    """
+    parent = _stats.get()
+    context = copy_context()
+
+    def call(*args, **kwargs):
+        if parent is None:
+            return context.copy().run(func, *args, **kwargs)
+        child = RequestStats(parent.statements is not None)
+
+        def counted():
+            _stats.set(child)
+            return func(*args, **kwargs)
+        try:
+            # A context can only be entered by one thread at a time.
+            return context.copy().run(counted)
+        finally:
+            with _lock:
+                parent.queries += child.queries
+                if parent.statements is not None:
+                    parent.statements.extend(child.statements)
+                for phase, seconds in child.timings.items():
+                    parent.timings[phase] += seconds
+    return call
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        # labels -> [count per bucket..., +Inf count, sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def expose(self, label_names):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, series in sorted(self.series.items()):
+            label_text = ','.join(
+                f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels)
+            )
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+
+LABELS = ('method', 'endpoint', 'status')
+_lock = Lock()
+_latency = Histogram('http_request_duration_seconds', 'Request latency.', LATENCY_BUCKETS)
+_queries = Histogram('http_request_db_queries', 'Database queries per request.', QUERY_BUCKETS)
+_phases = {
+    phase: Histogram(f'http_request_{phase}_seconds', f'Time per request spent in {phase}.', LATENCY_BUCKETS)
+    for phase in PHASES
+}
+
+
+def _endpoint(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Unmatched paths share one label, so scanners cannot grow the series.
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def _record(request, response, stats, elapsed):
+    labels = (request.method, _endpoint(request), str(response.status_code))
+    with _lock:
+        _latency.observe(labels, elapsed)
+        _queries.observe(labels, stats.queries)
+        for phase, histogram in _phases.items():
+            histogram.observe(labels, stats.timings[phase])
+
+    response['Server-Timing'] = ', '.join(
+        [f'total;dur={elapsed * 1000:.1f}', f'db;dur={stats.timings["db"] * 1000:.1f};desc="{stats.queries} queries"']
+        + [f'{phase};dur={stats.timings[phase] * 1000:.1f}' for phase in PHASES[1:]]
+    )
+
+    threshold = settings.QUERY_COUNT_LOG_THRESHOLD
+    if threshold is not None and stats.queries > threshold:
+        statement, repeats = Counter(stats.statements).most_common(1)[0]
+        logger.warning(
+            "%s %s ran %d queries (%.1f ms); most repeated (%d times): %s",
+            request.method, request.get_full_path(), stats.queries, stats.timings['db'] * 1000, repeats, statement,
+        )
+
+
+class InstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        # Connections opened before the signal receiver was connected.
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats(settings.QUERY_COUNT_LOG_THRESHOLD is not None)
+        token = _stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _stats.reset(token)
+        _record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats(settings.QUERY_COUNT_LOG_THRESHOLD is not None)
+        token = _stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _stats.reset(token)
+        _record(request, response, stats, time.perf_counter() - start)
+        return response
+
+
+def metrics_allowed(request):
+    if settings.METRICS_PUBLIC:
+        return True
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    # A staff user logged in to the admin site.
+    return getattr(request.user, 'is_staff', False)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this process's request metrics and response cache counters."""
+    if not metrics_allowed(request):
+        return HttpResponse(status=401 if settings.METRICS_TOKEN else 403)
+
+    from classes import response_cache
+
+    with _lock:
+        lines = _latency.expose(LABELS) + _queries.expose(LABELS)
+        for histogram in _phases.values():
+            lines += histogram.expose(LABELS)
+    cache = response_cache.stats()
+    for name in ('hits', 'misses', 'stale', 'evictions'):
+        if cache[name] is not None:
+            lines += [f'# TYPE response_cache_{name}_total counter', f'response_cache_{name}_total {cache[name]}']
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,184 @@
+"""
+Publish/subscribe for pushing events to open WebSocket connections.
+
+``get_broker()`` returns the broker configured by the PUBSUB setting.
+``publish(channel, payload)`` can be called from any thread, e.g. from a
+sync view or an on_commit callback. Coroutines on an event loop
+``subscribe(channel)`` and read messages with ``await subscription.get()``.
+
+A payload is encoded to JSON once per publish, however many subscribers
+it reaches, and handed to each event loop with a single
+call_soon_threadsafe. Each subscriber buffers at most ``queue_size`` messages;
+one that falls further behind is cut off (``get()`` returns None and
+``overflowed`` is set) instead of growing without bound, and should
+reconnect and reload what it shows.
+
+InProcessBroker only reaches subscribers in the publishing process, which
+is enough with a single ASGI worker. RedisBroker (needs the redis package)
+relays messages through Redis so that every worker sees them.
+"""
+import asyncio
+import functools
+import json
+import threading
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.module_loading import import_string
+
+
+class Message(NamedTuple):
+    channel: str
+    payload: dict
+    text: str
+
+
+class Subscription:
+    def __init__(self, channel, queue_size):
+        self.channel = channel
+        self.overflowed = False
+        self._queue = asyncio.Queue(queue_size)
+
+    def deliver(self, message):
+        """Buffer ``message``; runs on the subscriber's event loop."""
+        if self.overflowed:
+            return
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.close()
+
+    def close(self):
+        """Make get() return None, after the buffered messages unless the buffer is full."""
+        if self.overflowed or self._queue.full():
+            while not self._queue.empty():
+                self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def get(self):
+        """The next Message, or None once the subscription is closed."""
+        return await self._queue.get()
+
+
+def _fan_out(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class InProcessBroker:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        # channel -> {event loop: set of subscriptions}
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode(payload):
+        return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+    def has_subscribers(self, channel):
+        """False if a publish to ``channel`` would reach nobody, so the payload need not be built."""
+        return channel in self._channels
+
+    def publish(self, channel, payload):
+        self.dispatch(Message(channel, payload, self.encode(payload)))
+
+    def dispatch(self, message):
+        """Hand ``message`` to this process's subscribers of its channel."""
+        with self._lock:
+            loops = [(loop, tuple(subs)) for loop, subs in self._channels.get(message.channel, {}).items()]
+        for loop, subscriptions in loops:
+            try:
+                loop.call_soon_threadsafe(_fan_out, subscriptions, message)
+            except RuntimeError:
+                # The loop was closed; its subscriptions went with it.
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        loop = asyncio.get_running_loop()
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, {}).setdefault(loop, set()).add(subscription)
+        try:
+            await self.subscribed(loop)
+            yield subscription
+        finally:
+            with self._lock:
+                loops = self._channels[channel]
+                loops[loop].discard(subscription)
+                if not loops[loop]:
+                    del loops[loop]
+                if not loops:
+                    del self._channels[channel]
+
+    async def subscribed(self, loop):
+        """Hook run when a subscription is added on ``loop``."""
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for loops in self._channels.values() for subs in loops.values())
+
+
+class RedisBroker(InProcessBroker):
+    """
+    Publishes to Redis; one connection per event loop receives every
+    message under ``prefix`` and dispatches it to the local subscribers.
+    """
+
+    def __init__(self, url, prefix='pubsub:', queue_size=100):
+        import redis
+        import redis.asyncio
+
+        super().__init__(queue_size)
+        self.url = url
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._async_redis = redis.asyncio
+        self._listeners = {}
+
+    def has_subscribers(self, channel):
+        # Subscribers in other processes are invisible from here.
+        return True
+
+    def publish(self, channel, payload):
+        self._client.publish(self.prefix + channel, self.encode(payload))
+
+    async def subscribed(self, loop):
+        listener, ready = self._listeners.get(loop, (None, None))
+        if listener is None or listener.done():
+            ready = loop.create_future()
+            self._listeners[loop] = (loop.create_task(self._listen(ready)), ready)
+        await ready
+
+    async def _listen(self, ready):
+        try:
+            client = self._async_redis.Redis.from_url(self.url)
+            async with client.pubsub() as pubsub:
+                await pubsub.psubscribe(self.prefix + '*')
+                ready.set_result(None)
+                async for item in pubsub.listen():
+                    if item['type'] != 'pmessage':
+                        continue
+                    channel = item['channel'].decode()[len(self.prefix):]
+                    text = item['data'].decode()
+                    if channel in self._channels:
+                        self.dispatch(Message(channel, json.loads(text), text))
+        except Exception as exc:
+            # The next subscription starts a new listener.
+            if not ready.done():
+                ready.set_exception(exc)
+            raise
+
+
+@functools.cache
+def get_broker():
+    config = settings.PUBSUB
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def publish(channel, payload):
+    get_broker().publish(channel, payload)
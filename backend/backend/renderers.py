@@ -0,0 +1,41 @@
+"""
+JSON renderer backed by orjson when it is installed.
+
+With DRF's default JSON settings (UTF-8, compact, strict) its output is
+byte-for-byte what JSONRenderer produces for API payloads: dates and times
+still go through DRF's encoder, and U+2028/U+2029 are escaped the same way.
+Floats are written in shortest form, so an exponent may be spelled
+differently (``1e-5`` rather than ``1e-05``). Indented output (the browsable
+API, ``Accept: application/json; indent=4``) and anything orjson cannot
+encode fall back to JSONRenderer.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if (
+            orjson is None or data is None or self.ensure_ascii or not self.compact or not self.strict
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits.
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
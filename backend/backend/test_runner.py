@@ -0,0 +1,42 @@
+"""
+Test runner for ``manage.py test`` (settings.TEST_RUNNER).
+
+Runs the suite with TEST_OVERRIDES applied, for features that are on by
+default but get in the way of tests that do not exercise them. Tests that
+do turn them back on with override_settings.
+
+It also adds a TEST_REPLICA database alias, a test mirror of the primary,
+so that replica routing can be tested end to end without configuring
+DATABASE_REPLICA_URLS.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_OVERRIDES = {
+    # Test databases reuse primary keys, so cached pages would leak between tests.
+    "RESPONSE_CACHE_ENABLED": False,
+    # Every test request comes from one address.
+    "THROTTLE_ENABLED": False,
+}
+TEST_REPLICA = "replica"
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.overrides = override_settings(**TEST_OVERRIDES)
+        self.overrides.enable()
+
+    def setup_databases(self, **kwargs):
+        if TEST_REPLICA not in connections:
+            primary = connections.settings[DEFAULT_DB_ALIAS]
+            # connections.settings is settings.DATABASES, with defaults filled in.
+            connections.settings[TEST_REPLICA] = dict(
+                primary, TEST=dict(primary["TEST"], MIRROR=DEFAULT_DB_ALIAS),
+            )
+        return super().setup_databases(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        self.overrides.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,256 @@
+import asyncio
+import re
+import threading
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from classes.models import Class
+from . import batch
+from .db_routers import PrimaryReplicaRouter, ReplicaStickinessMiddleware
+from .pubsub import InProcessBroker
+from .test_runner import TEST_REPLICA
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_STICKY_SECONDS=10)
+class ReplicaRoutingTests(SimpleTestCase):
+    router = PrimaryReplicaRouter()
+
+    def setUp(self):
+        cache.clear()
+        token = AccessToken()
+        token['user_id'] = 42
+        self.auth = {'Authorization': f'Bearer {token}'}
+
+    def handle(self, request, write=False):
+        """Run ``request`` through the middleware; return where a read went."""
+        def view(request):
+            if write:
+                self.router.db_for_write(CustomUser)
+            return HttpResponse(self.router.db_for_read(CustomUser))
+        return ReplicaStickinessMiddleware(view)(request).content.decode()
+
+    def test_outside_requests_uses_primary(self):
+        self.assertEqual(self.router.db_for_read(CustomUser), 'default')
+
+    def test_reads_go_to_replica_until_written(self):
+        factory = RequestFactory()
+        self.assertEqual(self.handle(factory.get('/', headers=self.auth)), 'replica1')
+        self.assertEqual(self.handle(factory.post('/', headers=self.auth)), 'default')
+        self.assertEqual(self.handle(factory.get('/', headers=self.auth), write=True), 'default')
+
+    def test_user_sticks_to_primary_after_write(self):
+        factory = RequestFactory()
+        self.handle(factory.post('/', headers=self.auth), write=True)
+        self.assertEqual(self.handle(factory.get('/', headers=self.auth)), 'default')
+        self.assertEqual(self.handle(factory.get('/')), 'replica1')
+        cache.clear()
+        self.assertEqual(self.handle(factory.get('/', headers=self.auth)), 'replica1')
+
+
+
+@override_settings(
+    DATABASE_REPLICAS=[TEST_REPLICA],
+    DATABASE_ROUTERS=['backend.db_routers.PrimaryReplicaRouter'],
+    MIDDLEWARE=[*settings.MIDDLEWARE[:2], 'backend.db_routers.ReplicaStickinessMiddleware', *settings.MIDDLEWARE[2:]],
+)
+class ReplicaRequestTests(TransactionTestCase):
+    """Requests through the full stack, with the test runner's mirror as the replica."""
+    # Committed rows, so that the replica connection sees them.
+    databases = {'default', TEST_REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.teacher = CustomUser.objects.create_user(
+            username='replicateacher', email='replica@example.com', password='x', role='teacher',
+        )
+        Class.objects.create(name='Mirrored', teacher=self.teacher, code='REPL01')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(self.teacher).access_token}')
+
+    def served_by(self, method, path, data=None):
+        """Send the request; return its response and the aliases that ran queries for it."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[TEST_REPLICA]) as replica:
+            response = getattr(self.client, method)(path, data, format='json')
+        aliases = {alias for alias, queries in (('default', primary), (TEST_REPLICA, replica)) if len(queries)}
+        return response, aliases
+
+    def test_reads_go_to_replica_until_user_writes(self):
+        response, aliases = self.served_by('get', '/api/classes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([c['name'] for c in response.data['results']], ['Mirrored'])
+        self.assertEqual(aliases, {TEST_REPLICA})
+
+        response, aliases = self.served_by('post', '/api/classes/', {'name': 'Fresh'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(aliases, {'default'})
+
+        # The writer's next read sticks to the primary and sees its own write.
+        response, aliases = self.served_by('get', '/api/classes/')
+        self.assertEqual(aliases, {'default'})
+        self.assertEqual(len(response.data['results']), 2)
+
+        cache.clear()
+        self.assertEqual(self.served_by('get', '/api/classes/')[1], {TEST_REPLICA})
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', password='x', role='teacher',
+        )
+        for n in range(3):
+            Class.objects.create(name=f'Class {n}', teacher=self.teacher, code=f'TIME0{n}')
+        self.client = APIClient()
+        self.client.force_authenticate(self.teacher)
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/classes/')
+        self.assertEqual(response.status_code, 200)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries", serialize;dur=[\d.]+, render;dur=[\d.]+$')
+        self.assertGreater(int(re.search(r'"(\d+) queries"', timing).group(1)), 0)
+
+    @override_settings(METRICS_PUBLIC=True)
+    def test_metrics_exposes_histograms(self):
+        self.client.get('/api/classes/')
+        body = self.client.get('/metrics').content.decode()
+        for metric in ('http_request_duration_seconds', 'http_request_db_queries', 'http_request_serialize_seconds'):
+            self.assertIn(f'# TYPE {metric} histogram', body)
+        self.assertRegex(body, r'http_request_db_queries_count\{method="GET",endpoint="class-list",status="200"\} [1-9]')
+        self.assertIn('response_cache_hits_total', body)
+
+    def test_metrics_closed_by_default(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        staff = CustomUser.objects.create_user(
+            username='ops', email='ops@example.com', password='x', is_staff=True,
+        )
+        client = APIClient()
+        client.force_login(staff)
+        self.assertEqual(client.get('/metrics').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        response = self.client.get('/metrics', headers={'Authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_count_log(self):
+        with override_settings(QUERY_COUNT_LOG_THRESHOLD=0), self.assertLogs('backend.instrumentation') as logs:
+            self.client.get('/api/classes/')
+        self.assertIn('GET /api/classes/ ran', logs.output[0])
+        self.assertIn('most repeated', logs.output[0])
+
+
+class PubSubTests(SimpleTestCase):
+    async def test_publish_from_another_thread(self):
+        broker = InProcessBroker()
+        async with broker.subscribe('room') as first, broker.subscribe('room') as second:
+            self.assertTrue(broker.has_subscribers('room'))
+            await asyncio.to_thread(broker.publish, 'room', {'n': 1})
+            for subscription in (first, second):
+                message = await asyncio.wait_for(subscription.get(), 5)
+                self.assertEqual((message.payload, message.text), ({'n': 1}, '{"n":1}'))
+        self.assertFalse(broker.has_subscribers('room'))
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_slow_subscriber_is_cut_off(self):
+        broker = InProcessBroker(queue_size=2)
+        async with broker.subscribe('room') as slow:
+            for n in range(3):
+                broker.publish('room', {'n': n})
+            await asyncio.sleep(0)
+            self.assertTrue(slow.overflowed)
+            self.assertIsNone(await slow.get())
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', password='x', first_name='T', role='teacher',
+        )
+        self.student = CustomUser.objects.create_user(
+            username='student', email='student@example.com', password='x', first_name='S', role='student',
+        )
+        self.class_obj = Class.objects.create(name='Batch', teacher=self.teacher, code='BATCH0')
+        self.client = APIClient()
+        token = ClaimsRefreshToken.for_user(self.teacher).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def batch(self, *requests):
+        return self.client.post('/api/batch/', {'requests': list(requests)}, format='json')
+
+    def test_matches_separate_requests(self):
+        paths = ['/api/accounts/user/', '/api/classes/?fields=id,name', f'/api/classes/{self.class_obj.pk}/']
+        response = self.batch(*({'path': path} for path in paths), {'path': '/api/nope/'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['responses']
+        for path, result in zip(paths, results):
+            expected = self.client.get(path)
+            self.assertEqual((result['status'], result['body']), (200, expected.json()))
+        self.assertEqual(results[2]['headers']['ETag'], self.client.get(paths[2])['ETag'])
+        self.assertEqual(results[3]['status'], 404)
+
+        etag = results[2]['headers']['ETag']
+        result = self.batch({'path': paths[2], 'headers': {'If-None-Match': etag}}).json()['responses'][0]
+        self.assertEqual((result['status'], result['body']), (304, None))
+
+    def test_writes_are_barriers(self):
+        token = ClaimsRefreshToken.for_user(self.student).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        results = self.batch(
+            {'path': '/api/student/enrolled-classes/'},
+            {'method': 'POST', 'path': '/api/student/join-class/', 'body': {'code': 'BATCH0'}},
+            {'path': '/api/student/enrolled-classes/'},
+            {'method': 'POST', 'path': f'/api/classes/{self.class_obj.pk}/remove_student/', 'body': {'student_id': 1}},
+        ).json()['responses']
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 403])
+        self.assertEqual(results[0]['body']['results'], [])
+        self.assertEqual([row['id'] for row in results[2]['body']['results']], [str(self.class_obj.pk)])
+
+    def test_validation(self):
+        self.assertEqual(self.batch({'path': '/admin/'}).status_code, 400)
+        self.assertEqual(self.batch({'path': '/api/batch/'}).status_code, 400)
+        self.assertEqual(self.batch().status_code, 400)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            self.assertEqual(self.batch(*[{'path': '/api/classes/'}] * 3).status_code, 400)
+        self.client.credentials()
+        self.assertEqual(self.batch({'path': '/api/classes/'}).status_code, 401)
+
+
+@override_settings(BATCH_READ_WORKERS=3)
+class ParallelBatchTests(TransactionTestCase):
+    databases = '__all__'
+
+    def test_reads_run_on_worker_threads(self):
+        teacher = CustomUser.objects.create_user(
+            username='teacher', email='teacher@example.com', password='x', role='teacher',
+        )
+        class_obj = Class.objects.create(name='Batch', teacher=teacher, code='BATCH1')
+        client = APIClient()
+        client.force_authenticate(teacher)
+        paths = ['/api/accounts/user/', '/api/classes/', f'/api/classes/{class_obj.pk}/']
+        threads = set()
+        run_subrequest = batch.run_subrequest
+
+        def record_thread(*args):
+            threads.add(threading.current_thread().name)
+            return run_subrequest(*args)
+        with mock.patch('backend.batch.run_subrequest', record_thread):
+            response = client.post('/api/batch/', {'requests': [{'path': path} for path in paths]}, format='json')
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith('batch') for name in threads), threads)
+        for path, result in zip(paths, response.json()['responses']):
+            self.assertEqual((result['status'], result['body']), (200, client.get(path).json()))
+        # Queries made on the worker threads count toward the batch request.
+        self.assertGreater(int(re.search(r'"(\d+) queries"', response['Server-Timing']).group(1)), 0)
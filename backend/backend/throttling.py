@@ -0,0 +1,111 @@
+"""
+Token-bucket throttles for the endpoints that are costly or guessable:
+login and registration (a password hash per request) and join by code.
+
+A scope's rate ``"N/period"`` (REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]) is
+a bucket of N tokens that refills at N per period; each request takes one
+token from the bucket of its key (client IP, account, class code...).
+Buckets are ``(tokens, timestamp)`` pairs in ``caches[settings.THROTTLE_CACHE]``,
+a per-process LocMemCache by default and Redis when REDIS_URL is set, and
+expire once they would be full again.
+
+An allowed request costs one cache get and one set per throttle. There is
+no lock: requests racing for the last token may all get it, so a bucket
+can over-admit by the number of concurrent requests for one key.
+"""
+import hashlib
+import json
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache
+def parse_rate(rate):
+    """``"20/min"`` -> ``(20, 60)``, the same format as DRF's throttles."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def body_field(request, name):
+    """String field ``name`` of a DRF request's data or a plain JSON request body."""
+    if isinstance(request, Request):
+        data = request.data
+    else:
+        try:
+            data = json.loads(request.body or b'{}')
+        except (ValueError, UnicodeDecodeError):
+            return None
+    value = data.get(name) if hasattr(data, 'get') else None
+    return value if isinstance(value, str) else None
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Subclasses set ``scope`` and return the bucket key from get_key()."""
+    scope = None
+
+    def get_key(self, request, view):
+        """Identify the bucket for ``request``; None exempts the request."""
+        raise NotImplementedError('.get_key() must be overridden')
+
+    def allow_request(self, request, view):
+        self.delay = None
+        if not settings.THROTTLE_ENABLED:
+            return True
+        key = self.get_key(request, view)
+        if key is None:
+            return True
+        capacity, period = parse_rate(api_settings.DEFAULT_THROTTLE_RATES[self.scope])
+        refill = capacity / period
+        cache = caches[settings.THROTTLE_CACHE]
+        # Keys may hold client input (emails, codes), so they are hashed.
+        digest = hashlib.md5(str(key).encode(), usedforsecurity=False).hexdigest()
+        cache_key = f'throttle:{self.scope}:{digest}'
+        now = time.time()
+        tokens, updated = cache.get(cache_key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        if tokens < 1:
+            self.delay = (1 - tokens) / refill
+            return False
+        tokens -= 1
+        cache.set(cache_key, (tokens, now), (capacity - tokens) / refill)
+        return True
+
+    def wait(self):
+        return self.delay
+
+
+class IPThrottle(TokenBucketThrottle):
+    """One bucket per client address (X-Forwarded-For behind NUM_PROXIES proxies)."""
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class UserThrottle(TokenBucketThrottle):
+    """One bucket per authenticated user."""
+
+    def get_key(self, request, view):
+        user = getattr(request, 'user', None)
+        return user.pk if user is not None and user.is_authenticated else None
+
+
+class BodyFieldThrottle(TokenBucketThrottle):
+    """One bucket per value of the request body's ``field`` (e.g. an email)."""
+    field = None
+
+    def normalize(self, value):
+        return value.strip().lower()
+
+    def get_key(self, request, view):
+        value = body_field(request, self.field)
+        if value:
+            value = self.normalize(value)
+        return value or None
@@ -1,10 +1,16 @@
 from django.contrib import admin
 from django.urls import path, include
 
+from .batch import BatchView
+from .instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("api/accounts/", include("accounts.urls")), 
     path("api/teacher/", include("teacher.urls")),
     path("api/student/", include("student.urls")),
     path("api/classes/", include("classes.urls")),
+    path("api/tasks/", include("tasks.urls")),
+    path("api/batch/", BatchView.as_view(), name="batch"),
+    path("metrics", metrics_view, name="metrics"),
 ]
@@ -0,0 +1,74 @@
+"""
+WebSocket endpoints, routed by backend/asgi.py (HTTP goes to Django).
+
+Browsers cannot set headers on a WebSocket handshake, so clients pass
+their access token as ``?token=``. A rejected connection is accepted and
+then closed with an application code, which, unlike a refused handshake,
+the client can read: 4401 (no valid token), 4403 (not allowed) or 4404
+(no such object). Clients should not reconnect after those, except after
+a 4401 sent when the token expired, with a fresh token.
+"""
+import re
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+
+UNAUTHORIZED = 4401
+FORBIDDEN = 4403
+NOT_FOUND = 4404
+# Standard code for "try again later", used when a client falls behind.
+TRY_AGAIN_LATER = 1013
+
+ROUTES = [
+    (re.compile(r'^/ws/classes/(?P<pk>[^/]+)/$'), 'classes.live.roster_socket'),
+]
+
+
+def authenticate(scope):
+    """
+    The user for the ``token`` query parameter and the validated token, or
+    ``(None, None)``. May query the database.
+    """
+    token = parse_qs(scope.get('query_string', b'').decode()).get('token', [''])[0]
+    if not token:
+        return None, None
+    # The same JWT authentication class as the API (JWT_STATELESS_AUTH).
+    authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+    try:
+        validated = authenticator.get_validated_token(token)
+        return authenticator.get_user(validated), validated
+    except AuthenticationFailed:
+        return None, None
+
+
+def database_sync_to_async(func):
+    """
+    sync_to_async() for database work done by a socket. Each call is treated
+    like a short request: a socket stays open far longer than CONN_MAX_AGE,
+    so connections are not kept across calls.
+    """
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(wrapper)
+
+
+async def reject(send, code):
+    await send({'type': 'websocket.accept'})
+    await send({'type': 'websocket.close', 'code': code})
+
+
+async def websocket_application(scope, receive, send):
+    for pattern, handler in ROUTES:
+        match = pattern.match(scope['path'])
+        if match:
+            return await import_string(handler)(scope, receive, send, **match.groupdict())
+    if (await receive())['type'] == 'websocket.connect':
+        await reject(send, NOT_FOUND)
@@ -0,0 +1,305 @@
+import json
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from benchmarks.utils import batched, isolated_database, percentiles, seed_class, seed_users
+from classes.codes import allocate_code
+from classes.models import Class, Enrollment
+from tasks.models import Task
+
+PASSWORD = 'bench-password-1'
+BULK_SIZE = 100
+# Route names the suite does not request, and why.
+NOT_BENCHMARKED = {
+    # The router's root view is shadowed by class-list, which has the same path.
+    'api-root': "shadowed by class-list",
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed thousands of teachers and hundreds of thousands of students and "
+        "enrollments, request every API endpoint and report query count, latency "
+        "percentiles and peak Python memory per endpoint. With --baseline, fail "
+        "when an endpoint runs more queries than the baseline or its p95 grows "
+        "beyond the tolerance. Runs against a throwaway copy of the configured "
+        "database: SQLite by default, PostgreSQL when DATABASE_URL points at one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--teachers', type=int, default=2000)
+        parser.add_argument('--classes-per-teacher', type=int, default=2)
+        parser.add_argument('--students', type=int, default=200000)
+        parser.add_argument('--enrollments-per-student', type=int, default=2)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--hashing-repeat', type=int, default=5,
+                            help="Repeats for login and registration, which hash a password.")
+        parser.add_argument('--endpoints', help="Comma-separated endpoint names to run (default: all).")
+        parser.add_argument('--baseline', help="JSON file from --save-baseline to compare against.")
+        parser.add_argument('--save-baseline', help="Write this run's results to a JSON file.")
+        parser.add_argument('--p95-tolerance', type=float, default=0.25,
+                            help="Allowed relative p95 growth over the baseline.")
+        parser.add_argument('--p95-slack-ms', type=float, default=2.0,
+                            help="p95 growth below this many ms is never a regression.")
+        parser.add_argument('--response-cache', action='store_true',
+                            help="Keep the response cache on; query counts then depend on hits.")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            if baseline['vendor'] != connection.vendor:
+                raise CommandError(f"Baseline is for {baseline['vendor']}, this run uses {connection.vendor}")
+
+        scale = {name: options[name] for name in (
+            'teachers', 'classes_per_teacher', 'students', 'enrollments_per_student', 'repeat',
+        )}
+        overrides = {'ALLOWED_HOSTS': ['testserver'], 'THROTTLE_ENABLED': False, 'METRICS_PUBLIC': True}
+        if not options['response_cache']:
+            overrides['RESPONSE_CACHE_ENABLED'] = False
+
+        with isolated_database(), override_settings(**overrides):
+            start = time.perf_counter()
+            fixtures = self._seed(options)
+            self.stderr.write(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+            endpoints = self._endpoints(fixtures)
+            self._check_coverage(endpoints)
+            selected = options['endpoints'].split(',') if options['endpoints'] else list(endpoints)
+
+            results = {}
+            self.stdout.write(f"{'endpoint':<30} {'queries':>7} {'p50':>9} {'p95':>9} {'p99':>9} {'peak KB':>8}")
+            for name in selected:
+                if name not in endpoints:
+                    raise CommandError(f"Unknown endpoint {name!r}")
+                method, calls, hashing = endpoints[name]
+                repeat = options['hashing_repeat'] if hashing else options['repeat']
+                results[name] = result = self._run(method, calls, repeat)
+                self.stdout.write(
+                    f"{name:<30} {result['queries']:>7} {result['p50']:7.2f}ms {result['p95']:7.2f}ms "
+                    f"{result['p99']:7.2f}ms {result['peak_kb']:8.0f}"
+                )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump({'vendor': connection.vendor, 'scale': scale, 'endpoints': results}, f, indent=2)
+                f.write('\n')
+        if baseline is not None:
+            self._compare(baseline, scale, results, options)
+
+    # Seeding
+
+    def _seed(self, options):
+        teacher_ids = seed_users(options['teachers'], role='teacher', prefix='teacher')
+        student_ids = seed_users(options['students'])
+
+        per_teacher = options['classes_per_teacher']
+        Class.objects.bulk_create(
+            # Lowercase codes are outside allocate_code()'s alphabet, so they never collide.
+            Class(name=f'Class {n}', subject='Seeded', code=f'x{n:05d}', teacher_id=teacher_id)
+            for n, teacher_id in enumerate(tid for tid in teacher_ids for _ in range(per_teacher))
+        )
+        class_ids = list(Class.objects.order_by('code').values_list('pk', flat=True))
+        per_student = min(options['enrollments_per_student'], len(class_ids))
+        pairs = (
+            (class_ids[(n * per_student + k) % len(class_ids)], student_id)
+            for n, student_id in enumerate(student_ids) for k in range(per_student)
+        )
+        for batch in batched(pairs, 5000):
+            Enrollment.objects.bulk_create(
+                Enrollment(class_obj_id=class_id, student_id=student_id) for class_id, student_id in batch
+            )
+
+        # The users and classes the requests below act on.
+        teacher = CustomUser.objects.get(pk=teacher_ids[0])
+        teacher.set_password(PASSWORD)
+        teacher.save(update_fields=['password'])
+        pool = options['repeat'] + 2  # a warm-up and a memory run on top of the timed ones
+        actors = list(CustomUser.objects.filter(pk__in=seed_users(pool, prefix='actor')).order_by('pk'))
+        bulk_ids = seed_users(pool * BULK_SIZE, prefix='bulk')
+        actor_ids = [actor.pk for actor in actors]
+        return {
+            'teacher': teacher,
+            'student': CustomUser.objects.get(pk=student_ids[0]),
+            'admin': CustomUser.objects.create_user(
+                username='admin', email='admin@bench.local', password=None, role='teacher', is_staff=True,
+            ),
+            'actors': actors,
+            'class': Class.objects.filter(teacher=teacher).order_by('code').first(),
+            'join_code_class': seed_class(teacher.pk, [], allocate_code()),
+            'leave_class': seed_class(teacher.pk, actor_ids, allocate_code()),
+            'remove_class': seed_class(teacher.pk, actor_ids, allocate_code()),
+            'enroll_class': seed_class(teacher.pk, [], allocate_code()),
+            'unenroll_class': seed_class(teacher.pk, bulk_ids, allocate_code()),
+            'bulk_batches': list(batched(bulk_ids, BULK_SIZE)),
+            'spare_classes': [seed_class(teacher.pk, [], allocate_code()).pk for _ in range(pool)],
+            'task': Task.objects.create(name='accounts.tasks.send_welcome_email', owner=teacher),
+        }
+
+    # Endpoints
+
+    def _endpoints(self, f):
+        """name -> (method, calls(i) -> (path, body, headers), hashes a password)"""
+        teacher, student, admin, actors = f['teacher'], f['student'], f['admin'], f['actors']
+        auth = self._auth
+        detail = f'/api/classes/{f["class"].pk}/'
+        enrolled = Class.objects.filter(students=student).first()
+
+        def get(path, user):
+            return lambda i: (path, None, auth(user))
+
+        return {
+            'register-user': ('POST', lambda i: ('/api/accounts/register/', {
+                'username': f'new{i}', 'email': f'new{i}@bench.local', 'first_name': 'New', 'last_name': str(i),
+                'password1': PASSWORD, 'password2': PASSWORD, 'role': 'student',
+            }, {}), True),
+            'login-user': ('POST', lambda i: (
+                '/api/accounts/login/', {'email': teacher.email, 'password': PASSWORD}, {},
+            ), True),
+            'logout-user': ('POST', lambda i: (
+                '/api/accounts/logout/', {'refresh': str(ClaimsRefreshToken.for_user(teacher))}, auth(teacher),
+            ), False),
+            'token-refresh': ('POST', lambda i: (
+                '/api/accounts/token/refresh/', {'refresh': str(ClaimsRefreshToken.for_user(teacher))}, {},
+            ), False),
+            'user-info': ('GET', get('/api/accounts/user/', teacher), False),
+            'teacher-dashboard': ('GET', get('/api/teacher/dashboard/', teacher), False),
+            'student-dashboard': ('GET', get('/api/student/dashboard/', student), False),
+            'enrolled-classes': ('GET', get('/api/student/enrolled-classes/', student), False),
+            'join-class': ('POST', lambda i: (
+                '/api/student/join-class/', {'code': f['join_code_class'].code}, auth(actors[i]),
+            ), False),
+            'response-cache-stats': ('GET', get('/api/classes/cache-stats/', admin), False),
+            'class-list': ('GET', get('/api/classes/', teacher), False),
+            'class-list POST': ('POST', lambda i: (
+                '/api/classes/', {'name': f'New {i}', 'subject': 'Bench'}, auth(teacher),
+            ), False),
+            'class-detail': ('GET', get(detail, teacher), False),
+            'class-detail PUT': ('PUT', lambda i: (
+                detail, {'name': f'Renamed {i}', 'subject': 'Bench'}, auth(teacher),
+            ), False),
+            'class-detail PATCH': ('PATCH', lambda i: (detail, {'name': f'Patched {i}'}, auth(teacher)), False),
+            'class-detail DELETE': ('DELETE', lambda i: (
+                f'/api/classes/{f["spare_classes"][i]}/', None, auth(teacher),
+            ), False),
+            'class-students': ('GET', get(f'{detail}students/', teacher), False),
+            'class-export-students': ('GET', get(f'{detail}students/export/?as=csv', teacher), False),
+            'class-export-students POST': ('POST', lambda i: (
+                f'{detail}students/export/?as=csv', None, auth(teacher),
+            ), False),
+            # The viewset only finds classes the student is already in, so this
+            # is the idempotent re-join.
+            'class-join': ('POST', lambda i: (
+                f'/api/classes/{enrolled.pk}/join/', None, auth(student),
+            ), False),
+            'class-leave-class': ('POST', lambda i: (
+                f'/api/classes/{f["leave_class"].pk}/leave_class/', None, auth(actors[i]),
+            ), False),
+            'class-remove-student': ('POST', lambda i: (
+                f'/api/classes/{f["remove_class"].pk}/remove_student/', {'student_id': actors[i].pk}, auth(teacher),
+            ), False),
+            'class-bulk-enroll': ('POST', lambda i: (
+                f'/api/classes/{f["enroll_class"].pk}/bulk_enroll/', {'students': f['bulk_batches'][i]}, auth(teacher),
+            ), False),
+            'class-bulk-unenroll': ('POST', lambda i: (
+                f'/api/classes/{f["unenroll_class"].pk}/bulk_unenroll/', {'students': f['bulk_batches'][i]},
+                auth(teacher),
+            ), False),
+            'task-detail': ('GET', get(f'/api/tasks/{f["task"].pk}/', teacher), False),
+            'batch': ('POST', lambda i: ('/api/batch/', {'requests': [
+                {'path': '/api/accounts/user/'}, {'path': '/api/classes/'}, {'path': detail},
+            ]}, auth(teacher)), False),
+            'metrics': ('GET', lambda i: ('/metrics', None, {}), False),
+        }
+
+    def _check_coverage(self, endpoints):
+        covered = {name.split()[0] for name in endpoints}
+        missing = {name for name in self._route_names(get_resolver()) if name not in covered} - set(NOT_BENCHMARKED)
+        if missing:
+            raise CommandError(f"Routes without a benchmark: {', '.join(sorted(missing))}")
+
+    def _route_names(self, resolver):
+        for pattern in resolver.url_patterns:
+            if isinstance(pattern, URLResolver):
+                if pattern.app_name != 'admin':
+                    yield from self._route_names(pattern)
+            elif isinstance(pattern, URLPattern) and pattern.name:
+                yield pattern.name
+
+    def _auth(self, user):
+        return {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'}
+
+    # Measuring
+
+    def _run(self, method, calls, repeat):
+        client = Client()
+        queries = []
+
+        def send(i):
+            path, body, headers = calls(i)
+            count = [0]
+
+            def counter(execute, *args):
+                count[0] += 1
+                return execute(*args)
+
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.generic(
+                    method, path, json.dumps(body) if body is not None else '',
+                    content_type='application/json', headers=headers,
+                )
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                elapsed = (time.perf_counter() - start) * 1000
+            if response.status_code >= 400:
+                raise CommandError(f"{method} {path}: {response.status_code} {response.content[:200]!r}")
+            # Server-Timing also counts queries run on other threads (batch
+            # reads); the wrapper also counts those made while streaming.
+            timing = re.search(r'"(\d+) queries"', response.get('Server-Timing', ''))
+            queries.append(max(count[0], int(timing.group(1)) if timing else 0))
+            return elapsed
+
+        send(0)  # warm-up
+        samples = [send(i) for i in range(1, repeat + 1)]
+        with self._traced() as peak:
+            send(repeat + 1)
+        return {'queries': max(queries), **percentiles(samples), 'peak_kb': peak[0] / 1024}
+
+    @contextmanager
+    def _traced(self):
+        peak = [0]
+        tracemalloc.start()
+        try:
+            yield peak
+            peak[0] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def _compare(self, baseline, scale, results, options):
+        if baseline['scale'] != scale:
+            self.stderr.write(f"Warning: baseline scale {baseline['scale']} differs from {scale}")
+        regressions = []
+        for name, result in results.items():
+            before = baseline['endpoints'].get(name)
+            if before is None:
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append(f"{name}: {before['queries']} -> {result['queries']} queries")
+            limit = max(before['p95'] * (1 + options['p95_tolerance']), before['p95'] + options['p95_slack_ms'])
+            if result['p95'] > limit:
+                regressions.append(f"{name}: p95 {before['p95']:.2f}ms -> {result['p95']:.2f}ms")
+        if regressions:
+            raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
@@ -0,0 +1,114 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from benchmarks.utils import (
+    isolated_database, percentiles, seed_class, seed_users, send_async, send_threaded,
+)
+from classes.codes import allocate_code
+
+PASSWORD = 'bench-password-123'
+PATHS = ('list', 'join', 'login')
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync views under WSGI with the async views under ASGI "
+        "for the class list, join and login paths. Each mode runs in its own "
+        "process, since ASYNC_API picks the routes at startup. Requests go "
+        "through Django's test clients (full middleware and handler, no "
+        "socket); WSGI concurrency is a pool of threads, as in a threaded "
+        "WSGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--paths', default=','.join(PATHS))
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', default='1,10,50')
+        parser.add_argument('--classes', type=int, default=20)
+        parser.add_argument('--roster', type=int, default=30)
+        parser.add_argument('--login-iterations', type=int, default=20_000,
+                            help="PBKDF2 iterations for the login path.")
+        parser.add_argument('--mode', choices=('wsgi', 'asgi'), help="Run one mode in this process.")
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            return self._run_mode(options)
+
+        self.stdout.write(f"{'mode':<5} {'path':<6} {'conc':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+        self.stdout.flush()
+        for mode in ('wsgi', 'asgi'):
+            env = dict(os.environ, ASYNC_API='1' if mode == 'asgi' else '0')
+            argv = [sys.executable, sys.argv[0], 'bench_asgi', '--mode', mode]
+            for option in ('paths', 'requests', 'concurrency', 'classes', 'roster', 'login_iterations'):
+                argv += [f"--{option.replace('_', '-')}", str(options[option])]
+            result = subprocess.run(argv, env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f"{mode} run failed:\n{result.stderr}")
+            self.stdout.write(result.stdout, ending='')
+
+    def _run_mode(self, options):
+        mode = options['mode']
+        if settings.ASYNC_API != (mode == 'asgi'):
+            raise CommandError(f"--mode {mode} needs ASYNC_API={'1' if mode == 'asgi' else '0'}")
+        hashing = dict(settings.PASSWORD_HASHER_PARAMS, pbkdf2={'iterations': options['login_iterations']})
+        # Every simulated client shares one address, so throttling is off.
+        with isolated_database(on_disk=True), override_settings(
+            ALLOWED_HOSTS=['testserver'], THROTTLE_ENABLED=False,
+            PASSWORD_HASHERS=['accounts.hashers.TunedPBKDF2PasswordHasher'], PASSWORD_HASHER_PARAMS=hashing,
+        ):
+            fixture = self._seed(options)
+            for path in options['paths'].split(','):
+                for concurrency in (int(n) for n in options['concurrency'].split(',')):
+                    calls = getattr(self, f'_{path}_calls')(fixture, options['requests'])
+                    if mode == 'wsgi':
+                        rate, samples = send_threaded(calls, concurrency)
+                    else:
+                        rate, samples = asyncio.run(send_async(calls, concurrency))
+                    stats = percentiles(samples)
+                    self.stdout.write(
+                        f"{mode:<5} {path:<6} {concurrency:>5} {rate:8.1f} {stats['p50']:7.1f}ms "
+                        f"{stats['p95']:7.1f}ms {stats['p99']:7.1f}ms"
+                    )
+
+    def _seed(self, options):
+        teacher = CustomUser.objects.create_user(
+            email='teacher@bench.local', username='teacher', password=None, role='teacher',
+        )
+        student_ids = seed_users(options['roster'], prefix='member')
+        for _ in range(options['classes']):
+            seed_class(teacher.pk, student_ids, allocate_code())
+        joiners = CustomUser.objects.filter(pk__in=seed_users(options['requests'], prefix='joiner'))
+        CustomUser.objects.create_user(
+            email='login@bench.local', username='login', password=PASSWORD, role='student',
+        )
+        return {
+            'teacher': self._auth(teacher),
+            'joiners': [self._auth(user) for user in joiners],
+            'teacher_id': teacher.pk,
+        }
+
+    def _auth(self, user):
+        return {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'}
+
+    def _list_calls(self, fixture, count):
+        return [('GET', '/api/classes/', None, fixture['teacher'])] * count
+
+    def _join_calls(self, fixture, count):
+        # A fresh class per run, so that every join is a first join.
+        code = seed_class(fixture['teacher_id'], [], allocate_code()).code
+        return [
+            ('POST', '/api/student/join-class/', {'code': code}, fixture['joiners'][i % len(fixture['joiners'])])
+            for i in range(count)
+        ]
+
+    def _login_calls(self, fixture, count):
+        body = {'email': 'login@bench.local', 'password': PASSWORD}
+        return [('POST', '/api/accounts/login/', body, {})] * count
@@ -0,0 +1,87 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from benchmarks.utils import isolated_database, percentiles, seed_class, seed_users
+from classes.codes import allocate_code
+
+
+class Command(BaseCommand):
+    help = (
+        "Load the teacher dashboard the way the frontend does (the user, the class "
+        "list, then each class's details) as one request per call and as two "
+        "/api/batch/ calls. Requests go through the test client, so there is no "
+        "network: --rtt-ms of sleep stands in for each round-trip."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=5)
+        parser.add_argument('--roster', type=int, default=30)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--rtt-ms', type=float, default=30)
+        parser.add_argument('--workers', default='1,4', help="BATCH_READ_WORKERS values to compare.")
+
+    def handle(self, *args, **options):
+        # Worker threads open their own connections, which need a database file.
+        with isolated_database(on_disk=True), override_settings(
+            ALLOWED_HOSTS=['testserver'], THROTTLE_ENABLED=False, RESPONSE_CACHE_ENABLED=False,
+        ):
+            teacher = CustomUser.objects.create_user(
+                email='teacher@bench.local', username='teacher', password=None, role='teacher',
+            )
+            student_ids = seed_users(options['roster'])
+            class_ids = [seed_class(teacher.pk, student_ids, allocate_code()).pk for _ in range(options['classes'])]
+            self.client = Client()
+            self.headers = {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(teacher).access_token}'}
+            self.rtt = options['rtt_ms'] / 1000
+            details = [f'/api/classes/{pk}/' for pk in class_ids]
+
+            self.stdout.write(f"{'flow':<18} {'round-trips':>11} {'server p50':>11} {'p95':>9} {'with rtt p50':>13}")
+            self._report('separate', 2 + len(details), options['repeat'], lambda: self._separate(details))
+            for workers in (int(n) for n in options['workers'].split(',')):
+                with override_settings(BATCH_READ_WORKERS=workers):
+                    self._report(f'batch, {workers} worker(s)', 2, options['repeat'], lambda: self._batched(details))
+
+    def _report(self, name, round_trips, repeat, flow):
+        flow()  # warm-up
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            flow()
+            samples.append((time.perf_counter() - start) * 1000)
+        stats = percentiles(samples)
+        self.stdout.write(
+            f"{name:<18} {round_trips:>11} {stats['p50']:9.2f}ms {stats['p95']:7.2f}ms "
+            f"{stats['p50'] + round_trips * self.rtt * 1000:11.2f}ms"
+        )
+
+    def _get(self, path):
+        response = self.client.get(path, headers=self.headers)
+        if response.status_code != 200:
+            raise CommandError(f"GET {path}: {response.status_code}")
+        return response.json()
+
+    def _batch(self, paths):
+        response = self.client.post(
+            '/api/batch/', json.dumps({'requests': [{'path': path} for path in paths]}),
+            content_type='application/json', headers=self.headers,
+        )
+        results = response.json()['responses']
+        if any(result['status'] != 200 for result in results):
+            raise CommandError(f"batch: {[result['status'] for result in results]}")
+        return [result['body'] for result in results]
+
+    def _separate(self, details):
+        self._get('/api/accounts/user/')
+        self._get('/api/classes/')
+        for path in details:
+            self._get(path)
+
+    def _batched(self, details):
+        self._batch(['/api/accounts/user/', '/api/classes/'])
+        self._batch(details)
@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.utils import isolated_database, percentiles, seed_users, timed
+from classes.codes import allocate_code, allocate_codes
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = (
+        "Create N classes with allocated codes and report code allocation latency, "
+        "to show it stays flat as the code space fills up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--samples', type=int, default=20,
+                            help="Single-code allocations timed per batch.")
+
+    def handle(self, *args, **options):
+        count, batch_size = options['count'], options['batch_size']
+
+        with isolated_database():
+            teacher_id = seed_users(1, role='teacher', prefix='teacher')[0]
+            single, per_code, created = [], [], 0
+            started = time.perf_counter()
+
+            while created < count:
+                size = min(batch_size, count - created)
+                start = time.perf_counter()
+                codes = allocate_codes(size)
+                per_code.append((time.perf_counter() - start) * 1000 / size)
+                Class.objects.bulk_create(
+                    Class(name=f'Bench {code}', code=code, teacher_id=teacher_id) for code in codes
+                )
+                created += size
+                # Codes allocated one at a time, as ClassSerializer.create does.
+                single.append(timed(allocate_code, options['samples']))
+
+            elapsed = time.perf_counter() - started
+            total = Class.objects.count()
+            distinct = Class.objects.values('code').distinct().count()
+
+        first, last = percentiles(single[0]), percentiles(single[-1])
+        overall = percentiles([s for batch in single for s in batch])
+        self.stdout.write(f"classes created:      {total} ({distinct} distinct codes) in {elapsed:.1f}s")
+        self.stdout.write(f"batched allocation:   {percentiles(per_code)['mean'] * 1000:.2f}us per code")
+        self.stdout.write(
+            f"single allocation:    p50 {overall['p50']:.3f}ms  p95 {overall['p95']:.3f}ms  p99 {overall['p99']:.3f}ms"
+        )
+        self.stdout.write(f"first batch p50:      {first['p50']:.3f}ms")
+        self.stdout.write(f"last batch p50:       {last['p50']:.3f}ms")
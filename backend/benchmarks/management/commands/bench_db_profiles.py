@@ -0,0 +1,100 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from benchmarks.utils import isolated_database, percentiles, seed_class, seed_users, send_threaded
+from classes.codes import allocate_code
+
+# Environment of each database profile (see DATABASES in backend/settings.py).
+# The PostgreSQL profiles use DATABASE_URL and are skipped when it is unset.
+PROFILES = {
+    'sqlite': {'DATABASE_URL': '', 'SQLITE_WAL': '0'},
+    'sqlite-wal': {'DATABASE_URL': '', 'SQLITE_WAL': '1'},
+    'postgres': {'DB_POOL': '0'},
+    'postgres-pool': {'DB_POOL': '1'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Send parallel join and class-create requests from a pool of threads "
+        "against each database profile and report throughput, latency and "
+        "failed requests (e.g. 'database is locked'). Each profile runs in "
+        "its own process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default=','.join(PROFILES))
+        parser.add_argument('--ops', default='join,create')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', default='1,8,32')
+        parser.add_argument('--profile', choices=list(PROFILES), help="Run one profile in this process.")
+
+    def handle(self, *args, **options):
+        if options['profile']:
+            return self._run_profile(options)
+
+        self.stdout.write(
+            f"{'profile':<14} {'op':<7} {'conc':>5} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'errors':>7}"
+        )
+        for profile in options['profiles'].split(','):
+            if profile.startswith('postgres') and not os.environ.get('DATABASE_URL'):
+                self.stdout.write(f"{profile:<14} skipped: set DATABASE_URL to a PostgreSQL database")
+                continue
+            argv = [sys.executable, sys.argv[0], 'bench_db_profiles', '--profile', profile]
+            for option in ('ops', 'requests', 'concurrency'):
+                argv += [f'--{option}', str(options[option])]
+            result = subprocess.run(argv, env=dict(os.environ, **PROFILES[profile]), capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f"{profile} run failed:\n{result.stderr}")
+            self.stdout.write(result.stdout, ending='')
+
+    def _run_profile(self, options):
+        profile = options['profile']
+        # Every simulated client shares one address, so throttling is off.
+        with isolated_database(on_disk=True), override_settings(ALLOWED_HOSTS=['testserver'], THROTTLE_ENABLED=False):
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+                expected = 'wal' if settings.SQLITE_WAL else 'delete'
+                if journal_mode != expected:
+                    raise CommandError(f"{profile}: journal_mode is {journal_mode}, expected {expected}")
+
+            teacher = CustomUser.objects.create_user(
+                email='teacher@bench.local', username='teacher', password=None, role='teacher',
+            )
+            students = CustomUser.objects.filter(pk__in=seed_users(options['requests'], prefix='joiner'))
+            tokens = {
+                'teacher': [self._auth(teacher)],
+                'student': [self._auth(student) for student in students],
+            }
+            for op in options['ops'].split(','):
+                for concurrency in (int(n) for n in options['concurrency'].split(',')):
+                    calls = getattr(self, f'_{op}_calls')(teacher, tokens, options['requests'])
+                    errors = []
+                    rate, samples = send_threaded(calls, concurrency, errors)
+                    stats = percentiles(samples)
+                    self.stdout.write(
+                        f"{profile:<14} {op:<7} {concurrency:>5} {rate:8.1f} {stats['p50']:7.1f}ms "
+                        f"{stats['p95']:7.1f}ms {stats['p99']:7.1f}ms {len(errors):>7}"
+                    )
+
+    def _auth(self, user):
+        return {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'}
+
+    def _join_calls(self, teacher, tokens, count):
+        # Every student joins the same fresh class, all contending for one roster.
+        code = seed_class(teacher.pk, [], allocate_code()).code
+        return [('POST', '/api/student/join-class/', {'code': code}, headers) for headers in tokens['student'][:count]]
+
+    def _create_calls(self, teacher, tokens, count):
+        body = {'name': 'Bench', 'subject': 'Load'}
+        return [('POST', '/api/classes/', body, tokens['teacher'][0])] * count
@@ -0,0 +1,57 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from accounts.serializers import CustomUserSerializer
+from benchmarks.utils import isolated_database, seed_class, seed_users
+from classes import exports
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = (
+        "Export rosters of growing size through the streaming CSV/NDJSON exporter and "
+        "through CustomUserSerializer, reporting time and peak Python memory. The "
+        "streaming peak should not grow with the roster."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10000,100000', help="Comma-separated roster sizes.")
+        parser.add_argument('--skip-serializer', action='store_true',
+                            help="Only time the streaming exports.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+
+        with isolated_database():
+            teacher_id = seed_users(1, role='teacher', prefix='teacher')[0]
+            student_ids = seed_users(max(sizes))
+
+            self.stdout.write(f"{'roster':>8} {'export':<10} {'seconds':>8} {'MB out':>8} {'peak MB':>8}")
+            for n, size in enumerate(sizes):
+                class_obj = seed_class(teacher_id, student_ids[:size], code=f'E{n:05d}')
+                runs = {
+                    'csv': lambda: self._stream(class_obj, 'csv'),
+                    'ndjson': lambda: self._stream(class_obj, 'ndjson'),
+                }
+                if not options['skip_serializer']:
+                    runs['serializer'] = lambda: len(JSONRenderer().render(
+                        CustomUserSerializer(class_obj.students.order_by('id'), many=True).data
+                    ))
+                for name, run in runs.items():
+                    tracemalloc.start()
+                    start = time.perf_counter()
+                    written = run()
+                    elapsed = time.perf_counter() - start
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    self.stdout.write(
+                        f"{size:>8} {name:<10} {elapsed:8.2f} {written / 2 ** 20:8.1f} {peak / 2 ** 20:8.1f}"
+                    )
+                Class.objects.filter(pk=class_obj.pk).delete()
+
+    def _stream(self, class_obj, file_format):
+        rows = exports.roster_rows(class_obj.pk).iterator(chunk_size=exports.CHUNK_SIZE)
+        return sum(len(chunk) for chunk in exports.stream(rows, exports.ROSTER_COLUMNS, file_format))
@@ -0,0 +1,91 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from accounts.models import CustomUser
+from benchmarks.utils import batched, isolated_database, percentiles, seed_users, timed
+from classes.models import Class, Enrollment
+
+# The schema before the query-pattern indexes and constraints were added.
+BEFORE = [('classes', '0003_classcodesequence'), ('accounts', '0004_alter_customuser_first_name_and_more')]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large user base, then run the hot class and user queries on the schema "
+        "without and with the query-pattern indexes (classes 0004, accounts 0005), "
+        "printing each query's plan and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--teachers', type=int, default=10000)
+        parser.add_argument('--classes-per-teacher', type=int, default=2)
+        parser.add_argument('--enrollments-per-student', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--search-repeat', type=int, default=5,
+                            help="Repeats for the admin search, which scans without trigram indexes.")
+
+    def handle(self, *args, **options):
+        with isolated_database():
+            targets = self._seed(options)
+            queries = self._queries(*targets)
+
+            self.stdout.write(f"{'query':<18} {'schema':<7} {'p50':>10} {'p95':>10}  plan")
+            for schema in ('before', 'after'):
+                if schema == 'before':
+                    for app, migration in BEFORE:
+                        call_command('migrate', app, migration, verbosity=0)
+                else:
+                    call_command('migrate', verbosity=0)
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+
+                for name, queryset in queries.items():
+                    repeat = options['search_repeat'] if name == 'admin search' else options['repeat']
+                    stats = percentiles(timed(lambda: list(queryset.all()), repeat))
+                    plan = ' | '.join(line.strip() for line in queryset.explain().splitlines())
+                    self.stdout.write(
+                        f"{name:<18} {schema:<7} {stats['p50']:8.3f}ms {stats['p95']:8.3f}ms  {plan}"
+                    )
+
+    def _seed(self, options):
+        teacher_ids = seed_users(options['teachers'], role='teacher', prefix='teacher')
+        student_ids = seed_users(options['users'] - options['teachers'])
+        per_teacher = options['classes_per_teacher']
+        Class.objects.bulk_create(
+            (
+                Class(name=f'Class {n}', code=f'x{n:05d}', teacher_id=teacher_id)
+                for n, teacher_id in enumerate(tid for tid in teacher_ids for _ in range(per_teacher))
+            ),
+            batch_size=5000,
+        )
+        class_ids = list(Class.objects.order_by('code').values_list('pk', flat=True))
+        per_student = min(options['enrollments_per_student'], len(class_ids))
+        pairs = (
+            (class_ids[(n * per_student + k) % len(class_ids)], student_id)
+            for n, student_id in enumerate(student_ids) for k in range(per_student)
+        )
+        for batch in batched(pairs, 5000):
+            Enrollment.objects.bulk_create(
+                Enrollment(class_obj_id=class_id, student_id=student_id) for class_id, student_id in batch
+            )
+
+        teacher_id = teacher_ids[len(teacher_ids) // 2]
+        student = CustomUser.objects.get(pk=student_ids[len(student_ids) // 2])
+        code = Class.objects.filter(teacher_id=teacher_id).values_list('code', flat=True)[0]
+        return teacher_id, student, code
+
+    def _queries(self, teacher_id, student, code):
+        term = student.username[-5:]
+        return {
+            'teacher classes': Class.objects.filter(teacher_id=teacher_id).order_by('-created_at')[:20],
+            'enrolled classes': Class.objects.filter(students=student.pk).order_by('-created_at')[:20],
+            'class by code': Class.objects.filter(code=code),
+            'email (any case)': CustomUser.objects.alias(email_lower=Lower('email')).filter(
+                email_lower=student.email.upper().lower(),
+            ),
+            'admin search': CustomUser.objects.filter(Q(email__icontains=term) | Q(username__icontains=term))[:100],
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from accounts import hashers
+from accounts.models import CustomUser
+from benchmarks.utils import isolated_database, percentiles
+
+HASHER_PATHS = {
+    'pbkdf2': 'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'scrypt': 'accounts.hashers.TunedScryptPasswordHasher',
+    'argon2': 'accounts.hashers.TunedArgon2PasswordHasher',
+}
+PASSWORD = 'bench-password-123'
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure login (password verification) throughput per hasher, with a "
+        "pool of sync threads and through the async bounded-pool path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hashers', default='pbkdf2,scrypt,argon2')
+        parser.add_argument('--logins', type=int, default=100)
+        parser.add_argument('--threads', default='1,4')
+        parser.add_argument('--users', type=int, default=10)
+
+    def handle(self, *args, **options):
+        thread_counts = [int(n) for n in options['threads'].split(',')]
+        self.stdout.write(f"{'hasher':<8} {'mode':<10} {'logins/s':>9} {'p50':>9} {'p95':>9}")
+        with isolated_database():
+            for name in options['hashers'].split(','):
+                with override_settings(PASSWORD_HASHERS=[HASHER_PATHS[name]]):
+                    try:
+                        emails = self._seed(name, options['users'])
+                    except ValueError as exc:  # argon2-cffi not installed
+                        self.stdout.write(f"{name:<8} skipped: {exc}")
+                        continue
+                    for threads in thread_counts:
+                        self._report(name, f'threads={threads}', self._run_threads(emails, options['logins'], threads))
+                    for workers in thread_counts:
+                        with override_settings(PASSWORD_HASH_WORKERS=workers):
+                            hashers._executor = None
+                            result = asyncio.run(self._run_async(emails, options['logins']))
+                        self._report(name, f'async={workers}', result)
+                    hashers._executor = None
+
+    def _seed(self, name, count):
+        emails = [f'{name}{i}@bench.local' for i in range(count)]
+        for email in emails:
+            CustomUser.objects.create_user(email=email, username=email, password=PASSWORD)
+        return emails
+
+    def _login(self, email):
+        start = time.perf_counter()
+        user = hashers._call(authenticate, (), {'email': email, 'password': PASSWORD})
+        assert user is not None
+        return (time.perf_counter() - start) * 1000
+
+    def _run_threads(self, emails, logins, threads):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(self._login, (emails[i % len(emails)] for i in range(logins))))
+        return logins / (time.perf_counter() - start), samples
+
+    async def _run_async(self, emails, logins):
+        async def login(email):
+            start = time.perf_counter()
+            user = await hashers.aauthenticate(email=email, password=PASSWORD)
+            assert user is not None
+            return (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        samples = await asyncio.gather(*(login(emails[i % len(emails)]) for i in range(logins)))
+        return logins / (time.perf_counter() - start), samples
+
+    def _report(self, name, mode, result):
+        rate, samples = result
+        stats = percentiles(samples)
+        self.stdout.write(f"{name:<8} {mode:<10} {rate:9.1f} {stats['p50']:7.1f}ms {stats['p95']:7.1f}ms")
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.utils import isolated_database, percentiles, seed_class, seed_users, timed
+from classes.membership import is_enrolled
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure roster membership checks against growing rosters, comparing the "
+        "indexed EXISTS check with loading the roster and testing in Python."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000,25000',
+                            help="Comma-separated roster sizes.")
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help="Only time the EXISTS check.")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        repeat = options['repeat']
+
+        with isolated_database():
+            teacher_id = seed_users(1, role='teacher', prefix='teacher')[0]
+            outsider_id = seed_users(1, prefix='outsider')[0]
+            student_ids = seed_users(max(sizes))
+
+            self.stdout.write(f"{'roster':>8} {'exists p50':>11} {'exists p95':>11} {'legacy p50':>11}")
+            for n, size in enumerate(sizes):
+                class_obj = seed_class(teacher_id, student_ids[:size], code=f'B{n:05d}')
+                member_id = student_ids[size - 1]
+
+                exists = percentiles(
+                    timed(lambda: is_enrolled(class_obj.pk, member_id), repeat)
+                    + timed(lambda: is_enrolled(class_obj.pk, outsider_id), repeat)
+                )
+                legacy = '-'
+                if not options['skip_legacy']:
+                    legacy_samples = timed(
+                        lambda: member_id in {s.pk for s in class_obj.students.all()},
+                        max(1, repeat // 20),
+                    )
+                    legacy = f"{percentiles(legacy_samples)['p50']:9.3f}ms"
+                self.stdout.write(
+                    f"{size:>8} {exists['p50']:9.3f}ms {exists['p95']:9.3f}ms {legacy:>11}"
+                )
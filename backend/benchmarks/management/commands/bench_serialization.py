@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from accounts.models import CustomUser
+from accounts.serializers import CustomUserSerializer
+from backend.renderers import FastJSONRenderer
+from benchmarks.utils import isolated_database, percentiles, seed_class, seed_users, timed
+from classes.models import Class
+from classes.serializers import ClassSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Serialize and render N classes with M students each, comparing the "
+        "ModelSerializer + JSONRenderer path with the .values() fast path + "
+        "orjson renderer. Database time is reported separately."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=1000)
+        parser.add_argument('--students', type=int, default=100, help="Students per class.")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+
+        with isolated_database():
+            teacher_id = seed_users(1, role='teacher', prefix='teacher')[0]
+            student_ids = seed_users(options['students'])
+            for n in range(options['classes']):
+                seed_class(teacher_id, student_ids, code=f'S{n:05d}')
+
+            classes = ClassSerializer.setup_eager_loading(Class.objects.order_by('-created_at'))
+            # Every roster, one row per enrollment.
+            rosters = CustomUser.objects.filter(enrollments__isnull=False).order_by('enrollments__class_obj', 'id')
+            cases = {
+                'classes': (
+                    classes, lambda objs: ClassSerializer(objs, many=True).data,
+                    ClassSerializer.select_values(classes), ClassSerializer.represent_values,
+                ),
+                'students': (
+                    rosters, lambda objs: CustomUserSerializer(objs, many=True).data,
+                    rosters.values(*CustomUserSerializer.value_fields),
+                    CustomUserSerializer.represent_values,
+                ),
+            }
+
+            self.stdout.write(
+                f"{'payload':<9} {'rows':>7} {'path':<5} {'query p50':>11} {'serialize p50':>14} "
+                f"{'render p50':>11} {'bytes':>10}"
+            )
+            for name, (queryset, serialize, values, represent) in cases.items():
+                objs = list(queryset)
+                rows = list(values)
+                data = serialize(objs)
+                fast_data = represent(rows)
+                body = JSONRenderer().render(data)
+                if FastJSONRenderer().render(fast_data) != body:
+                    self.stderr.write(f"{name}: fast path output differs from the serializer's")
+
+                runs = {
+                    'drf': (
+                        lambda: list(queryset.all()), lambda: serialize(objs), lambda: JSONRenderer().render(data),
+                    ),
+                    'fast': (
+                        lambda: list(values.all()), lambda: represent(rows),
+                        lambda: FastJSONRenderer().render(fast_data),
+                    ),
+                }
+                for path, (query, build, render) in runs.items():
+                    stats = [percentiles(timed(step, repeat))['p50'] for step in (query, build, render)]
+                    self.stdout.write(
+                        f"{name:<9} {len(rows):>7} {path:<5} {stats[0]:9.1f}ms {stats[1]:12.1f}ms "
+                        f"{stats[2]:9.1f}ms {len(body):>10}"
+                    )
@@ -0,0 +1,67 @@
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import CustomUser
+from accounts.tasks import send_welcome_email
+from accounts.tokens import ClaimsRefreshToken
+from benchmarks.utils import isolated_database, percentiles, seed_class, seed_users
+from classes.codes import allocate_code
+from classes.models import Enrollment
+from tasks.models import Task
+from tasks.queue import run_pending
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare request latency of a bulk enrollment applied inline with the same "
+        "request queued for the task worker, and time the worker draining queued "
+        "welcome emails."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=5000, help="Students per bulk enrollment.")
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument('--emails', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        settings = {
+            'ALLOWED_HOSTS': ['testserver'], 'THROTTLE_ENABLED': False,
+            'EMAIL_BACKEND': 'django.core.mail.backends.locmem.EmailBackend',
+        }
+        with isolated_database(), override_settings(**settings):
+            teacher = CustomUser.objects.create_user(
+                email='teacher@bench.local', username='teacher', password=None, role='teacher',
+            )
+            class_obj = seed_class(teacher.pk, [], allocate_code())
+            students = seed_users(options['size'])
+            client = Client()
+            headers = {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(teacher).access_token}'}
+            path = f'/api/classes/{class_obj.pk}/bulk_enroll/'
+
+            self.stdout.write(f"{'bulk enroll':<12} {'status':>6} {'p50':>9} {'p99':>9}")
+            for mode, limit in (('inline', options['size']), ('queued', 0)):
+                samples = []
+                with mock.patch('classes.views.BULK_ENROLLMENT_INLINE_LIMIT', limit):
+                    for _ in range(options['requests']):
+                        Enrollment.objects.filter(class_obj=class_obj).delete()
+                        start = time.perf_counter()
+                        response = client.post(path, {'students': students}, content_type='application/json',
+                                               headers=headers)
+                        samples.append((time.perf_counter() - start) * 1000)
+                stats = percentiles(samples)
+                self.stdout.write(
+                    f"{mode:<12} {response.status_code:>6} {stats['p50']:7.1f}ms {stats['p99']:7.1f}ms"
+                )
+            Task.objects.all().delete()
+
+            user_ids = seed_users(options['emails'], prefix='welcome')
+            for user_id in user_ids:
+                send_welcome_email.enqueue(user_id=user_id)
+            start = time.perf_counter()
+            ran = run_pending()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"worker: {ran} welcome emails in {elapsed:.2f}s ({ran / elapsed:.0f} tasks/s, one process)")
@@ -0,0 +1,49 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.throttling import LoginAccountThrottle, LoginIPThrottle
+from benchmarks.utils import percentiles, timed
+from student.throttling import JoinCodeThrottle, JoinIPThrottle
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the throttle check an allowed login or join request goes through, "
+        "i.e. the overhead throttling adds to the allowed path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20000)
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory()
+        views = {
+            'login': ((LoginIPThrottle, LoginAccountThrottle), {'email': 'ada@example.com', 'password': 'x'}),
+            'join': ((JoinIPThrottle, JoinCodeThrottle), {'code': 'ABC123'}),
+        }
+        # Rates high enough that every request is allowed.
+        rates = {scope: '1000000000/s' for scope in settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']}
+        self.stdout.write(f"{'view':<6} {'throttling':<10} {'p50':>9} {'p95':>9}")
+        for name, (throttle_classes, body) in views.items():
+            for enabled in (False, True):
+                caches[settings.THROTTLE_CACHE].clear()
+                with override_settings(
+                    THROTTLE_ENABLED=enabled,
+                    REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': rates},
+                ):
+                    request = Request(factory.post('/', body, format='json'), parsers=[JSONParser()])
+                    request.data  # parsed once, as the view would
+
+                    def check():
+                        for throttle_class in throttle_classes:
+                            assert throttle_class().allow_request(request, None)
+
+                    stats = percentiles([ms * 1000 for ms in timed(check, options['requests'])])
+                self.stdout.write(
+                    f"{name:<6} {'on' if enabled else 'off':<10} {stats['p50']:7.1f}us {stats['p95']:7.1f}us"
+                )
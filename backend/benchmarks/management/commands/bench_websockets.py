@@ -0,0 +1,159 @@
+import asyncio
+import resource
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from backend import pubsub
+from backend.websockets import websocket_application
+from benchmarks.utils import batched, isolated_database, percentiles, seed_class, seed_users
+from classes.codes import allocate_code
+
+
+class Deliveries:
+    """Counts the frames sockets send for one roster change, and when they arrive."""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.start = time.perf_counter()
+        self.latencies = []
+        self.done = asyncio.Event()
+
+    def record(self):
+        self.latencies.append((time.perf_counter() - self.start) * 1000)
+        if len(self.latencies) == self.expected:
+            self.done.set()
+
+
+class Command(BaseCommand):
+    help = (
+        "Hold many live roster sockets open in one process and measure connection "
+        "setup, memory per socket, and how long a join or leave takes to reach every "
+        "socket of the class. Sockets are driven through the ASGI application with "
+        "in-memory receive/send (no network); joins and leaves go through the API "
+        "views on a worker thread, as under an ASGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=10000)
+        parser.add_argument('--classes', type=int, default=1,
+                            help="Classes the subscribers are spread over; 1 fans every change out to all.")
+        parser.add_argument('--events', type=int, default=20, help="Join/leave pairs per run.")
+        parser.add_argument('--connect-concurrency', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if options['subscribers'] % options['classes']:
+            raise CommandError("--subscribers must be a multiple of --classes")
+        # Every simulated client shares one address, so throttling is off.
+        with isolated_database(on_disk=True), override_settings(
+            ALLOWED_HOSTS=['testserver'], THROTTLE_ENABLED=False, RESPONSE_CACHE_ENABLED=False,
+        ):
+            fixture = self._seed(options)
+            asyncio.run(self._run(fixture, options))
+
+    def _seed(self, options):
+        teacher_id = seed_users(1, role='teacher', prefix='teacher')[0]
+        student_ids = seed_users(options['subscribers'])
+        per_class = options['subscribers'] // options['classes']
+        classes = [seed_class(teacher_id, batch, allocate_code()) for batch in batched(student_ids, per_class)]
+        students = CustomUser.objects.filter(pk__in=student_ids).order_by('pk')
+        sockets = [
+            (f'/ws/classes/{classes[n // per_class].pk}/', str(ClaimsRefreshToken.for_user(user).access_token))
+            for n, user in enumerate(students)
+        ]
+        joiner = CustomUser.objects.get(pk=seed_users(1, prefix='joiner')[0])
+        return {
+            'class': classes[0],
+            'per_class': per_class,
+            'sockets': sockets,
+            'joiner': {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(joiner).access_token}'},
+        }
+
+    async def _run(self, fixture, options):
+        self.deliveries = None
+        self.stdout.write(f"{'subscribers':<12} {'event':<7} {'request p50':>12} {'delivery p50':>13} "
+                          f"{'p99':>9} {'last p50':>9} {'last max':>9}")
+        await self._roster_changes(fixture, options, 0)
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        sockets, connect_ms = await self._connect(fixture['sockets'], options['connect_concurrency'])
+        elapsed = time.perf_counter() - start
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        subscribers = pubsub.get_broker().subscriber_count()
+        if subscribers != len(fixture['sockets']):
+            raise CommandError(f"{subscribers} of {len(fixture['sockets'])} sockets subscribed")
+
+        await self._roster_changes(fixture, options, fixture['per_class'])
+        stats = percentiles(connect_ms)
+        self.stdout.write(
+            f"\nconnected {subscribers} sockets in {elapsed:.1f}s ({subscribers / elapsed:.0f}/s), "
+            f"connect p50 {stats['p50']:.1f}ms p99 {stats['p99']:.1f}ms, "
+            f"~{(rss_after - rss_before) / subscribers:.1f} KiB RSS per socket"
+        )
+        for inbox, task in sockets:
+            inbox.put_nowait({'type': 'websocket.disconnect', 'code': 1000})
+        await asyncio.gather(*(task for _, task in sockets))
+
+    async def _connect(self, sockets, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def connect(path, token):
+            inbox = asyncio.Queue()
+            accepted = asyncio.get_running_loop().create_future()
+
+            async def send(event):
+                if event['type'] == 'websocket.send':
+                    self.deliveries.record()
+                elif not accepted.done():
+                    accepted.set_result(event['type'])
+
+            async with semaphore:
+                start = time.perf_counter()
+                scope = {'type': 'websocket', 'path': path, 'query_string': f'token={token}'.encode()}
+                task = asyncio.create_task(websocket_application(scope, inbox.get, send))
+                inbox.put_nowait({'type': 'websocket.connect'})
+                if await accepted != 'websocket.accept':
+                    raise CommandError(f"{path} was not accepted")
+                latencies.append((time.perf_counter() - start) * 1000)
+            return inbox, task
+
+        return await asyncio.gather(*(connect(path, token) for path, token in sockets)), latencies
+
+    async def _roster_changes(self, fixture, options, expected):
+        client = Client()
+        class_obj = fixture['class']
+        calls = {
+            'joined': ('/api/student/join-class/', {'code': class_obj.code}),
+            'left': (f'/api/classes/{class_obj.pk}/leave_class/', {}),
+        }
+        results = {event: ([], [], []) for event in calls}
+        for _ in range(options['events']):
+            for event, (path, body) in calls.items():
+                self.deliveries = Deliveries(expected)
+                response = await sync_to_async(client.post)(
+                    path, body, content_type='application/json', headers=fixture['joiner'],
+                )
+                request_ms = (time.perf_counter() - self.deliveries.start) * 1000
+                if response.status_code != 200:
+                    raise CommandError(f"{event}: {response.status_code} {response.content[:200]!r}")
+                if expected:
+                    await asyncio.wait_for(self.deliveries.done.wait(), 60)
+                requests, deliveries, completions = results[event]
+                requests.append(request_ms)
+                deliveries.extend(self.deliveries.latencies)
+                completions.append(max(self.deliveries.latencies, default=0))
+
+        for event, (requests, deliveries, completions) in results.items():
+            line = f"{expected:<12} {event:<7} {percentiles(requests)['p50']:10.2f}ms"
+            if deliveries:
+                delivery, completion = percentiles(deliveries), percentiles(completions)
+                line += (f" {delivery['p50']:11.2f}ms {delivery['p99']:7.2f}ms "
+                         f"{completion['p50']:7.2f}ms {max(completions):7.2f}ms")
+            self.stdout.write(line)
@@ -0,0 +1,147 @@
+"""
+Shared helpers for the ``bench_*`` management commands.
+
+Benchmarks never touch the configured database: they run inside a throwaway
+test database created the same way ``manage.py test`` creates one.
+"""
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import AsyncClient, Client
+
+from accounts.models import CustomUser
+from classes.membership import batched
+from classes.models import Class, Enrollment
+
+
+@contextmanager
+def isolated_database(on_disk=False):
+    """
+    ``on_disk`` puts a SQLite test database in a temporary file. The default
+    in-memory database shares one cache between threads, which locks whole
+    tables, so benchmarks that write from several threads need a file.
+    """
+    old_name = connection.settings_dict['NAME']
+    test_settings = connection.settings_dict['TEST']
+    old_test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if on_disk and connection.vendor == 'sqlite':
+            test_settings['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = old_test_name
+
+
+def timed(func, repeat):
+    """Run ``func`` ``repeat`` times and return the per-call latencies in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        'mean': statistics.fmean(ordered),
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+    }
+
+
+def seed_users(count, role='student', prefix='user', batch_size=5000):
+    """Bulk-create ``count`` users with unusable passwords and return their ids."""
+    password = make_password(None)
+    start = CustomUser.objects.count()
+    for batch in batched(range(start, start + count), batch_size):
+        CustomUser.objects.bulk_create(
+            CustomUser(
+                username=f'{prefix}{i}', email=f'{prefix}{i}@bench.local', password=password,
+                first_name=prefix.title(), last_name=str(i), role=role,
+            )
+            for i in batch
+        )
+    return list(
+        CustomUser.objects.filter(username__startswith=prefix, role=role)
+        .order_by('-pk').values_list('pk', flat=True)[:count]
+    )
+
+
+def seed_class(teacher_id, student_ids, code, batch_size=5000):
+    class_obj = Class.objects.create(name=f'Bench {code}', code=code, teacher_id=teacher_id)
+    for batch in batched(student_ids, batch_size):
+        Enrollment.objects.bulk_create(
+            Enrollment(class_obj_id=class_obj.pk, student_id=student_id) for student_id in batch
+        )
+    return class_obj
+
+
+# ``calls`` below are (method, path, json_body or None, headers) tuples; both
+# runners return (requests per second, per-request latencies in ms).
+
+def send_threaded(calls, concurrency, errors=None):
+    """
+    Send ``calls`` through the test client from a pool of threads, like a
+    threaded WSGI server. Failed requests raise, unless an ``errors`` list is
+    given to collect them in.
+    """
+    local = threading.local()
+
+    def send(call):
+        if not hasattr(local, 'client'):
+            local.client = Client(raise_request_exception=errors is None)
+        method, path, body, headers = call
+        start = time.perf_counter()
+        response = local.client.generic(
+            method, path, json.dumps(body) if body else '', content_type='application/json', headers=headers,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            if errors is None:
+                raise AssertionError((path, response.status_code, response.content))
+            errors.append(response.status_code)
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(send, calls))
+    return len(calls) / (time.perf_counter() - start), samples
+
+
+async def send_async(calls, concurrency):
+    """Send ``calls`` through the ASGI test client with at most ``concurrency`` in flight."""
+    client = AsyncClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def send(call):
+        method, path, body, headers = call
+        async with slots:
+            start = time.perf_counter()
+            response = await client.generic(
+                method, path, json.dumps(body) if body else '', content_type='application/json', headers=headers,
+            )
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code >= 400:
+            raise AssertionError((path, response.status_code, response.content))
+        return elapsed
+
+    start = time.perf_counter()
+    samples = await asyncio.gather(*(send(call) for call in calls))
+    return len(calls) / (time.perf_counter() - start), samples
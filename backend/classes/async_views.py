@@ -0,0 +1,185 @@
+"""
+Async (ASGI-native) views for the classes API, routed ahead of ClassViewSet
+when ASYNC_API is on. They return the same bodies and status codes as the
+viewset; the bulk enrollment actions stay on the viewset.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, JsonResponse
+
+from accounts.serializers import CustomUserSerializer
+from accounts.models import CustomUser
+from backend.async_api import APIError, AsyncAPIView, parse_json
+from tasks.serializers import TaskSerializer
+
+from . import exports, response_cache
+from .conditional import class_etag, conditional_response
+from .membership import aenroll, ais_enrolled, aunenroll, parse_student_id
+from .models import Class
+from .pagination import ClassCursorPagination, RosterCursorPagination
+from .serializers import ClassSerializer
+from .tasks import email_roster_export
+from .views import classes_for
+
+
+def forbidden(message):
+    return JsonResponse({"message": message}, status=403)
+
+
+class AsyncClassView(AsyncAPIView):
+    async def get_object(self, request, pk, selection=None):
+        # classes_for() only returns the user's own classes, which is what
+        # IsTeacherOrStudent checks on the viewset.
+        try:
+            return await classes_for(request.user, selection).aget(pk=pk)
+        except Class.DoesNotExist:
+            raise Http404("No Class matches the given query.")
+
+    def get_serializer(self, request, *args, **kwargs):
+        return ClassSerializer(*args, context={'request': self.drf_request(request)}, **kwargs)
+
+
+class AsyncClassListView(AsyncClassView):
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    async def get(self, request):
+        selection = ClassSerializer.get_selection(request.GET)
+        async def paginate():
+            paginator = ClassCursorPagination()
+            rows = ClassSerializer.select_values(classes_for(request.user, selection), selection)
+            return await self.paginate_queryset(paginator, rows, request), paginator
+        return await response_cache.apage_response(request, paginate, JsonResponse, selection)
+
+    async def post(self, request):
+        if request.user.role != 'teacher':
+            return forbidden("Only teachers can create classes")
+        serializer = self.get_serializer(request, data=parse_json(request))
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        instance = await sync_to_async(serializer.save)(teacher_id=request.user.pk)
+        class_obj = await self.get_object(request, instance.pk)
+        return JsonResponse(ClassSerializer(class_obj).data, status=201)
+
+
+class AsyncClassDetailView(AsyncClassView):
+    http_method_names = ['get', 'put', 'patch', 'delete', 'head', 'options']
+
+    async def get(self, request, pk):
+        selection = ClassSerializer.get_selection(request.GET)
+        class_obj = await self.get_object(request, pk, selection)
+        return conditional_response(
+            request, lambda: JsonResponse(ClassSerializer(class_obj, context={'selection': selection}).data),
+            class_etag([class_obj], selection), class_obj.updated_at,
+        )
+
+    async def put(self, request, pk, partial=False):
+        if request.user.role != 'teacher':
+            return forbidden("Only teachers can update classes")
+        class_obj = await self.get_object(request, pk)
+        serializer = self.get_serializer(request, class_obj, data=parse_json(request), partial=partial)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+        await sync_to_async(serializer.save)()
+        return JsonResponse(serializer.data)
+
+    async def patch(self, request, pk):
+        return await self.put(request, pk, partial=True)
+
+    async def delete(self, request, pk):
+        if request.user.role != 'teacher':
+            return forbidden("Only teachers can delete classes")
+        class_obj = await self.get_object(request, pk)
+        await class_obj.adelete()
+        return HttpResponse(status=204)
+
+
+class AsyncClassStudentsView(AsyncClassView):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request, pk):
+        class_obj = await self.get_object(request, pk)
+        paginator = RosterCursorPagination()
+        rows = class_obj.students.values(*CustomUserSerializer.value_fields)
+        page = await self.paginate_queryset(paginator, rows, request)
+        return JsonResponse(
+            paginator.get_paginated_response(CustomUserSerializer.represent_values(page)).data
+        )
+
+
+class AsyncClassExportView(AsyncClassView):
+    http_method_names = ['get', 'post', 'head', 'options']
+
+    async def _check(self, request, pk):
+        if request.user.role != 'teacher':
+            raise APIError({"message": "Only teachers can export rosters"}, 403)
+        file_format = request.GET.get('as', 'csv')
+        if file_format not in exports.CONTENT_TYPES:
+            raise APIError({"message": "Format must be csv or ndjson"}, 400)
+        return await self.get_object(request, pk), file_format
+
+    async def get(self, request, pk):
+        class_obj, file_format = await self._check(request, pk)
+        rows = exports.roster_rows(class_obj.pk).iterator(chunk_size=exports.CHUNK_SIZE)
+        return exports.roster_response(
+            class_obj, exports.astream(rows, exports.ROSTER_COLUMNS, file_format, escape_formulas=True), file_format,
+        )
+
+    async def post(self, request, pk):
+        class_obj, file_format = await self._check(request, pk)
+        email = await sync_to_async(lambda: request.user.email)()
+        queued = await sync_to_async(email_roster_export.enqueue)(
+            owner_id=request.user.pk, class_id=str(class_obj.pk), file_format=file_format, email=email,
+        )
+        return JsonResponse(TaskSerializer(queued).data, status=202)
+
+
+class AsyncClassJoinView(AsyncClassView):
+    http_method_names = ['post', 'options']
+
+    async def post(self, request, pk):
+        if request.user.role != 'student':
+            return forbidden("Only students can join classes")
+        class_obj = await self.get_object(request, pk)
+        await aenroll(class_obj.pk, request.user.pk)
+        return JsonResponse({"message": "Successfully joined the class"})
+
+
+class AsyncClassRemoveStudentView(AsyncClassView):
+    http_method_names = ['post', 'options']
+
+    async def post(self, request, pk):
+        if request.user.role != 'teacher':
+            return forbidden("Only teachers can remove students")
+
+        class_obj = await self.get_object(request, pk)
+        student_id = parse_json(request).get('student_id')
+        if not student_id:
+            return JsonResponse({"message": "Student ID is required"}, status=400)
+        student_id = parse_student_id(student_id)
+        if student_id is None:
+            return JsonResponse({"message": "Student ID must be a number"}, status=400)
+
+        if not await ais_enrolled(class_obj.pk, student_id):
+            if not await CustomUser.objects.filter(id=student_id).aexists():
+                return JsonResponse({"message": "Student not found"}, status=404)
+            return JsonResponse({"message": "Student is not in this class"}, status=400)
+
+        await aunenroll(class_obj.pk, student_id)
+        return JsonResponse({"message": "Student removed successfully"})
+
+
+class AsyncClassLeaveView(AsyncClassView):
+    http_method_names = ['post', 'options']
+
+    async def post(self, request, pk):
+        if request.user.role != 'student':
+            return forbidden("Only students can leave class")
+
+        try:
+            class_obj = await self.get_object(request, pk)
+            if not await ais_enrolled(class_obj.pk, request.user.pk):
+                return JsonResponse({"message": "You are not in this class"}, status=400)
+
+            await aunenroll(class_obj.pk, request.user.pk, 'left')
+            return JsonResponse({"message": "Successfully left the class"})
+        except Exception as e:
+            return JsonResponse({"message": str(e)}, status=400)
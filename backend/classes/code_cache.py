@@ -0,0 +1,73 @@
+"""
+Cached class-code lookups for the join path.
+
+Maps a join code to its class id through ``caches[settings.CLASS_CODE_CACHE]``.
+That alias is a per-process LRU (LocMemCache) by default and Redis when
+REDIS_URL is set, so any backend with the Django cache API can stand in.
+Unknown codes are cached too, for a shorter time, so guessing codes does not
+reach the database. Entries are dropped when a class is saved or deleted
+(see classes.signals).
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+from .models import Class
+
+# Stored for codes that match no class; distinguishes "known missing" from a cache miss.
+MISSING = ''
+
+
+def _cache():
+    return caches[settings.CLASS_CODE_CACHE]
+
+
+def _key(code):
+    return f'class-code:{code}'
+
+
+def _is_code(code):
+    return isinstance(code, str) and len(code) == 6 and code.isalnum()
+
+
+def get_class_id(code):
+    """Return the id of the class with this join code, or None."""
+    if not _is_code(code):
+        return None
+    cache = _cache()
+    class_id = cache.get(_key(code))
+    if class_id is not None:
+        return class_id or None
+
+    class_id = Class.objects.filter(code=code).values_list('pk', flat=True).first()
+    if class_id is None:
+        cache.set(_key(code), MISSING, settings.CLASS_CODE_NEGATIVE_TIMEOUT)
+    else:
+        cache.set(_key(code), class_id)
+    return class_id
+
+
+async def aget_class_id(code):
+    """get_class_id() for the async views."""
+    if not _is_code(code):
+        return None
+    cache = _cache()
+    class_id = await cache.aget(_key(code))
+    if class_id is not None:
+        return class_id or None
+
+    class_id = await Class.objects.filter(code=code).values_list('pk', flat=True).afirst()
+    if class_id is None:
+        await cache.aset(_key(code), MISSING, settings.CLASS_CODE_NEGATIVE_TIMEOUT)
+    else:
+        await cache.aset(_key(code), class_id)
+    return class_id
+
+
+def forget_code(code):
+    if _is_code(code):
+        _cache().delete(_key(code))
+
+
+async def aforget_code(code):
+    if _is_code(code):
+        await _cache().adelete(_key(code))
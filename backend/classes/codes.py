@@ -0,0 +1,83 @@
+"""
+Class code allocation.
+
+Codes come from a keyed permutation of a counter: sequence number ``n`` is
+mapped through a balanced Feistel network over the 36^6 code space, so every
+``n`` yields a different six-character code. Allocating is one counter
+increment plus a few hash rounds, and one indexed lookup that skips codes
+already taken, which only happens to codes issued some other way (random
+codes from before the permutation, or under another key).
+
+The permutation key is ``settings.CLASS_CODE_KEY``, a secret of its own so
+that rotating SECRET_KEY leaves it alone. Changing it once codes have been
+handed out makes new codes hit old ones, which are then skipped.
+"""
+import hashlib
+import string
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import Class, ClassCodeSequence
+
+ALPHABET = string.digits + string.ascii_uppercase
+CODE_LENGTH = 6
+HALF_SPACE = len(ALPHABET) ** (CODE_LENGTH // 2)
+CODE_SPACE = HALF_SPACE * HALF_SPACE
+ROUNDS = 4
+SEQUENCE_ID = 1
+
+
+class CodeSpaceExhausted(Exception):
+    pass
+
+
+def _round(key, index, value):
+    digest = hashlib.blake2b(f'{index}:{value}'.encode(), key=key, digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % HALF_SPACE
+
+
+def permute(n, key=None):
+    """Map ``n`` in ``[0, CODE_SPACE)`` to a distinct integer in the same range."""
+    key = (key or settings.CLASS_CODE_KEY).encode()[:64]
+    left, right = divmod(n, HALF_SPACE)
+    for index in range(ROUNDS):
+        # Each round is invertible, so the composition is a bijection.
+        left, right = right, (left + _round(key, index, right)) % HALF_SPACE
+    return left * HALF_SPACE + right
+
+
+def encode(value):
+    chars = []
+    for _ in range(CODE_LENGTH):
+        value, digit = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def _reserve(count):
+    """Advance the shared sequence by ``count`` and return the first reserved number."""
+    sequence = ClassCodeSequence.objects.filter(pk=SEQUENCE_ID)
+    with transaction.atomic():
+        if not sequence.update(value=F('value') + count):
+            ClassCodeSequence.objects.get_or_create(pk=SEQUENCE_ID)
+            sequence.update(value=F('value') + count)
+        end = sequence.values_list('value', flat=True).get()
+    if end > CODE_SPACE:
+        raise CodeSpaceExhausted(f'All {CODE_SPACE} class codes have been allocated')
+    return end - count
+
+
+def allocate_codes(count):
+    codes = []
+    while len(codes) < count:
+        start = _reserve(count - len(codes))
+        batch = [encode(permute(n)) for n in range(start, start + count - len(codes))]
+        taken = set(Class.objects.filter(code__in=batch).values_list('code', flat=True))
+        codes.extend(code for code in batch if code not in taken)
+    return codes
+
+
+def allocate_code():
+    return allocate_codes(1)[0]
@@ -0,0 +1,53 @@
+"""
+Conditional GET (ETag/Last-Modified) for class resources.
+
+A class is versioned by ``updated_at``. It moves on every edit, on every
+roster change (see membership.roster_changed) and when its teacher's profile
+changes (see signals.invalidate_teacher_classes). Validators are computed from
+rows the view has already fetched, so a 304 costs no extra query and skips
+serialization.
+"""
+import hashlib
+
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag,
+)
+from django.utils.http import http_date
+
+
+def class_version(class_obj):
+    """``(id, updated_at)`` of a Class or of a ClassSerializer.select_values() row."""
+    if isinstance(class_obj, dict):
+        return class_obj['id'], class_obj['updated_at']
+    return class_obj.pk, class_obj.updated_at
+
+
+def class_etag(classes, *extra):
+    """ETag for ``classes`` in order, plus ``extra`` parts such as pagination links."""
+    digest = hashlib.md5(usedforsecurity=False)
+    for class_id, updated_at in map(class_version, classes):
+        digest.update(f'{class_id}:{updated_at.isoformat()};'.encode())
+    for part in extra:
+        digest.update(f'{part};'.encode())
+    return quote_etag(digest.hexdigest())
+
+
+def conditional_response(request, render, etag, last_modified=None):
+    """
+    Return 304 Not Modified when the request's validators match, else
+    ``render()``. Either response carries the validators, and clients must
+    revalidate before reusing a stored copy.
+
+    Lists pass no ``last_modified``: removing a class from a page does not
+    move the newest ``updated_at`` on it, so only the ETag is exact.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = render()
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,84 @@
+"""
+Live class rosters over WebSockets, at ``/ws/classes/<id>/?token=<access token>``.
+
+The class's teacher and enrolled students can connect. Each socket is a
+subscriber to the class's pub/sub channel and receives, as JSON text
+frames, the roster deltas published by classes.membership ("joined",
+"left", "removed"). A client should load the roster once the socket is
+open and apply the deltas from then on instead of polling; it does not
+send anything. A student who leaves or is removed gets that delta and then
+a 4403 close; everyone gets a 4404 close when the class is deleted, and a
+4401 close when their access token expires (reconnect with a new one). A
+client that falls too far behind is closed with 1013 and should reconnect
+and reload.
+"""
+import asyncio
+import time
+import uuid
+
+from backend import pubsub
+from backend.websockets import (
+    FORBIDDEN, NOT_FOUND, TRY_AGAIN_LATER, UNAUTHORIZED, authenticate, database_sync_to_async, reject,
+)
+from .membership import is_enrolled, roster_channel
+from .models import Class
+
+
+@database_sync_to_async
+def check_access(scope, class_id):
+    """The connecting user and their token's expiry, or the close code to reject them with."""
+    user, token = authenticate(scope)
+    if user is None:
+        return None, None, UNAUTHORIZED
+    teacher_id = Class.objects.filter(pk=class_id).values_list('teacher_id', flat=True).first()
+    if teacher_id is None:
+        return None, None, NOT_FOUND
+    if user.role == 'teacher':
+        allowed = teacher_id == user.pk
+    else:
+        allowed = is_enrolled(class_id, user.pk)
+    return (user, token['exp'], None) if allowed else (None, None, FORBIDDEN)
+
+
+async def wait_for_disconnect(receive, subscription):
+    while (await receive())['type'] != 'websocket.disconnect':
+        pass
+    subscription.close()
+
+
+async def roster_socket(scope, receive, send, pk):
+    if (await receive())['type'] != 'websocket.connect':
+        return
+    try:
+        class_id = uuid.UUID(pk)
+    except ValueError:
+        return await reject(send, NOT_FOUND)
+    user, expires_at, code = await check_access(scope, class_id)
+    if code is not None:
+        return await reject(send, code)
+
+    # Subscribe before accepting, so that a roster loaded once the socket
+    # is open misses no change.
+    async with pubsub.get_broker().subscribe(roster_channel(class_id)) as subscription:
+        await send({'type': 'websocket.accept'})
+        reader = asyncio.create_task(wait_for_disconnect(receive, subscription))
+        try:
+            async with asyncio.timeout(expires_at - time.time()):
+                code = await forward(subscription, send, user)
+        except TimeoutError:
+            code = UNAUTHORIZED
+        finally:
+            reader.cancel()
+        if code is not None:
+            await send({'type': 'websocket.close', 'code': code})
+
+
+async def forward(subscription, send, user):
+    """Send deltas until the subscription ends; returns the close code, if any."""
+    while (message := await subscription.get()) is not None:
+        if message.payload['type'] == 'deleted':
+            return NOT_FOUND
+        await send({'type': 'websocket.send', 'text': message.text})
+        if user.pk in message.payload.get('student_ids', ()):
+            return FORBIDDEN
+    return TRY_AGAIN_LATER if subscription.overflowed else None
@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from classes.exports import CHUNK_SIZE, DATASETS, ENCODERS, stream
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream all users, classes or enrollments to a CSV or NDJSON file. Rows are "
+        "read with a database iterator and written in batches, so memory use does not "
+        "grow with the number of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--format', choices=list(ENCODERS), default='csv', dest='file_format')
+        parser.add_argument('--output', default='-', help="File to write, or '-' for stdout.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        queryset, columns = DATASETS[options['dataset']]
+        rows = queryset.values_list(*columns).iterator(chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            output = sys.stdout.buffer
+        else:
+            try:
+                output = open(options['output'], 'wb')
+            except OSError as exc:
+                raise CommandError(exc)
+
+        try:
+            for chunk in stream(rows, columns, options['file_format']):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stderr.write(f"Wrote {options['dataset']} to {options['output']}")
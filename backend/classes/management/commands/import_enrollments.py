@@ -0,0 +1,74 @@
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from classes.membership import BULK_BATCH_SIZE, batched, bulk_enroll, bulk_unenroll, resolve_students
+from classes.models import Class
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream enrollments from a CSV file of 'class_code,student' rows, where student "
+        "is an id or email. Rows are read and written in batches, so memory use does not "
+        "grow with the size of the file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to read, or '-' for stdin.")
+        parser.add_argument('--batch-size', type=int, default=BULK_BATCH_SIZE)
+        parser.add_argument('--unenroll', action='store_true',
+                            help="Remove the listed enrollments instead of adding them.")
+        parser.add_argument('--skip-header', action='store_true')
+
+    def handle(self, *args, **options):
+        apply = bulk_unenroll if options['unenroll'] else bulk_enroll
+        if options['path'] == '-':
+            stream = sys.stdin
+        else:
+            try:
+                stream = open(options['path'], newline='', encoding='utf-8')
+            except OSError as exc:
+                raise CommandError(exc)
+        class_ids = {}
+        rows = changed = skipped = 0
+
+        with stream:
+            reader = csv.reader(stream)
+            if options['skip_header']:
+                next(reader, None)
+            for batch in batched(reader, options['batch_size']):
+                by_class = {}
+                for row in batch:
+                    rows += 1
+                    if len(row) < 2:
+                        skipped += 1
+                        continue
+                    by_class.setdefault(row[0].strip(), []).append(row[1])
+
+                self._load_class_ids(class_ids, by_class)
+                for code, identifiers in by_class.items():
+                    if class_ids.get(code) is None:
+                        skipped += len(identifiers)
+                        continue
+                    student_ids, not_found = resolve_students(identifiers)
+                    skipped += len(not_found)
+                    changed += apply(class_ids[code], student_ids, options['batch_size'])
+
+                if options['verbosity'] > 1:
+                    self.stdout.write(f"{rows} rows read")
+
+        verb = 'removed' if options['unenroll'] else 'added'
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} rows read, {changed} enrollments {verb}, {skipped} rows skipped"
+        ))
+
+    def _load_class_ids(self, class_ids, by_class):
+        missing = [code for code in by_class if code not in class_ids]
+        if not missing:
+            return
+        class_ids.update(Class.objects.filter(code__in=missing).values_list('code', 'pk'))
+        for code in missing:
+            if code not in class_ids:
+                class_ids[code] = None
+                self.stderr.write(f"Unknown class code: {code}")
@@ -0,0 +1,222 @@
+"""
+Roster membership checks and bulk roster changes.
+
+Every check is a single EXISTS query on the enrollment table, answered from
+its unique (class, student) index, so the cost does not depend on roster size.
+Never test membership with ``user in class_obj.students.all()``: that loads
+the whole roster into memory.
+
+Roster changes are also published, after commit, to the class's pub/sub
+channel as deltas for the live roster sockets (classes/live.py)::
+
+    {"type": "joined", "class_id": ..., "students": [<CustomUserSerializer rows>]}
+    {"type": "left" | "removed", "class_id": ..., "student_ids": [...]}
+    {"type": "deleted", "class_id": ...}
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from accounts.serializers import CustomUserSerializer
+from backend import pubsub
+from . import response_cache
+from .models import Class, Enrollment
+
+BULK_BATCH_SIZE = 1000
+
+
+def roster_channel(class_id):
+    return f'class:{class_id}'
+
+
+def publish_roster_event(class_ids, event, student_ids):
+    """Publish an ``event`` delta for ``student_ids`` to each of ``class_ids`` that has subscribers."""
+    broker = pubsub.get_broker()
+    channels = {
+        class_id: roster_channel(class_id) for class_id in class_ids
+        if broker.has_subscribers(roster_channel(class_id))
+    }
+    if not channels or not student_ids:
+        return
+    student_ids = sorted({int(pk) for pk in student_ids})
+    if event == 'joined':
+        rows = CustomUser.objects.filter(pk__in=student_ids).order_by('pk').values(*CustomUserSerializer.value_fields)
+        delta = {'students': CustomUserSerializer.represent_values(rows)}
+    else:
+        delta = {'student_ids': student_ids}
+    for class_id, channel in channels.items():
+        broker.publish(channel, {'type': event, 'class_id': str(class_id), **delta})
+
+
+def class_deleted(class_id):
+    """Publish, after commit, that ``class_id`` is gone, for its live roster sockets to close."""
+    channel = roster_channel(class_id)
+    payload = {'type': 'deleted', 'class_id': str(class_id)}
+    transaction.on_commit(lambda: pubsub.publish(channel, payload))
+
+
+def roster_changed(class_ids, student_ids=(), event=None):
+    """
+    Record that the rosters of ``class_ids`` changed, adding or removing
+    ``student_ids``; ``event`` ("joined", "left" or "removed") is published
+    to the live roster sockets.
+
+    Every roster write ends up here: the functions below call it directly
+    and ``students.add()``/``remove()``/``clear()`` reach it through the
+    m2m_changed receiver in classes.signals. It moves ``Class.updated_at``,
+    which versions the class for conditional GETs and the response cache,
+    since the student count is part of the class payload, and drops the
+    cached pages of the students whose class list changed.
+    """
+    class_ids, student_ids = list(class_ids), list(student_ids)
+    now = timezone.now()
+    Class.objects.filter(pk__in=class_ids).update(updated_at=now)
+
+    def invalidate():
+        response_cache.classes_changed(dict.fromkeys(class_ids, now))
+        response_cache.users_changed(student_ids)
+    transaction.on_commit(invalidate)
+    if event is not None:
+        transaction.on_commit(lambda: publish_roster_event(class_ids, event, student_ids))
+
+
+def is_enrolled(class_id, student_id):
+    return Enrollment.objects.filter(class_obj_id=class_id, student_id=student_id).exists()
+
+
+def is_member(class_obj, user):
+    """True if ``user`` teaches ``class_obj`` or is enrolled in it."""
+    if user.role == 'teacher':
+        return class_obj.teacher_id == user.pk
+    return is_enrolled(class_obj.pk, user.pk)
+
+
+def enroll(class_id, student_id):
+    """
+    Enroll a student with a single INSERT. Returns False if they were already
+    enrolled; any other integrity error (e.g. the class is gone) propagates.
+    """
+    try:
+        with transaction.atomic():
+            Enrollment.objects.create(class_obj_id=class_id, student_id=student_id)
+            roster_changed([class_id], [student_id], 'joined')
+    except IntegrityError:
+        if is_enrolled(class_id, student_id):
+            return False
+        raise
+    return True
+
+
+async def ais_enrolled(class_id, student_id):
+    return await Enrollment.objects.filter(class_obj_id=class_id, student_id=student_id).aexists()
+
+
+async def aenroll(class_id, student_id):
+    """enroll() for the async views; acreate() runs in autocommit, so no savepoint is needed."""
+    try:
+        await Enrollment.objects.acreate(class_obj_id=class_id, student_id=student_id)
+    except IntegrityError:
+        if await ais_enrolled(class_id, student_id):
+            return False
+        raise
+    await sync_to_async(roster_changed)([class_id], [student_id], 'joined')
+    return True
+
+
+def unenroll(class_id, student_id, event='removed'):
+    """
+    Remove a student with a single DELETE; ``event`` is "left" when they
+    leave on their own. Returns False if they were not enrolled.
+    """
+    with transaction.atomic():
+        deleted = Enrollment.objects.filter(class_obj_id=class_id, student_id=student_id).delete()[0]
+        if deleted:
+            roster_changed([class_id], [student_id], event)
+    return bool(deleted)
+
+
+async def aunenroll(class_id, student_id, event='removed'):
+    """unenroll() for the async views."""
+    deleted = (await Enrollment.objects.filter(class_obj_id=class_id, student_id=student_id).adelete())[0]
+    if deleted:
+        await sync_to_async(roster_changed)([class_id], [student_id], event)
+    return bool(deleted)
+
+
+def batched(iterable, size=BULK_BATCH_SIZE):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def parse_student_id(value):
+    """A student id given as a number or a string of digits, or None if it is neither."""
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def resolve_students(identifiers):
+    """
+    Map a list of student ids and/or emails to student ids.
+
+    Returns ``(student_ids, not_found)``; ``not_found`` keeps the identifiers
+    that matched no student account, in their original form.
+    """
+    ids, emails = {}, {}
+    for identifier in identifiers:
+        value = str(identifier).strip()
+        if value.isdigit():
+            ids[int(value)] = identifier
+        elif value:
+            # Stored emails are lowercase (CustomUserManager.normalize_email).
+            emails[CustomUser.objects.normalize_email(value)] = identifier
+
+    found = CustomUser.objects.filter(role='student').filter(
+        Q(pk__in=list(ids)) | Q(email__in=list(emails))
+    ).values_list('pk', 'email')
+    student_ids = set()
+    for pk, email in found:
+        student_ids.add(pk)
+        ids.pop(pk, None)
+        emails.pop(email, None)
+    return sorted(student_ids), [*ids.values(), *emails.values()]
+
+
+def bulk_enroll(class_id, student_ids, batch_size=BULK_BATCH_SIZE):
+    """Enroll students in batches, skipping existing enrollments. Returns the number added."""
+    added = 0
+    for batch in batched(student_ids, batch_size):
+        with transaction.atomic():
+            existing = set(
+                Enrollment.objects.filter(class_obj_id=class_id, student_id__in=batch)
+                .values_list('student_id', flat=True)
+            )
+            new = [
+                Enrollment(class_obj_id=class_id, student_id=student_id)
+                for student_id in dict.fromkeys(batch) if student_id not in existing
+            ]
+            # ignore_conflicts covers rows enrolled concurrently since the check.
+            Enrollment.objects.bulk_create(new, ignore_conflicts=True)
+            if new:
+                roster_changed([class_id], [enrollment.student_id for enrollment in new], 'joined')
+            added += len(new)
+    return added
+
+
+def bulk_unenroll(class_id, student_ids, batch_size=BULK_BATCH_SIZE):
+    """Remove students in batches. Returns the number removed."""
+    removed = 0
+    for batch in batched(student_ids, batch_size):
+        with transaction.atomic():
+            enrolled = Enrollment.objects.filter(class_obj_id=class_id, student_id__in=batch)
+            # Only the students actually removed go into the roster delta.
+            student_ids = list(enrolled.values_list('student_id', flat=True))
+            deleted = enrolled.filter(student_id__in=student_ids).delete()[0] if student_ids else 0
+            if deleted:
+                roster_changed([class_id], student_ids, 'removed')
+            removed += deleted
+    return removed
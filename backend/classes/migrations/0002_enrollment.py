@@ -0,0 +1,46 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Enrollment takes over the table of the implicit Class.students
+        # through model as-is (same table, columns, unique index and FK
+        # indexes), so only the migration state changes here.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='Enrollment',
+                    fields=[
+                        ('id', models.AutoField(primary_key=True, serialize=False)),
+                        ('class_obj', models.ForeignKey(db_column='class_id', on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='classes.class')),
+                        ('student', models.ForeignKey(db_column='customuser_id', on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'classes_class_students',
+                        'unique_together': {('class_obj', 'student')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='class',
+                    name='students',
+                    field=models.ManyToManyField(blank=True, related_name='enrolled_classes', through='classes.Enrollment', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.1.3 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0002_enrollment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassCodeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
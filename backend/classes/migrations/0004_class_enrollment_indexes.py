@@ -0,0 +1,39 @@
+# Generated by Django 5.1.3 on 2026-10-18 13:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0003_classcodesequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='class',
+            name='teacher',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='teaching_classes', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='class_obj',
+            field=models.ForeignKey(db_column='class_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to='classes.class'),
+        ),
+        migrations.AlterField(
+            model_name='enrollment',
+            name='student',
+            field=models.ForeignKey(db_column='customuser_id', db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='enrollments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='class',
+            index=models.Index(fields=['teacher', 'created_at'], name='class_teacher_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='enrollment',
+            index=models.Index(fields=['student', 'class_obj'], name='enrollment_student_class_idx'),
+        ),
+    ]
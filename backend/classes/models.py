@@ -1,16 +1,67 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 import uuid
 from accounts.models import CustomUser
 
+
+class ClassQuerySet(models.QuerySet):
+    def with_student_count(self):
+        # A correlated subquery rather than Count('students'): the student-side
+        # querysets already join the roster table to filter on the current user,
+        # and an aggregate over that join would only ever count one row.
+        roster = Enrollment.objects.filter(class_obj=OuterRef('pk'))
+        return self.annotate(student_count=Coalesce(Subquery(
+            roster.values('class_obj').annotate(count=Count('*')).values('count')
+        ), 0))
+
+
 class Class(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     subject = models.TextField(blank=True)
     code = models.CharField(max_length=6, unique=True)
-    teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='teaching_classes')
-    students = models.ManyToManyField(CustomUser, related_name='enrolled_classes', blank=True)
+    # Indexed by (teacher, created_at) below.
+    teacher = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='teaching_classes', db_index=False)
+    students = models.ManyToManyField(CustomUser, through='Enrollment', related_name='enrolled_classes', blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ClassQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # A teacher's classes, newest first (ClassCursorPagination).
+            models.Index(fields=['teacher', 'created_at'], name='class_teacher_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class Enrollment(models.Model):
+    # Keeps the table and columns Django created for the original implicit
+    # ManyToManyField, so existing rosters carry over without a data copy.
+    id = models.AutoField(primary_key=True)
+    # class_obj and student are indexed by the unique constraint and the index in Meta.
+    class_obj = models.ForeignKey(
+        Class, on_delete=models.CASCADE, related_name='enrollments', db_column='class_id', db_index=False,
+    )
+    student = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='enrollments', db_column='customuser_id', db_index=False,
+    )
+    joined_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'classes_class_students'
+        unique_together = [('class_obj', 'student')]
+        indexes = [models.Index(fields=['student', 'class_obj'], name='enrollment_student_class_idx')]
+
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return f"{self.student_id} in {self.class_obj_id}"
+
+
+class ClassCodeSequence(models.Model):
+    """Single-row counter feeding the class code permutation in classes.codes."""
+    value = models.BigIntegerField(default=0)
@@ -0,0 +1,21 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ClassCursorPagination(CursorPagination):
+    """
+    Keyset pagination for class lists, newest first. Pages are addressed by an
+    opaque cursor on created_at, so the cost of a page does not depend on how
+    far into the list it is.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+
+
+class RosterCursorPagination(CursorPagination):
+    """Keyset pagination for a class roster, ordered by student id."""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'id'
@@ -0,0 +1,34 @@
+import codecs
+import csv
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+HEADER_NAMES = {'id', 'student', 'student_id', 'email'}
+
+
+def read_identifiers(stream, encoding=None):
+    """
+    Yield the first column of a CSV stream of student ids/emails, skipping
+    blank rows and an optional header row.
+    """
+    reader = csv.reader(codecs.getreader(encoding or settings.DEFAULT_CHARSET)(stream))
+    for line, row in enumerate(reader):
+        if not row or not row[0].strip():
+            continue
+        if line == 0 and row[0].strip().lower() in HEADER_NAMES:
+            continue
+        yield row[0].strip()
+
+
+class CSVParser(BaseParser):
+    """Parses a text/csv body of student ids/emails into ``{"students": [...]}``."""
+    media_type = 'text/csv'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding')
+        try:
+            return {'students': list(read_identifiers(stream, encoding))}
+        except (csv.Error, UnicodeDecodeError) as exc:
+            raise ParseError(f'CSV parse error - {exc}')
@@ -1,10 +1,13 @@
 from rest_framework import permissions
+from .membership import is_member
 
 class IsTeacherOrStudent(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.role in ['teacher', 'student']
 
     def has_object_permission(self, request, view, obj):
-        if request.user.role == 'teacher':
-            return obj.teacher == request.user
-        return request.user in obj.students.all()
\ No newline at end of file
+        # Views whose queryset is classes_for(user) only ever find the
+        # user's own classes; checking again would cost students a query.
+        if getattr(view, 'queryset_is_membership', False):
+            return True
+        return is_member(obj, request.user)
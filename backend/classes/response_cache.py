@@ -0,0 +1,166 @@
+"""
+Per-user cache of serialized class-list pages: the class list (teachers and
+students) and the enrolled-classes list, which the frontend polls.
+
+An entry is keyed by user, role, request path and the user's generation,
+and records the version (``updated_at``) of every class on the page. It is
+served only while the cache holds the same version for each of them:
+
+- a roster change, edit or deletion of a class moves or drops its version,
+  which invalidates every page that shows it (the student count is part of
+  the payload), without touching per-user keys;
+- joining, leaving or creating a class changes which classes a user sees,
+  so it also moves that user's generation.
+
+Invalidations are applied after the transaction commits (see
+classes.signals), and a miss reads the generation before querying, so a
+page filled from pre-commit data is never stored under a live key.
+"""
+import hashlib
+import uuid
+from collections import Counter
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from backend.cache import evictions
+
+from .conditional import class_etag, class_version, conditional_response
+from .serializers import ClassSerializer
+
+# Version of a deleted class.
+REMOVED = 'removed'
+
+_counts = Counter()
+_counts_lock = Lock()
+
+
+def _count(name):
+    with _counts_lock:
+        _counts[name] += 1
+
+
+def _cache():
+    return caches[settings.RESPONSE_CACHE]
+
+
+def _version_key(class_id):
+    return f'class-version:{class_id}'
+
+
+def _generation_key(user_id):
+    return f'response-gen:{user_id}'
+
+
+def _generation(cache, user_id):
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        generation = cache.get(key)
+    return generation
+
+
+def _is_fresh(cache, entry):
+    versions = entry['versions']
+    if not versions:
+        return True
+    current = cache.get_many([_version_key(class_id) for class_id in versions])
+    return all(current.get(_version_key(class_id)) == version for class_id, version in versions.items())
+
+
+def lookup(user, path):
+    """Return ``(entry, key)``; ``entry`` is None on a miss, ``key`` is where to store the page."""
+    cache = _cache()
+    digest = hashlib.md5(path.encode(), usedforsecurity=False).hexdigest()
+    key = f'response:{user.pk}:{user.role}:{_generation(cache, user.pk)}:{digest}'
+    entry = cache.get(key)
+    if entry is not None and _is_fresh(cache, entry):
+        _count('hits')
+        return entry, key
+    _count('misses' if entry is None else 'stale')
+    return None, key
+
+
+def store(key, classes, etag, data):
+    cache = _cache()
+    versions = {str(class_id): updated_at.isoformat() for class_id, updated_at in map(class_version, classes)}
+    for class_id, version in versions.items():
+        # add() never replaces a newer version written by an invalidation.
+        cache.add(_version_key(class_id), version, None)
+    cache.set(key, {'etag': etag, 'data': data, 'versions': versions})
+
+
+def classes_changed(versions):
+    """Record new ``{class_id: updated_at}`` versions."""
+    _cache().set_many(
+        {_version_key(class_id): updated_at.isoformat() for class_id, updated_at in versions.items()}, None,
+    )
+
+
+def classes_removed(class_ids):
+    # A tombstone rather than a delete, so that a page read just before the
+    # deletion cannot add() the old version back. It outlives every entry.
+    _cache().set_many({_version_key(class_id): REMOVED for class_id in class_ids})
+
+
+def users_changed(user_ids):
+    """Drop every cached page of ``user_ids``."""
+    _cache().set_many({_generation_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+
+
+def stats():
+    with _counts_lock:
+        counts = dict(_counts)
+    lookups = sum(counts.values())
+    return {
+        'enabled': settings.RESPONSE_CACHE_ENABLED,
+        'hits': counts.get('hits', 0),
+        'misses': counts.get('misses', 0),
+        'stale': counts.get('stale', 0),
+        'hit_ratio': counts.get('hits', 0) / lookups if lookups else None,
+        'evictions': evictions(_cache()),
+    }
+
+
+def _render(request, key, page, paginator, respond, selection):
+    etag = class_etag(page, selection, paginator.get_next_link(), paginator.get_previous_link())
+
+    def render():
+        results = ClassSerializer.represent_values(page, selection)
+        data = paginator.get_paginated_response(results).data
+        if key is not None:
+            store(key, page, etag, dict(data))
+        return respond(data)
+
+    return conditional_response(request, render, etag)
+
+
+def page_response(request, paginate, respond, selection=None):
+    """
+    Serve a page of classes from the cache, or build it with ``paginate()``
+    and cache it. ``paginate()`` returns ``(page, paginator)``, the page being
+    ClassSerializer.select_values() rows for ``selection``. ``respond(data)``
+    wraps the body in a response.
+    """
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return _render(request, None, *paginate(), respond, selection)
+    entry, key = lookup(request.user, request.get_full_path())
+    if entry is not None:
+        return conditional_response(request, lambda: respond(entry['data']), entry['etag'])
+    return _render(request, key, *paginate(), respond, selection)
+
+
+async def apage_response(request, paginate, respond, selection=None):
+    """page_response() for async views; ``paginate`` is a coroutine function."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        page, paginator = await paginate()
+        # An expanded roster is read while rendering.
+        return await sync_to_async(_render)(request, None, page, paginator, respond, selection)
+    entry, key = await sync_to_async(lookup)(request.user, request.get_full_path())
+    if entry is not None:
+        return conditional_response(request, lambda: respond(entry['data']), entry['etag'])
+    page, paginator = await paginate()
+    return await sync_to_async(_render)(request, key, page, paginator, respond, selection)
@@ -1,19 +1,192 @@
+from collections import defaultdict
+from operator import itemgetter
+from typing import NamedTuple
+
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Class
-import random
-import string
+from .models import Class, Enrollment
+from .codes import allocate_code
+from accounts.models import CustomUser
 from accounts.serializers import CustomUserSerializer
+from backend.instrumentation import timed
+
+
+class EagerLoadingMixin:
+    """
+    Builds select_related/prefetch_related from the nested serializers
+    declared on the class, so views never have to keep the two in sync.
+    """
+
+    @classmethod
+    def get_eager_loading_paths(cls, prefix='', fields=None):
+        """``fields`` limits the paths to those output fields."""
+        select_related, prefetch_related = [], []
+        if fields is None:
+            fields = getattr(cls.Meta, 'fields', None)
+        for name, field in cls._declared_fields.items():
+            if fields not in (None, serializers.ALL_FIELDS) and name not in fields:
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, serializers.ModelSerializer):
+                continue
+            path = prefix + (field.source or name)
+            (prefetch_related if many else select_related).append(path)
+            if isinstance(nested, EagerLoadingMixin):
+                nested_select, nested_prefetch = nested.get_eager_loading_paths(path + '__')
+                # Anything below a prefetched relation has to be prefetched too.
+                (prefetch_related if many else select_related).extend(nested_select)
+                prefetch_related.extend(nested_prefetch)
+        return select_related, prefetch_related
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        select_related, prefetch_related = cls.get_eager_loading_paths(fields=fields)
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
+
+
+# Renders datetimes exactly like the serializers' DateTimeFields.
+_datetime = serializers.DateTimeField()
+
+
+class FieldSelection(NamedTuple):
+    """Output fields and expanded relations, in declaration order."""
+    fields: tuple
+    expand: tuple
+
 
-class ClassSerializer(serializers.ModelSerializer):
+class ClassSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     teacher = CustomUserSerializer(read_only=True)
+    # Only rendered with ?expand=students; the roster is otherwise served
+    # paginated from /api/classes/{id}/students/.
     students = CustomUserSerializer(many=True, read_only=True)
+    student_count = serializers.SerializerMethodField()
+
+    # Relations rendered as nested objects when named in ?expand=. Otherwise
+    # teacher is rendered as its id and students is left out.
+    expandable_fields = ('teacher', 'students')
+    default_expand = ('teacher',)
+
     class Meta:
         model = Class
-        fields = ('id', 'name', 'subject', 'code', 'teacher', 'students', 'created_at')
+        fields = ('id', 'name', 'subject', 'code', 'teacher', 'students', 'student_count', 'created_at')
         read_only_fields = ('code', 'teacher')
 
+    @classmethod
+    def get_selection(cls, query_params):
+        """
+        The FieldSelection asked for by ``?fields=`` (default: all) and
+        ``?expand=`` (default: teacher). Unknown names are a ValidationError.
+        """
+        def names(param, choices):
+            value = query_params.get(param)
+            if value is None:
+                return None
+            requested = {name.strip() for name in value.split(',')} - {''}
+            unknown = requested.difference(choices)
+            if unknown:
+                raise serializers.ValidationError({param: [f"Unknown field(s): {', '.join(sorted(unknown))}"]})
+            return requested
+
+        expand = names('expand', cls.expandable_fields)
+        expand = cls.default_expand if expand is None else tuple(
+            name for name in cls.expandable_fields if name in expand
+        )
+        fields = names('fields', cls.Meta.fields)
+        return FieldSelection(
+            fields=tuple(
+                name for name in cls.Meta.fields
+                if (fields is None or name in fields)
+                and (name in expand or not isinstance(cls._declared_fields.get(name), serializers.ListSerializer))
+            ),
+            expand=expand,
+        )
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, selection=None):
+        """Load only what ``selection`` (default: get_selection({})) renders."""
+        fields, expand = selection or cls.get_selection({})
+        # Always loaded: the primary key, membership checks (teacher_id),
+        # pagination (created_at) and ETags (updated_at).
+        columns = ['teacher_id', 'created_at', 'updated_at']
+        columns += [name for name in ('name', 'subject', 'code') if name in fields]
+        if 'teacher' in fields and 'teacher' in expand:
+            queryset = super().setup_eager_loading(queryset, ['teacher'])
+            columns += ['teacher__' + name for name in CustomUserSerializer.value_fields]
+        if 'students' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'students', CustomUser.objects.only(*CustomUserSerializer.value_fields).order_by('id'),
+            ))
+        if 'student_count' in fields:
+            queryset = queryset.with_student_count()
+        return queryset.only(*columns)
+
+    @classmethod
+    def select_values(cls, queryset, selection=None):
+        """
+        Rows of ``queryset`` (set up by setup_eager_loading()) for
+        represent_values(). ``id`` and ``updated_at`` are always selected;
+        the class-list cache and ETags use them.
+        """
+        fields, expand = selection or cls.get_selection({})
+        columns = ['id', 'created_at', 'updated_at']
+        columns += [name for name in ('name', 'subject', 'code', 'student_count') if name in fields]
+        if 'teacher' in fields:
+            columns += (
+                ['teacher__' + name for name in CustomUserSerializer.value_fields]
+                if 'teacher' in expand else ['teacher_id']
+            )
+        return queryset.prefetch_related(None).values(*columns)
+
+    @classmethod
+    def represent_values(cls, rows, selection=None):
+        """
+        Read-only fast path: what ``ClassSerializer(classes, many=True)``
+        renders, built from select_values() rows. An expanded roster costs
+        one query for all ``rows``.
+        """
+        fields, expand = selection or cls.get_selection({})
+        getters = {
+            'id': lambda row: str(row['id']),
+            'teacher': (
+                (lambda row: CustomUserSerializer.from_values(row, 'teacher__'))
+                if 'teacher' in expand else itemgetter('teacher_id')
+            ),
+            'created_at': lambda row: _datetime.to_representation(row['created_at']),
+        }
+        if 'students' in fields:
+            rosters = defaultdict(list)
+            enrollments = Enrollment.objects.filter(class_obj__in=[row['id'] for row in rows]).values(
+                'class_obj_id', *('student__' + name for name in CustomUserSerializer.value_fields),
+            )
+            for row in enrollments.order_by('student_id'):
+                rosters[row['class_obj_id']].append(CustomUserSerializer.from_values(row, 'student__'))
+            getters['students'] = lambda row: rosters[row['id']]
+        getters = [(name, getters.get(name, itemgetter(name))) for name in fields]
+        with timed('serialize'):
+            return [{name: get(row) for name, get in getters} for row in rows]
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get('selection') or self.get_selection({})
+        if 'teacher' not in selection.expand:
+            fields['teacher'] = serializers.PrimaryKeyRelatedField(read_only=True)
+        return {name: fields[name] for name in selection.fields}
+
+    def get_student_count(self, obj):
+        count = getattr(obj, 'student_count', None)
+        # Freshly created instances don't carry the annotation.
+        return obj.students.count() if count is None else count
+
     def create(self, validated_data):
-        code = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-        validated_data['code'] = code
-        validated_data['teacher'] = self.context['request'].user
-        return super().create(validated_data)
\ No newline at end of file
+        validated_data['code'] = allocate_code()
+        validated_data.setdefault('teacher_id', self.context['request'].user.pk)
+        return super().create(validated_data)
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from accounts.serializers import CustomUserSerializer
+
+from . import response_cache
+from .code_cache import forget_code
+from .membership import class_deleted, roster_changed
+from .models import Class
+
+
+@receiver(post_save, sender=Class)
+@receiver(post_delete, sender=Class)
+def forget_cached_code(sender, instance, **kwargs):
+    forget_code(instance.code)
+
+
+@receiver(post_save, sender=Class)
+def invalidate_saved_class(sender, instance, created, **kwargs):
+    def invalidate():
+        response_cache.classes_changed({instance.pk: instance.updated_at})
+        if created:
+            response_cache.users_changed([instance.teacher_id])
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_teacher_classes(sender, instance, created, update_fields, **kwargs):
+    # The class payload embeds the teacher, so a profile edit moves the
+    # version of every class they teach. Saves that only touch other columns
+    # (last_login on every sign-in) leave them alone.
+    if created or instance.role != 'teacher':
+        return
+    if update_fields is not None and not set(update_fields) & set(CustomUserSerializer.value_fields):
+        return
+    now = timezone.now()
+    class_ids = list(Class.objects.filter(teacher_id=instance.pk).values_list('pk', flat=True))
+    if class_ids:
+        Class.objects.filter(pk__in=class_ids).update(updated_at=now)
+        transaction.on_commit(lambda: response_cache.classes_changed(dict.fromkeys(class_ids, now)))
+
+
+@receiver(post_delete, sender=Class)
+def invalidate_deleted_class(sender, instance, **kwargs):
+    # delete() clears instance.pk before the callback runs.
+    class_ids = [instance.pk]
+    transaction.on_commit(lambda: response_cache.classes_removed(class_ids))
+    class_deleted(class_ids[0])
+
+
+@receiver(m2m_changed, sender=Class.students.through)
+def track_roster_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove') and pk_set:
+        event = 'joined' if action == 'post_add' else 'removed'
+        if reverse:
+            # instance is the student; pk_set holds class ids.
+            roster_changed(pk_set, [instance.pk], event)
+        else:
+            roster_changed([instance.pk], pk_set, event)
+    elif action == 'pre_clear':
+        # After the clear there is no way to tell which rows went.
+        if reverse:
+            roster_changed(instance.enrolled_classes.values_list('pk', flat=True), [instance.pk], 'removed')
+        else:
+            roster_changed([instance.pk], instance.students.values_list('pk', flat=True), 'removed')
@@ -0,0 +1,38 @@
+from django.core.mail import EmailMessage
+
+from tasks.queue import task
+
+from . import exports
+from .membership import bulk_enroll, bulk_unenroll, resolve_students
+from .models import Class
+
+BULK_ACTIONS = {
+    'enroll': (bulk_enroll, 'enrolled'),
+    'unenroll': (bulk_unenroll, 'unenrolled'),
+}
+
+
+@task
+def email_roster_export(class_id, file_format, email):
+    """Email ``class_id``'s roster as a CSV or NDJSON attachment."""
+    class_obj = Class.objects.only('name', 'code').get(pk=class_id)
+    rows = exports.roster_rows(class_id).iterator(chunk_size=exports.CHUNK_SIZE)
+    content = b''.join(exports.stream(rows, exports.ROSTER_COLUMNS, file_format, escape_formulas=True))
+    message = EmailMessage(
+        f"Roster of {class_obj.name}",
+        f"The roster of {class_obj.name} ({class_obj.code}) is attached.\n",
+        to=[email],
+    )
+    message.attach(exports.roster_filename(class_obj, file_format), content, exports.CONTENT_TYPES[file_format])
+    message.send()
+    return {"sent_to": email, "bytes": len(content)}
+
+
+@task
+def bulk_change(class_id, identifiers, action):
+    """Enroll or unenroll students by id or email, as the bulk_enroll/bulk_unenroll actions do inline."""
+    apply, result_key = BULK_ACTIONS[action]
+    student_ids, not_found = resolve_students(identifiers)
+    # Each batch commits on its own, as on the inline path.
+    changed = apply(class_id, student_ids)
+    return {result_key: changed, "not_found": not_found}
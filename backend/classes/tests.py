@@ -1,3 +1,947 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import tempfile
+import uuid
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from accounts.models import CustomUser
+from accounts.tokens import ClaimsRefreshToken
+from .membership import enroll
+from .models import Class
+
+
+class ClassFixtures:
+    """Users and classes for tests; ``serials`` keeps usernames and codes unique."""
+
+    serials = iter(range(10 ** 6))
+
+    def make_user(self, username, role):
+        return CustomUser.objects.create_user(
+            email=f'{username}@example.com', username=username, password=None,
+            first_name=username.title(), last_name='Test', role=role,
+        )
+
+    def seed(self, teacher, n_classes, roster_size, member=None):
+        for i in range(n_classes):
+            class_obj = Class.objects.create(
+                name=f'Class {i}', code=f'{next(self.serials):06d}', teacher=teacher,
+            )
+            students = [
+                self.make_user(f'student{next(self.serials)}', 'student')
+                for _ in range(roster_size)
+            ]
+            if member is not None:
+                students.append(member)
+            class_obj.students.add(*students)
+
+    def seed_classes(self, prefix, n_classes=1, roster_size=0, student=False):
+        """
+        Seed ``n_classes`` for ``self.teacher``, with ``self.student`` in each
+        when ``student`` is true, and keep one of them as ``self.class_obj``.
+        """
+        self.teacher = self.make_user(f'{prefix}teacher', 'teacher')
+        self.student = self.make_user(f'{prefix}student', 'student') if student else None
+        self.seed(self.teacher, n_classes, roster_size, member=self.student)
+        self.class_obj = Class.objects.first()
+
+
+class QueryCountHarness(ClassFixtures):
+    """
+    Seeds classes of increasing size and checks that an endpoint issues the
+    same number of queries for every size, i.e. that nothing is N+1.
+    """
+
+    sizes = ((1, 1), (3, 5), (8, 20))
+
+    def count_queries(self, url, user):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assert_constant_queries(self, url, role):
+        counts = []
+        for n_classes, roster_size in self.sizes:
+            Class.objects.all().delete()
+            teacher = self.make_user(f'teacher{n_classes}', 'teacher')
+            user = teacher if role == 'teacher' else self.make_user(f'member{n_classes}', 'student')
+            self.seed(teacher, n_classes, roster_size, member=user if role == 'student' else None)
+            counts.append(self.count_queries(url, user))
+        self.assertEqual(len(set(counts)), 1, f'query count grows with data size: {counts}')
+        return counts[0]
+
+
+class ClassQueryCountTests(QueryCountHarness, APITestCase):
+    def test_teacher_class_list(self):
+        self.assertEqual(self.assert_constant_queries(reverse('class-list'), 'teacher'), 1)
+
+    def test_student_class_list(self):
+        self.assertEqual(self.assert_constant_queries(reverse('class-list'), 'student'), 1)
+
+    def test_enrolled_classes(self):
+        self.assertEqual(self.assert_constant_queries(reverse('enrolled-classes'), 'student'), 1)
+
+    def test_sparse_class_list(self):
+        self.assertEqual(self.assert_constant_queries(reverse('class-list') + '?fields=id,name,code', 'student'), 1)
+
+    def test_expanded_class_list(self):
+        url = reverse('class-list') + '?expand=students,teacher'
+        self.assertEqual(self.assert_constant_queries(url, 'teacher'), 2)
+
+    def test_expanded_enrolled_classes(self):
+        url = reverse('enrolled-classes') + '?expand=students'
+        self.assertEqual(self.assert_constant_queries(url, 'student'), 2)
+
+    def test_class_detail(self):
+        teacher = self.make_user('detailteacher', 'teacher')
+        counts = []
+        for roster_size in (1, 10, 30):
+            Class.objects.all().delete()
+            self.seed(teacher, 1, roster_size)
+            class_obj = Class.objects.get()
+            counts.append(self.count_queries(reverse('class-detail', args=[class_obj.pk]), teacher))
+        self.assertEqual(counts, [1, 1, 1])
+
+    def test_student_class_detail(self):
+        teacher = self.make_user('detailteacher', 'teacher')
+        student = self.make_user('detailstudent', 'student')
+        self.seed(teacher, 1, 5, member=student)
+        class_obj = Class.objects.get()
+        # Scoping the queryset to enrolled classes is the membership check.
+        self.assertEqual(self.count_queries(reverse('class-detail', args=[class_obj.pk]), student), 1)
+        outsider = self.make_user('outsider', 'student')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(reverse('class-detail', args=[class_obj.pk])).status_code, 404)
+
+    def test_roster(self):
+        teacher = self.make_user('rosterteacher', 'teacher')
+        counts = []
+        for roster_size in (1, 10, 30):
+            Class.objects.all().delete()
+            self.seed(teacher, 1, roster_size)
+            class_obj = Class.objects.get()
+            counts.append(self.count_queries(reverse('class-students', args=[class_obj.pk]), teacher))
+        self.assertEqual(counts, [2, 2, 2])
+
+
+class ClassPaginationTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('page', 5, 3, student=True)
+
+    def test_class_list_is_cursor_paginated(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(reverse('class-list'), {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNone(response.data['previous'])
+
+        seen = [c['id'] for c in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            seen += [c['id'] for c in response.data['results']]
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+
+    def test_class_payload_carries_student_count(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(reverse('enrolled-classes'))
+        for item in response.data['results']:
+            self.assertNotIn('students', item)
+            self.assertEqual(item['student_count'], 4)
+
+    def test_roster_is_paginated(self):
+        class_obj = Class.objects.first()
+        self.client.force_authenticate(self.student)
+        url = reverse('class-students', args=[class_obj.pk])
+        response = self.client.get(url, {'page_size': 3})
+        self.assertEqual(len(response.data['results']), 3)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+    def test_roster_hidden_from_non_members(self):
+        outsider = self.make_user('outsider', 'student')
+        self.client.force_authenticate(outsider)
+        response = self.client.get(reverse('class-students', args=[Class.objects.first().pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MembershipTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('member', 1, 20, student=True)
+
+    def test_membership_check_does_not_load_roster(self):
+        from .membership import is_enrolled
+        with CaptureQueriesContext(connection) as queries:
+            self.assertTrue(is_enrolled(self.class_obj.pk, self.student.pk))
+        self.assertEqual(len(queries), 1)
+        self.assertIn('LIMIT 1', queries[0]['sql'])
+
+    def test_remove_student(self):
+        self.client.force_authenticate(self.teacher)
+        url = reverse('class-remove-student', args=[self.class_obj.pk])
+        response = self.client.post(url, {'student_id': self.student.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(self.class_obj.students.filter(pk=self.student.pk).exists())
+
+        response = self.client.post(url, {'student_id': self.student.pk})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'student_id': 10 ** 9})
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(url, {'student_id': 'abc'})
+        self.assertEqual((response.status_code, response.data), (400, {'message': 'Student ID must be a number'}))
+
+    def test_leave_class(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.post(reverse('class-leave-class', args=[self.class_obj.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.class_obj.students.count(), 20)
+
+    def test_join_by_code(self):
+        newcomer = self.make_user('newcomer', 'student')
+        self.client.force_authenticate(newcomer)
+        url = reverse('join-class')
+        response = self.client.post(url, {'code': self.class_obj.code})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(url, {'code': self.class_obj.code})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'code': 'NOPE00'})
+        self.assertEqual(response.status_code, 404)
+
+
+class BulkEnrollmentTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('bulk')
+        self.students = [self.make_user(f'bulk{i}', 'student') for i in range(5)]
+
+    def test_bulk_enroll_json(self):
+        self.client.force_authenticate(self.teacher)
+        url = reverse('class-bulk-enroll', args=[self.class_obj.pk])
+        payload = {'students': [self.students[0].pk, self.students[1].email, 'ghost@example.com', self.teacher.pk]}
+        response = self.client.post(url, payload, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['enrolled'], 2)
+        self.assertEqual(sorted(map(str, response.data['not_found'])), sorted([str(self.teacher.pk), 'ghost@example.com']))
+
+        response = self.client.post(url, {'students': [self.students[0].pk]}, format='json')
+        self.assertEqual(response.data['enrolled'], 0)
+        self.assertEqual(self.class_obj.students.count(), 2)
+
+    def test_bulk_enroll_csv_and_unenroll(self):
+        self.client.force_authenticate(self.teacher)
+        body = 'email\n' + '\n'.join(s.email for s in self.students)
+        response = self.client.post(
+            reverse('class-bulk-enroll', args=[self.class_obj.pk]), body, content_type='text/csv',
+        )
+        self.assertEqual(response.data['enrolled'], 5)
+        self.assertTrue(all(e.joined_at for e in self.class_obj.enrollments.all()))
+
+        response = self.client.post(
+            reverse('class-bulk-unenroll', args=[self.class_obj.pk]),
+            {'students': [s.pk for s in self.students[:3]]}, format='json',
+        )
+        self.assertEqual(response.data['unenrolled'], 3)
+        self.assertEqual(self.class_obj.students.count(), 2)
+
+    def test_long_lists_run_in_background(self):
+        from tasks.queue import run_pending
+
+        self.client.force_authenticate(self.teacher)
+        url = reverse('class-bulk-enroll', args=[self.class_obj.pk])
+        with mock.patch('classes.views.BULK_ENROLLMENT_INLINE_LIMIT', 2):
+            response = self.client.post(url, {'students': [s.email for s in self.students]}, format='json')
+        self.assertEqual((response.status_code, response.data['status']), (202, 'queued'))
+        self.assertEqual(self.class_obj.students.count(), 0)
+
+        run_pending()
+        task = self.client.get(reverse('task-detail', args=[response.data['id']])).data
+        self.assertEqual((task['status'], task['result']), ('done', {'enrolled': 5, 'not_found': []}))
+        self.assertEqual(self.class_obj.students.count(), 5)
+
+    def test_bulk_enroll_teacher_only(self):
+        self.client.force_authenticate(self.students[0])
+        response = self.client.post(
+            reverse('class-bulk-enroll', args=[self.class_obj.pk]), {'students': [1]}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_import_command_streams_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write('class_code,student\n')
+            for student in self.students:
+                handle.write(f'{self.class_obj.code},{student.email}\n')
+            handle.write('ZZZZZZ,someone@example.com\n')
+        self.addCleanup(os.unlink, handle.name)
+        call_command('import_enrollments', handle.name, '--skip-header', '--batch-size', '2',
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.class_obj.students.count(), 5)
+
+
+class ClassCodeTests(ClassFixtures, APITestCase):
+    def test_permutation_is_collision_free(self):
+        from .codes import CODE_SPACE, encode, permute
+        codes = {encode(permute(n)) for n in range(20000)}
+        self.assertEqual(len(codes), 20000)
+        self.assertEqual(len({permute(n) for n in range(CODE_SPACE - 1000, CODE_SPACE)}), 1000)
+        self.assertTrue(all(len(code) == 6 and code.isalnum() and code.upper() == code for code in codes))
+
+    def test_allocations_never_repeat(self):
+        from .codes import allocate_code, allocate_codes
+        codes = allocate_codes(500) + [allocate_code() for _ in range(10)]
+        self.assertEqual(len(set(codes)), 510)
+
+    def test_allocation_skips_codes_in_use(self):
+        from .codes import SEQUENCE_ID, allocate_codes, encode, permute
+        from .models import ClassCodeSequence
+        # Codes from before the permutation, or from another key, can land on the sequence.
+        ClassCodeSequence.objects.get_or_create(pk=SEQUENCE_ID)
+        start = ClassCodeSequence.objects.get(pk=SEQUENCE_ID).value
+        teacher = self.make_user('legacyteacher', 'teacher')
+        legacy = encode(permute(start + 1))
+        Class.objects.create(name='Legacy', code=legacy, teacher=teacher)
+        codes = allocate_codes(3)
+        self.assertEqual(len(set(codes)), 3)
+        self.assertNotIn(legacy, codes)
+        self.assertEqual(codes, [encode(permute(n)) for n in (start, start + 2, start + 3)])
+
+    def test_create_assigns_allocated_code(self):
+        teacher = self.make_user('codeteacher', 'teacher')
+        self.client.force_authenticate(teacher)
+        codes = {
+            self.client.post(reverse('class-list'), {'name': f'Class {i}'}).data['code']
+            for i in range(3)
+        }
+        self.assertEqual(len(codes), 3)
+        self.assertEqual(Class.objects.filter(code__in=codes, teacher=teacher).count(), 3)
+
+
+class ClassCodeCacheTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        caches[settings.CLASS_CODE_CACHE].clear()
+        self.seed_classes('cache')
+
+    def join(self, code):
+        self.client.force_authenticate(self.make_user(f'joiner{next(self.serials)}', 'student'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('join-class'), {'code': code})
+        return response, [q['sql'] for q in queries if 'classes_class"' in q['sql'] and 'SELECT' in q['sql']]
+
+    def test_join_hits_cache_after_first_lookup(self):
+        response, lookups = self.join(self.class_obj.code)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(lookups), 1)
+        response, lookups = self.join(self.class_obj.code)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(lookups, [])
+        self.assertEqual(self.class_obj.students.count(), 2)
+
+    def test_unknown_codes_are_cached(self):
+        self.assertEqual(len(self.join('ABC123')[1]), 1)
+        response, lookups = self.join('ABC123')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(lookups, [])
+        self.assertEqual(len(self.join('not a code')[1]), 0)
+
+    def test_delete_invalidates_entry(self):
+        from .code_cache import get_class_id
+        code = self.class_obj.code
+        self.assertEqual(get_class_id(code), self.class_obj.pk)
+        self.class_obj.delete()
+        self.assertIsNone(get_class_id(code))
+
+
+class JoinThrottleTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        caches[settings.THROTTLE_CACHE].clear()
+        self.seed_classes('throttle')
+        self.student = self.make_user('guesser', 'student')
+
+    def join(self, code, student=None):
+        self.client.force_authenticate(student or self.student)
+        return self.client.post(reverse('join-class'), {'code': code})
+
+    def rates(self, **rates):
+        return override_settings(THROTTLE_ENABLED=True, REST_FRAMEWORK={
+            **settings.REST_FRAMEWORK,
+            'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+        })
+
+    def test_guessing_codes_per_account(self):
+        with self.rates(**{'join-account': '3/min'}):
+            for code in ('AAAAA1', 'AAAAA2', 'AAAAA3'):
+                self.assertEqual(self.join(code).status_code, 404)
+            response = self.join(self.class_obj.code)
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(self.join(self.class_obj.code, self.make_user('honest', 'student')).status_code, 200)
+
+    def test_joins_per_code(self):
+        with self.rates(**{'join-code': '2/min'}):
+            for n in range(2):
+                self.assertEqual(self.join(self.class_obj.code, self.make_user(f'joiner{n}', 'student')).status_code, 200)
+            self.assertEqual(self.join(self.class_obj.code.lower()).status_code, 429)
+            self.assertEqual(self.join('AAAAA1').status_code, 404)
+
+
+class AsyncViewTests(ClassFixtures, TransactionTestCase):
+    # Outside a test transaction, reads may be routed to a replica alias.
+    databases = '__all__'
+
+    def setUp(self):
+        self.seed_classes('async', 3, 2, student=True)
+
+    async def call(self, view, method, user=None, body=None, **kwargs):
+        headers = {}
+        if user is not None:
+            token = await sync_to_async(ClaimsRefreshToken.for_user)(user)
+            headers['Authorization'] = f'Bearer {token.access_token}'
+        factory = AsyncRequestFactory()
+        request = getattr(factory, method)('/', body or {}, content_type='application/json', headers=headers)
+        response = await view.as_view()(request, **kwargs)
+        return response.status_code, json.loads(response.content) if response.content else None
+
+    def sync_get(self, url, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(url).json()
+
+    async def test_class_list_matches_viewset(self):
+        from .async_views import AsyncClassListView
+        for user in (self.teacher, self.student):
+            status, body = await self.call(AsyncClassListView, 'get', user)
+            self.assertEqual(status, 200)
+            self.assertEqual(body, await sync_to_async(self.sync_get)(reverse('class-list'), user))
+
+    async def test_sparse_fields_match_viewset(self):
+        from .async_views import AsyncClassDetailView, AsyncClassListView
+        query = {'fields': 'id,name,teacher,students', 'expand': 'students'}
+        status, body = await self.call(AsyncClassListView, 'get', self.teacher, query)
+        self.assertEqual(status, 200)
+        self.assertEqual(body, await sync_to_async(self.sync_get)(
+            reverse('class-list') + '?fields=id,name,teacher,students&expand=students', self.teacher,
+        ))
+        self.assertEqual(set(body['results'][0]), {'id', 'name', 'teacher', 'students'})
+        status, body = await self.call(AsyncClassDetailView, 'get', self.student, {'fields': 'nope'}, pk=self.class_obj.pk)
+        self.assertEqual((status, body), (400, {'fields': ['Unknown field(s): nope']}))
+
+    async def test_roster_export_streams(self):
+        from .async_views import AsyncClassExportView
+        status, body = await self.call(AsyncClassExportView, 'get', self.student, pk=self.class_obj.pk)
+        self.assertEqual((status, body), (403, {'message': 'Only teachers can export rosters'}))
+        token = await sync_to_async(ClaimsRefreshToken.for_user)(self.teacher)
+        request = AsyncRequestFactory().get(
+            '/', {'as': 'ndjson'}, headers={'Authorization': f'Bearer {token.access_token}'},
+        )
+        response = await AsyncClassExportView.as_view()(request, pk=self.class_obj.pk)
+        self.assertTrue(response.is_async)
+        lines = [json.loads(line) async for chunk in response for line in chunk.splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(set(lines[0]), {'id', 'username', 'email', 'first_name', 'last_name', 'joined_at'})
+
+    async def test_class_permissions(self):
+        from .async_views import AsyncClassDetailView, AsyncClassListView
+        status, body = await self.call(AsyncClassListView, 'get')
+        self.assertEqual((status, body), (401, {'detail': 'Authentication credentials were not provided.'}))
+        status, body = await self.call(AsyncClassListView, 'post', self.student, {'name': 'Nope'})
+        self.assertEqual((status, body), (403, {'message': 'Only teachers can create classes'}))
+        outsider = await CustomUser.objects.acreate(username='outsider', email='o@example.com', role='student')
+        status, body = await self.call(AsyncClassDetailView, 'get', outsider, pk=self.class_obj.pk)
+        self.assertEqual((status, body), (404, {'detail': 'No Class matches the given query.'}))
+
+    async def test_create_and_update(self):
+        from .async_views import AsyncClassDetailView, AsyncClassListView
+        status, body = await self.call(AsyncClassListView, 'post', self.teacher, {'name': 'Async', 'subject': 'IO'})
+        self.assertEqual(status, 201)
+        self.assertEqual((body['teacher']['id'], body['student_count'], len(body['code'])), (self.teacher.pk, 0, 6))
+        status, body = await self.call(AsyncClassDetailView, 'patch', self.teacher, {'name': 'Renamed'}, pk=body['id'])
+        self.assertEqual((status, body['name']), (200, 'Renamed'))
+
+    async def test_join_with_code(self):
+        from student.async_views import AsyncJoinClassView
+        newcomer = await CustomUser.objects.acreate(username='newcomer', email='n@example.com', role='student')
+        status, body = await self.call(AsyncJoinClassView, 'post', newcomer, {'code': self.class_obj.code})
+        self.assertEqual((status, body), (200, {'message': 'Successfully joined the class'}))
+        status, body = await self.call(AsyncJoinClassView, 'post', newcomer, {'code': self.class_obj.code})
+        self.assertEqual((status, body), (400, {'message': 'Already enrolled in this class'}))
+        status, body = await self.call(AsyncJoinClassView, 'post', self.teacher, {'code': self.class_obj.code})
+        self.assertEqual(status, 403)
+
+    async def test_remove_and_leave(self):
+        from .async_views import AsyncClassLeaveView, AsyncClassRemoveStudentView
+        pk = self.class_obj.pk
+        status, body = await self.call(AsyncClassLeaveView, 'post', self.student, pk=pk)
+        self.assertEqual((status, body), (200, {'message': 'Successfully left the class'}))
+        status, body = await self.call(
+            AsyncClassRemoveStudentView, 'post', self.teacher, {'student_id': self.student.pk}, pk=pk
+        )
+        self.assertEqual((status, body), (400, {'message': 'Student is not in this class'}))
+        status, body = await self.call(AsyncClassRemoveStudentView, 'post', self.teacher, {'student_id': 'abc'}, pk=pk)
+        self.assertEqual((status, body), (400, {'message': 'Student ID must be a number'}))
+
+
+class ConditionalGetTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('etag', 2, 2, student=True)
+
+    def get(self, url, user, etag=None):
+        self.client.force_authenticate(user)
+        headers = {'If-None-Match': etag} if etag else {}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, headers=headers)
+        return response, len(queries)
+
+    def assert_revalidates(self, url, user):
+        response, _ = self.get(url, user)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        response, queries = self.get(url, user, etag)
+        self.assertEqual((response.status_code, response.content, queries), (304, b'', 1))
+        self.assertEqual(response['ETag'], etag)
+        return etag
+
+    def test_unchanged_resources_return_304(self):
+        detail = reverse('class-detail', args=[self.class_obj.pk])
+        self.assert_revalidates(detail, self.teacher)
+        self.assert_revalidates(reverse('class-list'), self.teacher)
+        self.assert_revalidates(reverse('enrolled-classes'), self.student)
+        self.assertIn('Last-Modified', self.get(detail, self.teacher)[0])
+
+    def test_roster_changes_bump_version(self):
+        detail = reverse('class-detail', args=[self.class_obj.pk])
+        newcomer = self.make_user('etagnewcomer', 'student')
+        pk = self.class_obj.pk
+        changes = [
+            (newcomer, lambda: self.client.post(reverse('join-class'), {'code': self.class_obj.code})),
+            (None, lambda: self.class_obj.students.remove(newcomer)),
+            (None, lambda: newcomer.enrolled_classes.add(self.class_obj)),
+            (self.teacher, lambda: self.client.post(
+                reverse('class-remove-student', args=[pk]), {'student_id': newcomer.pk}
+            )),
+            (self.teacher, lambda: self.client.post(
+                reverse('class-bulk-enroll', args=[pk]), {'students': [newcomer.pk]}, format='json'
+            )),
+        ]
+        for user, change in changes:
+            etag = self.assert_revalidates(detail, self.teacher)
+            self.client.force_authenticate(user)
+            response = change()
+            if response is not None:
+                self.assertEqual(response.status_code, 200)
+            self.assertEqual(self.get(detail, self.teacher, etag)[0].status_code, 200)
+
+    def test_teacher_profile_change_bumps_version(self):
+        detail = reverse('class-detail', args=[self.class_obj.pk])
+        etag = self.assert_revalidates(detail, self.student)
+        list_etag = self.assert_revalidates(reverse('enrolled-classes'), self.student)
+        self.teacher.last_name = 'Renamed'
+        self.teacher.save()
+        response, _ = self.get(detail, self.student, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['teacher']['last_name'], 'Renamed')
+        self.assertEqual(self.get(reverse('enrolled-classes'), self.student, list_etag)[0].status_code, 200)
+
+    def test_last_login_keeps_version(self):
+        detail = reverse('class-detail', args=[self.class_obj.pk])
+        etag = self.assert_revalidates(detail, self.student)
+        self.teacher.last_login = timezone.now()
+        self.teacher.save(update_fields=['last_login'])
+        self.assertEqual(self.get(detail, self.student, etag)[0].status_code, 304)
+
+
+@override_settings(RESPONSE_CACHE_ENABLED=True)
+class ResponseCacheTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        caches[settings.RESPONSE_CACHE].clear()
+        self.seed_classes('cache', 2, 2, student=True)
+
+    def get(self, url, user):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def assert_cached(self, url, user):
+        body, _ = self.get(url, user)
+        self.assertEqual(self.get(url, user), (body, 0))
+        return body
+
+    def assert_invalidated_by(self, change, url, user):
+        self.assert_cached(url, user)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        body, queries = self.get(url, user)
+        self.assertEqual(queries, 1)
+        return body
+
+    def test_pages_are_cached_per_user(self):
+        teacher_page = self.assert_cached(reverse('class-list'), self.teacher)
+        student_page = self.assert_cached(reverse('enrolled-classes'), self.student)
+        self.assertEqual(len(teacher_page['results']), 2)
+        self.assertEqual(len(student_page['results']), 2)
+        other = self.make_user('cacheother', 'student')
+        self.assertEqual(self.get(reverse('enrolled-classes'), other)[0]['results'], [])
+
+    def test_roster_change_invalidates_every_page_showing_the_class(self):
+        newcomer = self.make_user('cachenewcomer', 'student')
+        self.assert_cached(reverse('enrolled-classes'), newcomer)
+        self.assert_cached(reverse('class-list'), self.student)
+        body = self.assert_invalidated_by(
+            lambda: self.class_obj.students.add(newcomer), reverse('class-list'), self.teacher
+        )
+        self.assertIn(4, [item['student_count'] for item in body['results']])
+        self.assertEqual(len(self.get(reverse('enrolled-classes'), newcomer)[0]['results']), 1)
+        self.assertEqual(self.get(reverse('class-list'), self.student)[1], 1)
+
+    def test_class_save_and_delete_invalidate(self):
+        url = reverse('class-list')
+        self.class_obj.name = 'Renamed'
+        body = self.assert_invalidated_by(self.class_obj.save, url, self.teacher)
+        self.assertIn('Renamed', [item['name'] for item in body['results']])
+        body = self.assert_invalidated_by(self.class_obj.delete, url, self.student)
+        self.assertEqual(len(body['results']), 1)
+        self.assert_invalidated_by(
+            lambda: Class.objects.create(name='New', code='NEW001', teacher=self.teacher), url, self.teacher
+        )
+
+    def test_teacher_profile_change_invalidates(self):
+        self.teacher.first_name = 'Renamed'
+        body = self.assert_invalidated_by(self.teacher.save, reverse('enrolled-classes'), self.student)
+        self.assertIn('Renamed', [item['teacher']['first_name'] for item in body['results']])
+
+    def test_stats(self):
+        self.assert_cached(reverse('class-list'), self.teacher)
+        admin = self.make_user('cacheadmin', 'teacher')
+        admin.is_staff = True
+        self.client.force_authenticate(admin)
+        stats = self.client.get(reverse('response-cache-stats')).json()
+        self.assertGreaterEqual(stats['hits'], 1)
+        self.assertGreaterEqual(stats['misses'], 1)
+        self.assertEqual(stats['evictions'], 0)
+        self.client.force_authenticate(self.teacher)
+        self.assertEqual(self.client.get(reverse('response-cache-stats')).status_code, 403)
+
+
+class FastSerializationTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('fast', 3, 4)
+        self.teacher.first_name, self.teacher.last_name = 'Zo\u00eb\u2028', ''
+        self.teacher.save()
+        Class.objects.filter(name='Class 1').update(name='Kelas "\u03a9"\u2029', subject='')
+
+    def render_both(self, drf_data, fast_data):
+        from rest_framework.renderers import JSONRenderer
+        from backend.renderers import FastJSONRenderer
+        self.assertEqual(fast_data, drf_data)
+        self.assertEqual(FastJSONRenderer().render(fast_data), JSONRenderer().render(drf_data))
+
+    def test_class_values_match_serializer(self):
+        from .serializers import ClassSerializer
+        from .views import classes_for
+        for query in ({}, {'expand': 'students,teacher'}, {'fields': 'id,name,code'}, {'expand': ''}):
+            with self.subTest(query):
+                selection = ClassSerializer.get_selection(query)
+                classes = classes_for(self.teacher, selection).order_by('-created_at')
+                rows = ClassSerializer.select_values(classes, selection)
+                self.render_both(
+                    ClassSerializer(classes, many=True, context={'selection': selection}).data,
+                    ClassSerializer.represent_values(list(rows), selection),
+                )
+
+    def test_user_values_match_serializer(self):
+        from accounts.serializers import CustomUserSerializer
+        users = CustomUser.objects.order_by('id')
+        self.render_both(
+            CustomUserSerializer(users, many=True).data,
+            [CustomUserSerializer.from_values(row) for row in users.values(*CustomUserSerializer.value_fields)],
+        )
+
+    def test_renderer_falls_back(self):
+        import datetime
+        import uuid
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from backend.renderers import FastJSONRenderer
+        data = {
+            'when': datetime.datetime(2024, 5, 1, 8, 30, 0, 123456, tzinfo=datetime.timezone.utc),
+            'day': datetime.date(2024, 5, 1), 'id': uuid.uuid4(), 'lazy': gettext_lazy('Invalid class code'),
+            'ids': {1, 2}, 1: [None, True, 2 ** 40],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'),
+        )
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), b'{"big":1180591620717411303424}')
+
+    def test_list_and_roster_endpoints(self):
+        self.client.force_authenticate(self.teacher)
+        body = self.client.get(reverse('class-list')).json()
+        self.assertEqual(len(body['results']), 3)
+        self.assertEqual(body['results'][0]['teacher']['full_name'], 'Zo\u00eb')
+        response = self.client.get(reverse('class-students', args=[body['results'][0]['id']]))
+        self.assertEqual(len(response.json()['results']), 4)
+        self.assertIn(b'\\u2029', self.client.get(reverse('class-list')).content)
+
+
+class SparseFieldsTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('sparse', 2, 3, student=True)
+        self.class_obj = Class.objects.order_by('-created_at').first()
+
+    def get(self, url, user, query=''):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url + query)
+        return response, [query['sql'] for query in queries]
+
+    def test_fields_trim_output_and_query(self):
+        response, sql = self.get(reverse('enrolled-classes'), self.student, '?fields=id,name,code')
+        self.assertEqual(list(response.json()['results'][0]), ['id', 'name', 'code'])
+        self.assertNotIn('"accounts_customuser"."email"', sql[0])
+        self.assertNotIn('COUNT(', sql[0])
+
+    def test_expand(self):
+        url = reverse('class-list')
+        results = self.get(url, self.teacher)[0].json()['results']
+        self.assertEqual(results[0]['teacher']['id'], self.teacher.pk)
+        self.assertNotIn('students', results[0])
+
+        results = self.get(url, self.teacher, '?expand=')[0].json()['results']
+        self.assertEqual(results[0]['teacher'], self.teacher.pk)
+
+        results = self.get(url, self.teacher, '?expand=students,teacher')[0].json()['results']
+        roster = [student['id'] for student in results[0]['students']]
+        self.assertEqual(roster, sorted(self.class_obj.students.values_list('id', flat=True)))
+        self.assertEqual(results[0]['teacher']['username'], 'sparseteacher')
+
+    def test_detail(self):
+        url = reverse('class-detail', args=[self.class_obj.pk])
+        response, sql = self.get(url, self.student, '?fields=name,students&expand=students')
+        self.assertEqual(list(response.json()), ['name', 'students'])
+        self.assertEqual(len(response.json()['students']), 4)
+        # Object lookup (scoped to the student's classes) and the roster prefetch.
+        self.assertEqual(len(sql), 2)
+        default, _ = self.get(url, self.student)
+        self.assertNotEqual(response['ETag'], default['ETag'])
+        self.assertEqual(len(default.json()), 7)
+
+    def test_unknown_names_are_rejected(self):
+        response, _ = self.get(reverse('class-list'), self.teacher, '?fields=name,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'fields': ['Unknown field(s): password']})
+        response, _ = self.get(reverse('class-list'), self.teacher, '?expand=code')
+        self.assertEqual(response.status_code, 400)
+
+    def test_writes_ignore_selection(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(reverse('class-list') + '?fields=id', {'name': 'New'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['name'], 'New')
+
+
+class ExportTests(ClassFixtures, APITestCase):
+    def setUp(self):
+        self.seed_classes('export', 1, 3)
+        self.student = self.class_obj.students.order_by('id').first()
+        self.student.first_name = '=HYPERLINK("x")'
+        self.student.save()
+        self.url = reverse('class-export-students', args=[self.class_obj.pk])
+
+    def download(self, user, query=''):
+        self.client.force_authenticate(user)
+        response = self.client.get(self.url + query)
+        if response.status_code == 200:
+            self.assertTrue(response.streaming)
+            return response, b''.join(response.streaming_content).decode()
+        return response, None
+
+    def test_csv_roster(self):
+        import csv
+        response, body = self.download(self.teacher)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn(f'roster-{self.class_obj.code}.csv', response['Content-Disposition'])
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ['id', 'username', 'email', 'first_name', 'last_name', 'joined_at'])
+        self.assertEqual([int(row[0]) for row in rows[1:]], sorted(self.class_obj.students.values_list('id', flat=True)))
+        self.assertEqual(rows[1][3], '\'=HYPERLINK("x")')
+        self.assertTrue(rows[1][5].endswith('Z'))
+
+    def test_emailed_roster(self):
+        from django.core import mail
+        from tasks.queue import run_pending
+
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(self.url + '?as=ndjson')
+        self.assertEqual(response.status_code, 202)
+        run_pending()
+        message = mail.outbox[0]
+        self.assertEqual(message.to, [self.teacher.email])
+        filename, content, content_type = message.attachments[0]
+        self.assertEqual((filename, content_type), (f'roster-{self.class_obj.code}.ndjson', 'application/x-ndjson'))
+        self.assertEqual(len(content.splitlines()), 3)
+
+    def test_ndjson_roster(self):
+        response, body = self.download(self.teacher, '?as=ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['first_name'], '=HYPERLINK("x")')
+
+    def test_permissions_and_format(self):
+        self.assertEqual(self.download(self.student)[0].status_code, 403)
+        self.assertEqual(self.download(self.teacher, '?as=xml')[0].status_code, 400)
+        other = self.make_user('otherexporter', 'teacher')
+        self.assertEqual(self.download(other)[0].status_code, 404)
+
+    def test_export_data_command(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'enrollments.ndjson')
+            call_command('export_data', 'enrollments', '--format', 'ndjson', '--output', path,
+                         '--chunk-size', '2', stderr=io.StringIO())
+            with open(path) as handle:
+                rows = [json.loads(line) for line in handle]
+            path = os.path.join(tmpdir, 'users.csv')
+            call_command('export_data', 'users', '--output', path, stderr=io.StringIO())
+            with open(path) as handle:
+                users = handle.read().splitlines()
+        self.assertEqual({row['class_obj_id'] for row in rows}, {str(self.class_obj.pk)})
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(len(users), CustomUser.objects.count() + 1)
+
+
+class LiveRosterTests(ClassFixtures, TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        self.seed_classes('live', 1, 1, student=True)
+        self.sockets = []
+
+    async def connect(self, user, path=None, lifetime=None):
+        from backend.websockets import websocket_application
+        query = b''
+        if user is not None:
+            token = (await sync_to_async(ClaimsRefreshToken.for_user)(user)).access_token
+            if lifetime is not None:
+                token.set_exp(lifetime=lifetime)
+            query = f'token={token}'.encode()
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        scope = {'type': 'websocket', 'path': path or f'/ws/classes/{self.class_obj.pk}/', 'query_string': query}
+        task = asyncio.create_task(websocket_application(scope, inbox.get, outbox.put))
+        self.sockets.append((inbox, task))
+        await inbox.put({'type': 'websocket.connect'})
+        self.assertEqual(await self.next_event(outbox), {'type': 'websocket.accept'})
+        return outbox
+
+    async def disconnect_all(self):
+        # Socket tasks must end before the test's event loop does.
+        for inbox, task in self.sockets:
+            await inbox.put({'type': 'websocket.disconnect', 'code': 1000})
+            await asyncio.wait_for(task, 5)
+
+    async def next_event(self, outbox):
+        return await asyncio.wait_for(outbox.get(), 5)
+
+    async def next_delta(self, outbox):
+        event = await self.next_event(outbox)
+        self.assertEqual(event['type'], 'websocket.send')
+        return json.loads(event['text'])
+
+    def post(self, user, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(url, data or {}, format='json').status_code
+
+    async def test_rejected_connections(self):
+        try:
+            outsider = await CustomUser.objects.acreate(username='liveoutsider', email='lo@example.com', role='student')
+            for user, path, code in (
+                (None, None, 4401),
+                (outsider, None, 4403),
+                (self.teacher, f'/ws/classes/{uuid.uuid4()}/', 4404),
+                (self.teacher, '/ws/classes/nope/', 4404),
+                (self.teacher, '/ws/elsewhere/', 4404),
+            ):
+                outbox = await self.connect(user, path)
+                self.assertEqual(await self.next_event(outbox), {'type': 'websocket.close', 'code': code})
+        finally:
+            await self.disconnect_all()
+
+    async def test_views_push_roster_deltas(self):
+        try:
+            outbox = await self.connect(self.teacher)
+            newcomer = await sync_to_async(self.make_user)('livenewcomer', 'student')
+            status = await sync_to_async(self.post)(newcomer, reverse('join-class'), {'code': self.class_obj.code})
+            self.assertEqual(status, 200)
+            self.assertEqual(await self.next_delta(outbox), {
+                'type': 'joined', 'class_id': str(self.class_obj.pk), 'students': [{
+                    'id': newcomer.pk, 'username': 'livenewcomer', 'email': 'livenewcomer@example.com',
+                    'first_name': 'Livenewcomer', 'last_name': 'Test', 'full_name': 'Livenewcomer Test',
+                }],
+            })
+
+            detail = reverse('class-detail', args=[self.class_obj.pk])
+            self.assertEqual(await sync_to_async(self.post)(newcomer, detail + 'join/'), 200)
+            self.assertEqual(await sync_to_async(self.post)(newcomer, detail + 'leave_class/'), 200)
+            self.assertEqual(await self.next_delta(outbox), {
+                'type': 'left', 'class_id': str(self.class_obj.pk), 'student_ids': [newcomer.pk],
+            })
+            status = await sync_to_async(self.post)(self.teacher, detail + 'remove_student/', {'student_id': self.student.pk})
+            self.assertEqual(status, 200)
+            self.assertEqual(await self.next_delta(outbox), {
+                'type': 'removed', 'class_id': str(self.class_obj.pk), 'student_ids': [self.student.pk],
+            })
+            self.assertTrue(outbox.empty())
+        finally:
+            await self.disconnect_all()
+
+    async def test_removed_student_is_disconnected(self):
+        from .async_views import AsyncClassRemoveStudentView
+        try:
+            outbox = await self.connect(self.student)
+            token = await sync_to_async(ClaimsRefreshToken.for_user)(self.teacher)
+            request = AsyncRequestFactory().post(
+                '/', {'student_id': self.student.pk}, content_type='application/json',
+                headers={'Authorization': f'Bearer {token.access_token}'},
+            )
+            response = await AsyncClassRemoveStudentView.as_view()(request, pk=self.class_obj.pk)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual((await self.next_delta(outbox))['type'], 'removed')
+            self.assertEqual(await self.next_event(outbox), {'type': 'websocket.close', 'code': 4403})
+        finally:
+            await self.disconnect_all()
+
+    async def test_deleted_class_closes_sockets(self):
+        try:
+            outbox = await self.connect(self.student)
+            await self.class_obj.adelete()
+            self.assertEqual(await self.next_event(outbox), {'type': 'websocket.close', 'code': 4404})
+        finally:
+            await self.disconnect_all()
+
+    async def test_expired_token_closes_socket(self):
+        from datetime import timedelta
+        try:
+            outbox = await self.connect(self.teacher, lifetime=timedelta(seconds=1))
+            self.assertEqual(await self.next_event(outbox), {'type': 'websocket.close', 'code': 4401})
+        finally:
+            await self.disconnect_all()
+
+    def test_no_subscribers_no_delta_query(self):
+        newcomer = self.make_user('livequiet', 'student')
+        with self.assertNumQueries(4):
+            # Savepoint, INSERT, UPDATE of updated_at, release.
+            self.assertTrue(enroll(self.class_obj.pk, newcomer.pk))
@@ -1,10 +1,27 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ClassViewSet
+from .views import ClassViewSet, ResponseCacheStatsView
 
 router = DefaultRouter()
 router.register(r'', ClassViewSet, basename='class')
 
 urlpatterns = [
+    path('cache-stats/', ResponseCacheStatsView.as_view(), name='response-cache-stats'),
     path('', include(router.urls)),
 ]
+
+if settings.ASYNC_API:
+    from . import async_views
+
+    # Matched before the router, which keeps the URL names and still serves
+    # the bulk enrollment actions.
+    urlpatterns = [
+        path('', async_views.AsyncClassListView.as_view()),
+        path('<uuid:pk>/', async_views.AsyncClassDetailView.as_view()),
+        path('<uuid:pk>/students/', async_views.AsyncClassStudentsView.as_view()),
+        path('<uuid:pk>/students/export/', async_views.AsyncClassExportView.as_view()),
+        path('<uuid:pk>/join/', async_views.AsyncClassJoinView.as_view()),
+        path('<uuid:pk>/remove_student/', async_views.AsyncClassRemoveStudentView.as_view()),
+        path('<uuid:pk>/leave_class/', async_views.AsyncClassLeaveView.as_view()),
+    ] + urlpatterns
@@ -1,25 +1,79 @@
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import viewsets, status
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.views import APIView
 from rest_framework.decorators import action
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 from .models import Class
 from accounts.models import CustomUser
+from accounts.serializers import CustomUserSerializer
 from .serializers import ClassSerializer
 from .permissions import IsTeacherOrStudent
+from .pagination import ClassCursorPagination, RosterCursorPagination
+from .membership import enroll, is_enrolled, parse_student_id, unenroll
+from .parsers import CSVParser, read_identifiers
+from .conditional import class_etag, conditional_response
+from .tasks import bulk_change, email_roster_export
+from . import exports, response_cache
+from tasks.serializers import TaskSerializer
+
+BULK_ENROLLMENT_LIMIT = 10000
+# Longer lists are applied by a background task (classes.tasks.bulk_change).
+BULK_ENROLLMENT_INLINE_LIMIT = 500
+
+
+def classes_for(user, selection=None):
+    """
+    Classes ``user`` teaches or is enrolled in, set up for ClassSerializer to
+    render ``selection`` (see ClassSerializer.get_selection()).
+    """
+    if user.role == 'teacher':
+        queryset = Class.objects.filter(teacher_id=user.pk)
+    else:
+        queryset = Class.objects.filter(students=user.pk)
+    return ClassSerializer.setup_eager_loading(queryset, selection)
+
 
 class ClassViewSet(viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     permission_classes = [IsAuthenticated, IsTeacherOrStudent]
+    pagination_class = ClassCursorPagination
+    # get_queryset() is classes_for(user), so get_object() implies membership.
+    queryset_is_membership = True
+    # Reads honour ?fields= and ?expand=; writes always render every field.
+    selection = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in ('list', 'retrieve'):
+            self.selection = ClassSerializer.get_selection(request.query_params)
 
     def get_queryset(self):
-        if self.request.user.role == 'teacher':
-            return Class.objects.filter(teacher=self.request.user)
-        return Class.objects.filter(students=self.request.user)
+        return classes_for(self.request.user, self.selection)
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'selection': self.selection}
+
+    def list(self, request, *args, **kwargs):
+        def paginate():
+            rows = ClassSerializer.select_values(self.filter_queryset(self.get_queryset()), self.selection)
+            return self.paginate_queryset(rows), self.paginator
+        return response_cache.page_response(request, paginate, Response, self.selection)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return conditional_response(
+            request, lambda: Response(self.get_serializer(instance).data),
+            class_etag([instance], self.selection), instance.updated_at,
+        )
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role != 'teacher':
+            return Response({"message": "Only teachers can create classes"}, status=403)
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
-        if self.request.user.role != 'teacher':
-            raise PermissionError("Only teachers can create classes")
-        serializer.save(teacher=self.request.user)
+        serializer.save(teacher_id=self.request.user.pk)
 
     def update(self, request, *args, **kwargs):
         if request.user.role != 'teacher':
@@ -31,12 +85,41 @@ class ClassViewSet(viewsets.ModelViewSet):
             return Response({"message": "Only teachers can delete classes"}, status=403)
         return super().destroy(request, *args, **kwargs)
 
+    @action(detail=True, methods=['get'], pagination_class=RosterCursorPagination)
+    def students(self, request, pk=None):
+        class_obj = self.get_object()
+        page = self.paginate_queryset(class_obj.students.values(*CustomUserSerializer.value_fields))
+        return self.get_paginated_response(CustomUserSerializer.represent_values(page))
+
+    @action(detail=True, methods=['get', 'post'], url_path='students/export')
+    def export_students(self, request, pk=None):
+        """
+        GET streams the roster as ?as=csv (default) or ?as=ndjson; POST emails
+        it to the teacher from a background task.
+        """
+        if request.user.role != 'teacher':
+            return Response({"message": "Only teachers can export rosters"}, status=status.HTTP_403_FORBIDDEN)
+        file_format = request.query_params.get('as', 'csv')
+        if file_format not in exports.CONTENT_TYPES:
+            return Response({"message": "Format must be csv or ndjson"}, status=status.HTTP_400_BAD_REQUEST)
+        class_obj = self.get_object()
+        if request.method == 'POST':
+            queued = email_roster_export.enqueue(
+                owner_id=request.user.pk, class_id=str(class_obj.pk), file_format=file_format,
+                email=request.user.email,
+            )
+            return Response(TaskSerializer(queued).data, status=status.HTTP_202_ACCEPTED)
+        rows = exports.roster_rows(class_obj.pk).iterator(chunk_size=exports.CHUNK_SIZE)
+        return exports.roster_response(
+            class_obj, exports.stream(rows, exports.ROSTER_COLUMNS, file_format, escape_formulas=True), file_format,
+        )
+
     @action(detail=True, methods=['post'])
     def join(self, request, pk=None):
         if request.user.role != 'student':
             return Response({"message": "Only students can join classes"}, status=403)
         class_obj = self.get_object()
-        class_obj.students.add(request.user)
+        enroll(class_obj.pk, request.user.pk)
         return Response({"message": "Successfully joined the class"})
 
     @action(detail=True, methods=['post'])
@@ -47,31 +130,36 @@ class ClassViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        try:
-            class_obj = self.get_object()
-            student_id = request.data.get('student_id')
-            
-            if not student_id:
-                return Response(
-                    {"message": "Student ID is required"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        class_obj = self.get_object()
+        student_id = request.data.get('student_id')
 
-            student = CustomUser.objects.get(id=student_id)
-            if student not in class_obj.students.all():
+        if not student_id:
+            return Response(
+                {"message": "Student ID is required"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        student_id = parse_student_id(student_id)
+        if student_id is None:
+            return Response(
+                {"message": "Student ID must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if not is_enrolled(class_obj.pk, student_id):
+            # Only the failure path needs to tell "no such user" apart.
+            if not CustomUser.objects.filter(id=student_id).exists():
                 return Response(
-                    {"message": "Student is not in this class"}, 
-                    status=status.HTTP_400_BAD_REQUEST
+                    {"message": "Student not found"}, 
+                    status=status.HTTP_404_NOT_FOUND
                 )
-
-            class_obj.students.remove(student)
-            return Response({"message": "Student removed successfully"})
-        except CustomUser.DoesNotExist:
             return Response(
-                {"message": "Student not found"}, 
-                status=status.HTTP_404_NOT_FOUND
+                {"message": "Student is not in this class"}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
 
+        unenroll(class_obj.pk, student_id)
+        return Response({"message": "Student removed successfully"})
+
     @action(detail=True, methods=['post'])
     def leave_class(self, request, pk=None):
         if request.user.role != 'student':
@@ -82,16 +170,71 @@ class ClassViewSet(viewsets.ModelViewSet):
 
         try:
             class_obj = self.get_object()
-            if request.user not in class_obj.students.all():
+            if not is_enrolled(class_obj.pk, request.user.pk):
                 return Response(
                     {"message": "You are not in this class"}, 
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            class_obj.students.remove(request.user)
+            unenroll(class_obj.pk, request.user.pk, 'left')
             return Response({"message": "Successfully left the class"})
         except Exception as e:
             return Response(
                 {"message": str(e)}, 
                 status=status.HTTP_400_BAD_REQUEST
-            )
\ No newline at end of file
+            )
+
+    def _bulk_identifiers(self, request):
+        upload = request.FILES.get('file')
+        if upload is not None:
+            return list(read_identifiers(upload))
+        if hasattr(request.data, 'getlist'):
+            return request.data.getlist('students')
+        students = request.data.get('students')
+        return students if isinstance(students, list) else None
+
+    def _bulk_change(self, request, bulk_action):
+        if request.user.role != 'teacher':
+            return Response(
+                {"message": "Only teachers can change enrollments"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        class_obj = self.get_object()
+        identifiers = self._bulk_identifiers(request)
+        if not identifiers:
+            return Response(
+                {"message": "Provide a list of student ids or emails"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(identifiers) > BULK_ENROLLMENT_LIMIT:
+            return Response(
+                {"message": f"At most {BULK_ENROLLMENT_LIMIT} students per request; "
+                            "use the import_enrollments command for larger imports"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if len(identifiers) > BULK_ENROLLMENT_INLINE_LIMIT:
+            queued = bulk_change.enqueue(
+                owner_id=request.user.pk, class_id=str(class_obj.pk), identifiers=identifiers, action=bulk_action,
+            )
+            return Response(TaskSerializer(queued).data, status=status.HTTP_202_ACCEPTED)
+        return Response(bulk_change(class_id=class_obj.pk, identifiers=identifiers, action=bulk_action))
+
+    @action(detail=True, methods=['post'],
+            parser_classes=[JSONParser, CSVParser, MultiPartParser, FormParser])
+    def bulk_enroll(self, request, pk=None):
+        return self._bulk_change(request, 'enroll')
+
+    @action(detail=True, methods=['post'],
+            parser_classes=[JSONParser, CSVParser, MultiPartParser, FormParser])
+    def bulk_unenroll(self, request, pk=None):
+        return self._bulk_change(request, 'unenroll')
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit, miss and eviction counts of the response cache in this process."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(response_cache.stats())
@@ -0,0 +1,59 @@
+"""
+Async (ASGI-native) views for the student API, routed instead of their DRF
+counterparts when ASYNC_API is on.
+"""
+from django.db import IntegrityError
+from django.http import JsonResponse
+
+from backend.async_api import AsyncAPIView, parse_json
+from classes.code_cache import aforget_code, aget_class_id
+from classes import response_cache
+from classes.membership import aenroll
+from classes.models import Class
+from classes.pagination import ClassCursorPagination
+from classes.serializers import ClassSerializer
+from .throttling import JoinAccountThrottle, JoinCodeThrottle, JoinIPThrottle
+
+
+class AsyncStudentView(AsyncAPIView):
+    roles = ('student',)
+
+
+class AsyncStudentDashboardView(AsyncStudentView):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request):
+        return JsonResponse({"message": "Student Dashboard"})
+
+
+class AsyncJoinClassView(AsyncStudentView):
+    http_method_names = ['post', 'options']
+    throttle_classes = (JoinIPThrottle, JoinAccountThrottle, JoinCodeThrottle)
+
+    async def post(self, request):
+        code = parse_json(request).get('code')
+        class_id = await aget_class_id(code)
+        if class_id is None:
+            return JsonResponse({"message": "Invalid class code"}, status=404)
+        try:
+            joined = await aenroll(class_id, request.user.pk)
+        except IntegrityError:
+            # The class was deleted after its code was cached.
+            await aforget_code(code)
+            return JsonResponse({"message": "Invalid class code"}, status=404)
+        if not joined:
+            return JsonResponse({"message": "Already enrolled in this class"}, status=400)
+        return JsonResponse({"message": "Successfully joined the class"})
+
+
+class AsyncEnrolledClassesView(AsyncStudentView):
+    http_method_names = ['get', 'head', 'options']
+
+    async def get(self, request):
+        selection = ClassSerializer.get_selection(request.GET)
+        async def paginate():
+            classes = ClassSerializer.setup_eager_loading(Class.objects.filter(students=request.user.pk), selection)
+            paginator = ClassCursorPagination()
+            rows = ClassSerializer.select_values(classes, selection)
+            return await self.paginate_queryset(paginator, rows, request), paginator
+        return await response_cache.apage_response(request, paginate, JsonResponse, selection)
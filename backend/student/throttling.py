@@ -0,0 +1,18 @@
+from backend.throttling import BodyFieldThrottle, IPThrottle, UserThrottle
+
+
+class JoinIPThrottle(IPThrottle):
+    scope = 'join-ip'
+
+
+class JoinAccountThrottle(UserThrottle):
+    # Caps how fast one student can guess codes.
+    scope = 'join-account'
+
+
+class JoinCodeThrottle(BodyFieldThrottle):
+    scope = 'join-code'
+    field = 'code'
+
+    def normalize(self, value):
+        return value.strip().upper()
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from .views import StudentDashboardView, JoinClassView, EnrolledClassesView
 
@@ -6,3 +7,13 @@ urlpatterns = [
     path("join-class/", JoinClassView.as_view(), name="join-class"),
     path("enrolled-classes/", EnrolledClassesView.as_view(), name="enrolled-classes"),
 ]
+
+if settings.ASYNC_API:
+    from .async_views import AsyncEnrolledClassesView, AsyncJoinClassView, AsyncStudentDashboardView
+
+    # Matched before the DRF views above, which keep the URL names.
+    urlpatterns = [
+        path("dashboard/", AsyncStudentDashboardView.as_view()),
+        path("join-class/", AsyncJoinClassView.as_view()),
+        path("enrolled-classes/", AsyncEnrolledClassesView.as_view()),
+    ] + urlpatterns
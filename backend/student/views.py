@@ -4,7 +4,12 @@ from rest_framework.permissions import IsAuthenticated
 from accounts.permissions import IsStudent
 from .serializers import StudentSerializer
 from rest_framework import status
+from django.db import IntegrityError
 from classes.models import Class
+from classes.code_cache import forget_code, get_class_id
+from classes import response_cache
+from classes.membership import enroll
+from .throttling import JoinAccountThrottle, JoinCodeThrottle, JoinIPThrottle
 
 class StudentDashboardView(APIView):
     permission_classes = [IsStudent]
@@ -14,23 +19,33 @@ class StudentDashboardView(APIView):
 
 class JoinClassView(APIView):
     permission_classes = [IsStudent]
+    throttle_classes = [JoinIPThrottle, JoinAccountThrottle, JoinCodeThrottle]
 
     def post(self, request):
         code = request.data.get('code')
+        class_id = get_class_id(code)
+        if class_id is None:
+            return Response({"message": "Invalid class code"}, status=status.HTTP_404_NOT_FOUND)
         try:
-            class_obj = Class.objects.get(code=code)
-            if request.user in class_obj.students.all():
-                return Response({"message": "Already enrolled in this class"}, status=status.HTTP_400_BAD_REQUEST)
-            class_obj.students.add(request.user)
-            return Response({"message": "Successfully joined the class"})
-        except Class.DoesNotExist:
+            joined = enroll(class_id, request.user.pk)
+        except IntegrityError:
+            # The class was deleted after its code was cached.
+            forget_code(code)
             return Response({"message": "Invalid class code"}, status=status.HTTP_404_NOT_FOUND)
+        if not joined:
+            return Response({"message": "Already enrolled in this class"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": "Successfully joined the class"})
 
 class EnrolledClassesView(APIView):
     permission_classes = [IsStudent]
 
     def get(self, request):
-        classes = request.user.enrolled_classes.all()
         from classes.serializers import ClassSerializer
-        serializer = ClassSerializer(classes, many=True)
-        return Response(serializer.data)
+        from classes.pagination import ClassCursorPagination
+        selection = ClassSerializer.get_selection(request.query_params)
+        def paginate():
+            classes = ClassSerializer.setup_eager_loading(Class.objects.filter(students=request.user.pk), selection)
+            paginator = ClassCursorPagination()
+            rows = ClassSerializer.select_values(classes, selection)
+            return paginator.paginate_queryset(rows, request, view=self), paginator
+        return response_cache.page_response(request, paginate, Response, selection)
@@ -0,0 +1,80 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import worker
+from tasks.queue import claim, requeue_stale, run_pending, schedule_periodic
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks in a pool of processes, polling the task "
+        "table for due tasks. Every TASK_MAINTENANCE_INTERVAL seconds, busy or "
+        "not, it requeues tasks with expired leases and queues missing periodic "
+        "tasks. SIGINT/SIGTERM stop claiming new tasks and wait for the running ones."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.TASK_WORKER_PROCESSES,
+                            help="Pool size; 0 runs tasks in this process.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait for new tasks when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once no task is due.")
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, self._stop)
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        self.next_maintenance = 0
+
+        if options['processes'] == 0:
+            while not self.stopping:
+                self._maintain()
+                if not run_pending(name, limit=1):
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+            return
+
+        processes = options['processes']
+        # Pool processes open their own connections.
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            processes, mp_context=multiprocessing.get_context('spawn'), initializer=worker.init_process,
+        )
+        running = set()
+        try:
+            while not self.stopping:
+                self._maintain()
+                claimed = claim(name, processes - len(running)) if len(running) < processes else []
+                running.update(pool.submit(worker.run, pk) for pk in claimed)
+                if running:
+                    done, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future.exception() is not None:
+                            # The task stays running until its lease expires, then runs again.
+                            self.stderr.write(f"Worker process failed: {future.exception()!r}")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll_interval'])
+        finally:
+            pool.shutdown(wait=True)
+
+    def _maintain(self):
+        now = time.monotonic()
+        if now >= self.next_maintenance:
+            self.next_maintenance = now + settings.TASK_MAINTENANCE_INTERVAL
+            requeue_stale()
+            schedule_periodic()
+
+    def _stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,172 @@
+"""
+A task queue in the database, for side effects that need not hold up the
+request that causes them (emails, exports, large enrollments, cleanup).
+
+Functions decorated with @task in an app's ``tasks`` module are registered
+by name (``"accounts.tasks.send_welcome_email"``). ``fn.enqueue(**kwargs)``
+inserts a Task row, one INSERT on the request path, and the ``run_tasks``
+worker command runs it later in a process pool. No broker is involved: the
+worker polls the (status, run_at) index.
+
+A worker claims a task with a conditional UPDATE (queued -> running), so
+several workers can share the table on any database. A failed run is
+retried with exponential backoff until ``max_attempts``; a task whose
+worker died is requeued once its lease (TASK_LEASE_SECONDS) expires, so
+tasks must be safe to run more than once. ``every=`` makes a task
+periodic: the worker keeps one run of it queued at all times. Finished
+tasks are deleted TASK_RETENTION seconds after they finish (prune_finished).
+
+With TASKS_EAGER on, enqueue() runs the task at once, in the caller.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, max_attempts, every):
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.every = every
+        self.__doc__ = func.__doc__
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, owner_id=None, run_at=None, **kwargs):
+        """Queue a call with JSON-serializable ``kwargs``; returns the Task."""
+        queued = Task.objects.create(
+            name=self.name, kwargs=kwargs, owner_id=owner_id,
+            run_at=run_at or timezone.now(), max_attempts=self.max_attempts,
+        )
+        if settings.TASKS_EAGER and run_at is None:
+            if claim('eager', ids=[queued.pk]):
+                execute(queued.pk)
+                queued.refresh_from_db()
+        return queued
+
+
+def task(func=None, *, max_attempts=5, every=None):
+    """Register ``func`` as a task; ``every`` (a timedelta) makes it periodic."""
+    def register(func):
+        registered = TaskFunction(func, max_attempts, every)
+        _registry[registered.name] = registered
+        return registered
+    return register(func) if func is not None else register
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def backoff(attempts):
+    """Delay before retry number ``attempts``: doubling from TASK_RETRY_BACKOFF, with jitter."""
+    delay = min(settings.TASK_RETRY_BACKOFF * 2 ** (attempts - 1), settings.TASK_RETRY_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+def claim(worker, limit=1, ids=None):
+    """Mark up to ``limit`` due tasks (or the given ``ids``) as running for ``worker``; returns their ids."""
+    now = timezone.now()
+    if ids is None:
+        ids = list(
+            Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+            .order_by('run_at').values_list('pk', flat=True)[:limit * 2]
+        )
+    else:
+        limit = len(ids)
+    claimed = []
+    for pk in ids:
+        if len(claimed) == limit:
+            break
+        # Whichever worker flips the status first owns the task.
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def requeue_stale():
+    """Requeue running tasks whose lease expired (their worker died); returns how many."""
+    expired = timezone.now() - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+    return Task.objects.filter(status=Task.RUNNING, locked_at__lt=expired).update(
+        status=Task.QUEUED, locked_by='', locked_at=None,
+    )
+
+
+def schedule_periodic():
+    """Queue a run of each periodic task that has none queued or running."""
+    for registered in _registry.values():
+        if registered.every is not None and not Task.objects.filter(
+            name=registered.name, status__in=[Task.QUEUED, Task.RUNNING],
+        ).exists():
+            registered.enqueue()
+
+
+def prune_finished(batch_size=1000):
+    """Delete done and failed tasks older than TASK_RETENTION, in batches; returns how many."""
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_RETENTION)
+    finished = Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=cutoff)
+    removed = 0
+    while True:
+        ids = list(finished.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return removed
+        removed += Task.objects.filter(pk__in=ids).delete()[0]
+
+
+def execute(pk):
+    """Run a claimed task and record the outcome. Returns its final or retry status."""
+    queued = Task.objects.get(pk=pk)
+    registered = get_task(queued.name)
+    now = timezone.now()
+    try:
+        if registered is None:
+            raise LookupError(f"No task named {queued.name!r}")
+        result = registered.func(**queued.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        retry = registered is not None and queued.attempts < queued.max_attempts
+        logger.warning("Task %s (%s) failed, attempt %d%s", queued.name, pk, queued.attempts,
+                       ", will retry" if retry else "", exc_info=True)
+        if retry:
+            outcome = {'status': Task.QUEUED, 'run_at': now + backoff(queued.attempts)}
+        else:
+            outcome = {'status': Task.FAILED, 'finished_at': now}
+        outcome['last_error'] = error
+    else:
+        outcome = {'status': Task.DONE, 'result': result, 'finished_at': timezone.now()}
+
+    # A worker whose lease expired no longer owns the row.
+    owned = Task.objects.filter(
+        pk=pk, status=Task.RUNNING, locked_by=queued.locked_by, locked_at=queued.locked_at,
+    ).update(locked_by='', locked_at=None, **outcome)
+    periodic = registered is not None and registered.every is not None
+    if owned and periodic and outcome['status'] != Task.QUEUED:
+        registered.enqueue(run_at=timezone.now() + registered.every)
+    return outcome['status']
+
+
+def run_pending(worker='inline', limit=None):
+    """Run due tasks in this process until none are left (or ``limit`` ran); returns how many ran."""
+    ran = 0
+    while limit is None or ran < limit:
+        claimed = claim(worker)
+        if not claimed:
+            return ran
+        execute(claimed[0])
+        ran += 1
+    return ran
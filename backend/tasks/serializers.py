@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import Task
+
+
+class TaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Task
+        fields = ("id", "name", "status", "attempts", "result", "created_at", "finished_at")
@@ -0,0 +1,8 @@
+from datetime import timedelta
+
+from .queue import prune_finished, task
+
+
+@task(every=timedelta(hours=1))
+def prune_tasks():
+    return {"removed": prune_finished()}
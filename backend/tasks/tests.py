@@ -0,0 +1,146 @@
+import io
+from datetime import timedelta
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import CustomUser
+from .models import Task
+from .queue import claim, execute, prune_finished, requeue_stale, run_pending, schedule_periodic, task
+
+calls = []
+
+
+@task(max_attempts=3)
+def flaky(fail_times):
+    calls.append(fail_times)
+    if len(calls) <= fail_times:
+        raise RuntimeError("boom")
+    return {"calls": len(calls)}
+
+
+@task
+def outlived_lease():
+    # Another worker requeued and claimed the task while this run was going.
+    Task.objects.filter(name=outlived_lease.name).update(locked_by='other-worker', locked_at=timezone.now())
+
+
+class QueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_and_stores_result(self):
+        queued = flaky.enqueue(fail_times=0)
+        self.assertEqual(queued.status, Task.QUEUED)
+        self.assertEqual(run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.result, queued.attempts), (Task.DONE, {"calls": 1}, 1))
+        self.assertIsNotNone(queued.finished_at)
+
+    def test_retries_with_backoff_then_fails(self):
+        queued = flaky.enqueue(fail_times=5)
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.QUEUED, 1))
+        self.assertGreater(queued.run_at, timezone.now())
+        self.assertIn('RuntimeError: boom', queued.last_error)
+        # Not due yet.
+        self.assertEqual(run_pending(), 0)
+
+        for attempt in (2, 3):
+            Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+            with self.assertLogs('tasks.queue', 'WARNING'):
+                run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 3))
+
+    def test_unknown_task_fails_without_retry(self):
+        queued = Task.objects.create(name='nowhere.gone')
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            run_pending()
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, Task.FAILED)
+
+    def test_claim_is_exclusive(self):
+        queued = flaky.enqueue(fail_times=0)
+        self.assertEqual(claim('a'), [queued.pk])
+        self.assertEqual(claim('b'), [])
+        self.assertEqual(claim('b', ids=[queued.pk]), [])
+
+    def test_expired_lease_is_requeued(self):
+        queued = flaky.enqueue(fail_times=0)
+        claim('dead-worker')
+        self.assertEqual(requeue_stale(), 0)
+        Task.objects.filter(pk=queued.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+
+    def test_lost_lease_does_not_overwrite(self):
+        queued = outlived_lease.enqueue()
+        claim('slow-worker')
+        execute(queued.pk)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.locked_by), (Task.RUNNING, 'other-worker'))
+
+    def test_periodic_task_reschedules(self):
+        schedule_periodic()
+        schedule_periodic()
+        name = 'accounts.tasks.prune_tokens'
+        self.assertEqual(Task.objects.filter(name=name).count(), 1)
+        run_pending()
+        following = Task.objects.get(name=name, status=Task.QUEUED)
+        self.assertGreater(following.run_at, timezone.now() + timedelta(minutes=59))
+        self.assertEqual(Task.objects.get(name=name, status=Task.DONE).result, {"removed": 0})
+
+    @override_settings(TASK_RETENTION=3600)
+    def test_prune_finished(self):
+        old = timezone.now() - timedelta(hours=2)
+        for status in (Task.DONE, Task.FAILED):
+            Task.objects.create(name='old', status=status, finished_at=old)
+            Task.objects.create(name='recent', status=status, finished_at=timezone.now())
+        Task.objects.create(name='waiting', run_at=old)
+        self.assertEqual(prune_finished(batch_size=1), 2)
+        self.assertEqual(sorted(Task.objects.values_list('name', flat=True)), ['recent', 'recent', 'waiting'])
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager(self):
+        self.assertEqual(flaky.enqueue(fail_times=0).status, Task.DONE)
+
+    def test_worker_command_drains_queue(self):
+        for _ in range(3):
+            flaky.enqueue(fail_times=0)
+        with mock.patch('tasks.management.commands.run_tasks.signal.signal'):
+            call_command('run_tasks', '--processes', '0', '--once', stdout=io.StringIO())
+        self.assertEqual(Task.objects.filter(name=flaky.name, status=Task.DONE).count(), 3)
+
+    @override_settings(TASK_MAINTENANCE_INTERVAL=0)
+    def test_worker_command_maintains_while_busy(self):
+        for _ in range(3):
+            flaky.enqueue(fail_times=0)
+        with mock.patch('tasks.management.commands.run_tasks.signal.signal'), \
+                mock.patch('tasks.management.commands.run_tasks.requeue_stale') as requeue, \
+                mock.patch('tasks.management.commands.run_tasks.time.sleep') as sleep:
+            call_command('run_tasks', '--processes', '0', '--once', stdout=io.StringIO())
+        # Before every task (periodic ones included), not only once the queue is empty.
+        self.assertEqual(requeue.call_count, Task.objects.filter(status=Task.DONE).count() + 1)
+        sleep.assert_not_called()
+
+
+class TaskDetailTests(APITestCase):
+    def test_owner_only(self):
+        owner = CustomUser.objects.create_user(username='owner', email='owner@example.com', password='x')
+        other = CustomUser.objects.create_user(username='other', email='other@example.com', password='x')
+        queued = flaky.enqueue(owner_id=owner.pk, fail_times=0)
+        url = reverse('task-detail', args=[queued.pk])
+
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_authenticate(owner)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['name'], response.data['status']), ('tasks.tests.flaky', 'queued'))
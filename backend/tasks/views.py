@@ -0,0 +1,14 @@
+from rest_framework.generics import RetrieveAPIView
+from rest_framework.permissions import IsAuthenticated
+
+from .models import Task
+from .serializers import TaskSerializer
+
+
+class TaskDetailView(RetrieveAPIView):
+    """Status and result of a background task the user started."""
+    permission_classes = [IsAuthenticated]
+    serializer_class = TaskSerializer
+
+    def get_queryset(self):
+        return Task.objects.filter(owner_id=self.request.user.pk)
@@ -0,0 +1,19 @@
+"""
+Entry points of run_tasks' pool processes. Kept free of model imports, so a
+fresh (spawned) process can load this module before Django is set up.
+"""
+
+
+def init_process():
+    import signal
+
+    import django
+
+    # Ctrl-C reaches the whole process group; the parent decides when to stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    django.setup()
+
+
+def run(pk):
+    from .queue import execute
+    return execute(pk)
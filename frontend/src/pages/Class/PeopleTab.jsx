@@ -1,7 +1,13 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "../../context/AuthContext";
-import { removeStudent, leaveClass } from "../../services/classService";
+import {
+  removeStudent,
+  leaveClass,
+  getClassStudents,
+  getClassDetails,
+} from "../../services/classService";
+import { subscribeToRoster } from "../../services/rosterSocket";
 // import { leaveClass } from '../../services/studentService';
 
 export default function PeopleTab({ classData }) {
@@ -9,6 +15,82 @@ export default function PeopleTab({ classData }) {
   const navigate = useNavigate();
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [students, setStudents] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
+  // Whether roster changes are arriving over the live socket
+  const [live, setLive] = useState(false);
+  // Student count fetched with the roster and kept up to date from deltas;
+  // null until fetched, when classData's count is shown
+  const [studentCount, setStudentCount] = useState(null);
+
+  const withoutKnown = (current, incoming) => {
+    const known = new Set(current.map((student) => student.id));
+    return incoming.filter((student) => !known.has(student.id));
+  };
+
+  const loadStudents = async (nextUrl = null) => {
+    try {
+      const response = await getClassStudents(classData.id, nextUrl);
+      setStudents((current) =>
+        nextUrl
+          ? [...current, ...withoutKnown(current, response.data.results)]
+          : response.data.results
+      );
+      setNextPage(response.data.next);
+    } catch (err) {
+      setError(err.response?.data?.message || "Failed to load students");
+    }
+  };
+
+  // Reload the roster and its count from scratch, e.g. on every socket
+  // (re)connect, since deltas sent while disconnected are lost
+  const reloadRoster = async () => {
+    loadStudents();
+    try {
+      const response = await getClassDetails(classData.id, {
+        fields: "student_count",
+      });
+      setStudentCount(response.data.student_count);
+    } catch (err) {
+      setStudentCount(null);
+    }
+  };
+
+  const applyDelta = (delta) => {
+    if (delta.type === "joined") {
+      setStudents((current) => [
+        ...current,
+        ...withoutKnown(current, delta.students),
+      ]);
+      setStudentCount((count) => count === null ? count : count + delta.students.length);
+    } else {
+      const gone = new Set(delta.student_ids);
+      setStudents((current) => current.filter((student) => !gone.has(student.id)));
+      setStudentCount((count) => count === null ? count : count - delta.student_ids.length);
+    }
+  };
+
+  // The roster is (re)loaded whenever the live socket opens and kept up to
+  // date from its deltas; without a socket it is loaded once.
+  useEffect(() => {
+    if (!classData?.id) return;
+    let loaded = false;
+    return subscribeToRoster(classData.id, {
+      onOpen: () => {
+        loaded = true;
+        setLive(true);
+        reloadRoster();
+      },
+      onDelta: applyDelta,
+      onClose: () => {
+        setLive(false);
+        if (!loaded) {
+          loaded = true;
+          reloadRoster();
+        }
+      },
+    });
+  }, [classData?.id]);
 
   // Pastikan classData dan propertinya ada
   if (!classData || !classData.teacher) {
@@ -34,8 +116,8 @@ export default function PeopleTab({ classData }) {
       setSuccessMessage(
         response.data.message || "Student removed successfully"
       );
-      // Refresh class data
-      onUpdateClass(); // Pastikan fungsi ini ada untuk memperbarui data class
+      // The live socket removes the student from the list
+      if (!live) reloadRoster();
     } catch (err) {
       setError(err.response?.data?.message || "Failed to remove student");
       setSuccessMessage(null); // Pastikan pesan sukses direset jika terjadi error
@@ -44,16 +126,6 @@ export default function PeopleTab({ classData }) {
     }
   };
 
-  const onUpdateClass = async () => {
-    try {
-      const updatedClass = await getClassDetails(classData.id); // Pastikan fungsi ini ada
-      setClassData(updatedClass.data);
-    } catch (err) {
-      console.error("Failed to refresh class data:", err);
-    }
-  };
-  
-
   const handleLeaveClass = async () => {
     if (!window.confirm("Are you sure you want to leave this class?")) {
       return;
@@ -109,7 +181,7 @@ export default function PeopleTab({ classData }) {
       <div className="bg-white rounded-lg shadow p-6">
         <div className="flex justify-between items-center mb-4">
           <h3 className="text-xl font-semibold">
-            Students ({classData.students?.length || 0})
+            Students ({studentCount ?? (classData.student_count || 0)})
           </h3>
           {userRole === "student" && (
             <button
@@ -122,9 +194,9 @@ export default function PeopleTab({ classData }) {
           )}
         </div>
 
-        {classData.students?.length > 0 ? (
+        {students.length > 0 ? (
           <div className="space-y-4">
-            {classData.students.map((student) => (
+            {students.map((student) => (
               <div
                 key={student.id}
                 className="flex items-center justify-between p-3 hover:bg-gray-50 rounded-lg"
@@ -153,6 +225,14 @@ export default function PeopleTab({ classData }) {
                 )}
               </div>
             ))}
+            {nextPage && (
+              <button
+                onClick={() => loadStudents(nextPage)}
+                className="w-full text-indigo-600 hover:text-indigo-800 text-sm py-2"
+              >
+                Load more
+              </button>
+            )}
           </div>
         ) : (
           <p className="text-gray-500 text-center py-4">
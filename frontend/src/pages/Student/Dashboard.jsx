@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { getUser } from "../../services/authService";
+import { batch } from "../../services/batchService";
 import { getEnrolledClasses } from "../../services/studentService";
 import { useNavigate } from "react-router-dom";
 import JoinClassModal from "./JoinClassModal";
@@ -9,6 +9,8 @@ export default function StudentDashboard() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [classes, setClasses] = useState([]);
+  // Cursor of the next page of classes, if any
+  const [nextPage, setNextPage] = useState(null);
   const [isTokenExpired, setIsTokenExpired] = useState(false);
   const [showSessionExpiredModal, setShowSessionExpiredModal] = useState(false);
   const [showJoinClassModal, setShowJoinClassModal] = useState(false);
@@ -37,13 +39,15 @@ export default function StudentDashboard() {
       }
 
       try {
-        const [userResponse, classesResponse] = await Promise.all([
-          getUser(),
-          getEnrolledClasses(),
+        // One round-trip for both
+        const [userResponse, classesResponse] = await batch([
+          { path: "accounts/user/" },
+          { path: "student/enrolled-classes/" },
         ]);
 
         setUser(userResponse.data);
-        setClasses(classesResponse.data);
+        setClasses(classesResponse.data.results);
+        setNextPage(classesResponse.data.next);
         setLoading(false);
       } catch (error) {
         console.error("Error fetching data:", error);
@@ -59,13 +63,16 @@ export default function StudentDashboard() {
     checkTokenAndFetchUser();
   }, []);
 
-  // Refresh classes list
-  const refreshClasses = async () => {
+  // Reload the classes list, or append the page at nextUrl
+  const loadClasses = async (nextUrl = null) => {
     try {
-      const response = await getEnrolledClasses();
-      setClasses(response.data);
+      const response = await getEnrolledClasses(nextUrl);
+      setClasses((current) =>
+        nextUrl ? [...current, ...response.data.results] : response.data.results
+      );
+      setNextPage(response.data.next);
     } catch (error) {
-      console.error("Error refreshing classes:", error);
+      console.error("Error loading classes:", error);
     }
   };
 
@@ -171,12 +178,20 @@ export default function StudentDashboard() {
                     Teacher: {classItem.teacher?.username}
                   </p>
                   <p className="text-sm text-gray-500">
-                    Students: {classItem.students?.length || 0}
+                    Students: {classItem.student_count || 0}
                   </p>
                 </div>
               </div>
             ))}
           </div>
+          {nextPage && (
+            <button
+              onClick={() => loadClasses(nextPage)}
+              className="w-full text-indigo-600 hover:text-indigo-800 text-sm py-2 mt-4"
+            >
+              Load more
+            </button>
+          )}
         </div>
 
         {/* Modals */}
@@ -185,7 +200,7 @@ export default function StudentDashboard() {
             onClose={() => setShowJoinClassModal(false)}
             onJoinSuccess={() => {
               setShowJoinClassModal(false);
-              refreshClasses();
+              loadClasses();
             }}
           />
         )}
@@ -1,5 +1,5 @@
 import React, { useState, useEffect } from "react";
-import { getUser } from "../../services/authService";
+import { batch } from "../../services/batchService";
 import { getTeacherClasses } from "../../services/classService";
 import { useNavigate } from "react-router-dom";
 import CreateClassModal from "./CreateClassModal";
@@ -10,6 +10,8 @@ export default function TeacherDashboard() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [classes, setClasses] = useState([]);
+  // Cursor of the next page of classes, if any
+  const [nextPage, setNextPage] = useState(null);
   const [isTokenExpired, setIsTokenExpired] = useState(false);
   const [showSessionExpiredModal, setShowSessionExpiredModal] = useState(false);
   const [showCreateClassModal, setShowCreateClassModal] = useState(false);
@@ -38,13 +40,15 @@ export default function TeacherDashboard() {
       }
 
       try {
-        const [userResponse, classesResponse] = await Promise.all([
-          getUser(),
-          getTeacherClasses(),
+        // One round-trip for both
+        const [userResponse, classesResponse] = await batch([
+          { path: "accounts/user/" },
+          { path: "classes/" },
         ]);
 
         setUser(userResponse.data);
-        setClasses(classesResponse.data);
+        setClasses(classesResponse.data.results);
+        setNextPage(classesResponse.data.next);
         setLoading(false);
       } catch (error) {
         console.error("Error fetching data:", error);
@@ -84,13 +88,16 @@ export default function TeacherDashboard() {
     }
   };
 
-  // Refresh classes list
-  const refreshClasses = async () => {
+  // Reload the classes list, or append the page at nextUrl
+  const loadClasses = async (nextUrl = null) => {
     try {
-      const response = await getTeacherClasses();
-      setClasses(response.data);
+      const response = await getTeacherClasses(nextUrl);
+      setClasses((current) =>
+        nextUrl ? [...current, ...response.data.results] : response.data.results
+      );
+      setNextPage(response.data.next);
     } catch (error) {
-      console.error("Error refreshing classes:", error);
+      console.error("Error loading classes:", error);
     }
   };
 
@@ -187,12 +194,20 @@ export default function TeacherDashboard() {
                       </span>
                     </p>
                     <p className="text-sm text-gray-500">
-                      Students: {classItem.students?.length || 0}
+                      Students: {classItem.student_count || 0}
                     </p>
                   </div>
                 </div>
               ))}
             </div>
+            {nextPage && (
+              <button
+                onClick={() => loadClasses(nextPage)}
+                className="w-full text-indigo-600 hover:text-indigo-800 text-sm py-2 mt-4"
+              >
+                Load more
+              </button>
+            )}
           </div>
 
           {/* Modals */}
@@ -201,7 +216,7 @@ export default function TeacherDashboard() {
               onClose={() => setShowCreateClassModal(false)}
               onClassCreated={() => {
                 setShowCreateClassModal(false);
-                refreshClasses();
+                loadClasses();
               }}
             />
           )}
@@ -0,0 +1,28 @@
+import apiClient from "./apiClient";
+
+// Sub-request paths are relative to the API root, like in the other services
+const apiRoot = new URL(
+  import.meta.env.VITE_API_BASE_URL,
+  window.location.href
+).pathname.replace(/\/?$/, "/");
+
+// Send several API calls in one round-trip (POST /api/batch/). Each request
+// is { path, method = "GET", body, headers }. Resolves to one axios-like
+// { status, headers, data } per request, in order, or rejects like axios
+// (with error.response) on the first one that failed.
+export const batch = async (requests) => {
+  const response = await apiClient.post("batch/", {
+    requests: requests.map(({ path, ...rest }) => ({
+      ...rest,
+      path: apiRoot + path,
+    })),
+  });
+  return response.data.responses.map(({ status, headers, body }) => {
+    if (status >= 400) {
+      const error = new Error(`Request failed with status code ${status}`);
+      error.response = { status, headers, data: body };
+      throw error;
+    }
+    return { status, headers, data: body };
+  });
+};
@@ -2,8 +2,8 @@
 import apiClient from "./apiClient";
 
 // Teacher functions
-export const getTeacherClasses = async () => {
-  return apiClient.get("classes/");
+export const getTeacherClasses = async (nextUrl = null) => {
+  return apiClient.get(nextUrl || "classes/");
 };
 
 export const createClass = async (classData) => {
@@ -19,8 +19,14 @@ export const deleteClass = async (classId) => {
 };
 
 // Common functions
-export const getClassDetails = async (classId) => {
-  return apiClient.get(`classes/${classId}/`);
+// params can narrow the response, e.g. { fields: "student_count" }
+export const getClassDetails = async (classId, params = {}) => {
+  return apiClient.get(`classes/${classId}/`, { params });
+};
+
+// Roster is paginated; pass the `next` URL from a previous page to continue
+export const getClassStudents = async (classId, nextUrl = null) => {
+  return apiClient.get(nextUrl || `classes/${classId}/students/`);
 };
 
 export const removeStudent = async (classId, studentId) => {
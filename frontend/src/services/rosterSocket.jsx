@@ -0,0 +1,57 @@
+// Live roster updates: a WebSocket per class pushing "joined", "left" and
+// "removed" deltas (see backend/classes/live.py).
+
+// Close codes after which reconnecting will not help, except that a 4401
+// (token missing, invalid or expired) is retried once the stored access
+// token has been refreshed.
+const UNAUTHORIZED = 4401;
+const FINAL_CLOSE_CODES = [UNAUTHORIZED, 4403, 4404];
+const MAX_RETRY_DELAY = 30000;
+
+const socketUrl = (classId, token) => {
+  const url = new URL(import.meta.env.VITE_API_BASE_URL, window.location.href);
+  url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+  url.pathname = `/ws/classes/${classId}/`;
+  url.search = new URLSearchParams({ token }).toString();
+  return url.toString();
+};
+
+// Calls onOpen each time the socket (re)connects, which is when the roster
+// and its count should be (re)loaded, and onDelta for every delta. Returns
+// a function that closes the socket for good.
+export const subscribeToRoster = (classId, { onOpen, onDelta, onClose }) => {
+  let socket = null;
+  let retryDelay = 1000;
+  let retryTimer = null;
+  let stopped = false;
+
+  const connect = () => {
+    const token = localStorage.getItem("accessToken");
+    if (!token) {
+      onClose?.(UNAUTHORIZED);
+      return;
+    }
+    socket = new WebSocket(socketUrl(classId, token));
+    socket.onopen = () => {
+      retryDelay = 1000;
+      onOpen?.();
+    };
+    socket.onmessage = (event) => onDelta(JSON.parse(event.data));
+    socket.onclose = (event) => {
+      if (stopped) return;
+      onClose?.(event.code);
+      const renewed =
+        event.code === UNAUTHORIZED && localStorage.getItem("accessToken") !== token;
+      if (FINAL_CLOSE_CODES.includes(event.code) && !renewed) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+    };
+  };
+
+  connect();
+  return () => {
+    stopped = true;
+    clearTimeout(retryTimer);
+    socket?.close();
+  };
+};
@@ -6,8 +6,8 @@ export const getStudentDashboard = async () => {
 };
 
 // Get all enrolled classes
-export const getEnrolledClasses = async () => {
-  return apiClient.get("student/enrolled-classes/");
+export const getEnrolledClasses = async (nextUrl = null) => {
+  return apiClient.get(nextUrl || "student/enrolled-classes/");
 };
 
 // Join a class using class code